@@ -0,0 +1,142 @@
+"""Batch research mode for the finance pipeline.
+
+Runs the compiled research graph over a list of companies with a bounded
+number of concurrent runs. All runs share the process-wide tool cache and
+Bedrock rate limiter from finance_agent. Each final report is written to its
+own file as soon as its run finishes, and companies that already have a report
+are skipped, so an interrupted nightly refresh can simply be re-run; companies
+that failed part-way resume from their last checkpoint.
+
+Input is a JSON lines file, one company per line:
+
+    {"company": "Time Technoplast", "urls": ["https://.../q3-transcript.pdf", "https://www.screener.in/company/TIMETECHNO/consolidated/"]}
+
+Usage:
+
+    python batch_research.py companies.jsonl --output-dir reports --concurrency 3
+"""
+import argparse
+import json
+import os
+import re
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+from finance_agent import build_research_request, run_or_resume, logger
+
+def slugify(name: str) -> str:
+    """Turns a company name into a safe file name"""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+def load_companies(path: str) -> List[dict]:
+    """Loads the companies to research from a JSON lines file.
+
+    Args:
+        path: Path to a file with one {"company": ..., "urls": [...]} object per line
+    """
+    companies = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            if not entry.get("company") or not entry.get("urls"):
+                raise ValueError(f"{path}:{line_number}: each entry needs a company and a list of urls")
+            companies.append(entry)
+    return companies
+
+def report_path(output_dir: str, company: str) -> str:
+    """Path of the report file for a company"""
+    return os.path.join(output_dir, f"{slugify(company)}.md")
+
+def write_report(path: str, report: str):
+    """Writes a report atomically so a crashed run never leaves a partial file behind"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(report)
+    os.replace(temp_path, path)
+
+def research_company(entry: dict, output_dir: str, pdf_backend: Optional[str] = None) -> str:
+    """Runs the research graph for one company and writes its final report"""
+    company = entry["company"]
+    logger.info(f"🚀 Starting research for {company}")
+    # Runs are checkpointed per company and day, so re-running a failed batch
+    # resumes each unfinished company where it stopped
+    run_id = f"{slugify(company)}-{date.today().isoformat()}"
+    result = run_or_resume(build_research_request(company, entry["urls"]), run_id, pdf_backend)
+    path = report_path(output_dir, company)
+    write_report(path, result["final_report"])
+    logger.info(f"📄 Report for {company} written to {path}")
+    return path
+
+def run_batch(companies: List[dict], output_dir: str, concurrency: int, pdf_backend: Optional[str] = None) -> dict:
+    """Researches all companies with at most `concurrency` graph runs in flight.
+
+    Args:
+        companies: Entries loaded by load_companies
+        output_dir: Directory for the per-company reports
+        concurrency: Maximum number of companies researched at the same time
+        pdf_backend: PDF extraction backend, defaults to finance_agent.PDF_BACKEND
+    Returns:
+        Summary with completed, skipped and failed companies and the throughput
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pending = []
+    skipped = []
+    for entry in companies:
+        if os.path.exists(report_path(output_dir, entry["company"])):
+            skipped.append(entry["company"])
+        else:
+            pending.append(entry)
+    logger.info(f"📋 {len(pending)} companies to research, {len(skipped)} already have reports")
+
+    completed = []
+    failed = {}
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(research_company, entry, output_dir, pdf_backend): entry["company"] for entry in pending}
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                future.result()
+                completed.append(company)
+            except Exception as e:
+                logger.error(f"Research failed for {company}: {str(e)}")
+                failed[company] = str(e)
+            elapsed = time.monotonic() - start
+            logger.info(
+                f"⏱️ {len(completed) + len(failed)}/{len(pending)} done, "
+                f"{len(completed) * 3600 / elapsed:.1f} companies/hour"
+            )
+
+    elapsed = time.monotonic() - start
+    return {
+        "completed": completed,
+        "skipped": skipped,
+        "failed": failed,
+        "elapsed_seconds": elapsed,
+        "companies_per_hour": len(completed) * 3600 / elapsed if elapsed else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the finance research pipeline over a list of companies")
+    parser.add_argument("companies", help="JSON lines file with one {company, urls} entry per line")
+    parser.add_argument("--output-dir", default="reports", help="Directory to write the reports to")
+    parser.add_argument("--concurrency", type=int, default=2, help="Maximum number of companies researched at once")
+    parser.add_argument("--pdf-backend", choices=["llamaparse", "local"], help="PDF extraction backend")
+    args = parser.parse_args()
+
+    summary = run_batch(load_companies(args.companies), args.output_dir, args.concurrency, args.pdf_backend)
+    logger.info(
+        f"✅ Batch complete: {len(summary['completed'])} completed, {len(summary['skipped'])} skipped, "
+        f"{len(summary['failed'])} failed in {summary['elapsed_seconds']:.0f}s "
+        f"({summary['companies_per_hour']:.1f} companies/hour)"
+    )
+    if summary["failed"]:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from anthropic import AsyncAnthropicBedrock
 from pydantic_ai.models.anthropic import AnthropicModel
 # from pydantic_ai import Agent
 from pydantic_ai import Agent, ModelRetry, RunContext
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import asyncio
 import os
 from pydantic import BaseModel
@@ -20,19 +20,64 @@ import tempfile
 import aiohttp
 import logging
 import sys
+from local_pdf import extract_pdf
+from pydantic_ai.exceptions import UsageLimitExceeded
+from run_accounting import RunBudget, RunRecorder, accounted_tool, accounting_http_client, current_recorder
+from replay import active_cassette, cassette_tool, CassetteTransport
 
-anthropic_bedrock_client = AsyncAnthropicBedrock(aws_region='us-west-2')
+if active_cassette is None:
+    anthropic_bedrock_client = AsyncAnthropicBedrock(aws_region='us-west-2', http_client=accounting_http_client())
+elif active_cassette.recording:
+    anthropic_bedrock_client = AsyncAnthropicBedrock(
+        aws_region='us-west-2',
+        http_client=accounting_http_client(CassetteTransport(active_cassette))
+    )
+else:
+    # Replayed requests never leave the machine, but the client still signs them
+    anthropic_bedrock_client = AsyncAnthropicBedrock(
+        aws_region='us-west-2',
+        aws_access_key='replay',
+        aws_secret_key='replay',
+        http_client=accounting_http_client(CassetteTransport(active_cassette))
+    )
 
 model = AnthropicModel(
     model_name='anthropic.claude-3-5-sonnet-20241022-v2:0',
     anthropic_client=anthropic_bedrock_client
 )
 
+@dataclass
+class ReportRequirements:
+    min_words: int = 1200
+    required_sections: tuple[str, ...] = (
+        'Historical Financial Data',
+        'Future Guidance',
+        'Investment Thesis',
+        'Risks',
+        'Recommendation',
+    )
+
+@dataclass
+class ValidationStats:
+    checks: int = 0  # Report validations run locally by validate_report
+    passed: int = 0
+    retries: int = 0
+
+    @property
+    def round_trips_saved(self) -> int:
+        """Model round trips a word-count tool would have cost: one tool call per draft checked"""
+        return self.checks
+
 @dataclass
 class Deps:
     client: AsyncClient
     serp_api_key: str | None
     llama_api_key: str | None
+    pdf_backend: str = "llamaparse"  # "llamaparse" or "local"
+    requirements: ReportRequirements = field(default_factory=ReportRequirements)
+    validation_stats: ValidationStats = field(default_factory=ValidationStats)
+    budget: RunBudget = field(default_factory=RunBudget)
+    recorder: RunRecorder | None = None
 
 class MyModel(BaseModel):
     city: str
@@ -47,7 +92,7 @@ print(f'Using model: {model}')
 agent = Agent(model,
     system_prompt=(
         'You are websearch agent for investment analysis. Your primary tasks are:'
-        '\n1. Search and gather information using crawl_website and parse_pdf_url and count_words_of_report'
+        '\n1. Search and gather information using crawl_website and parse_pdf_url'
         '\n2. Create REPORTS as requested and gather insightful information'
     ),
     deps_type=Deps,
@@ -76,26 +121,50 @@ agent = Agent(model,
 #     organic_results = results["organic_results"]
 #     return organic_results
 
-@agent.tool
-async def count_words_of_report(ctx: RunContext[Deps], summary: str) -> dict[str, any]:
+@agent.system_prompt
+def report_requirements(ctx: RunContext[Deps]) -> str:
+    requirements = ctx.deps.requirements
+    return (
+        f'Reports must be more than {requirements.min_words} words and use a markdown heading '
+        f'for each of these sections: {", ".join(requirements.required_sections)}'
+    )
+
+@agent.result_validator
+async def validate_report(ctx: RunContext[Deps], result: SummaryResponse) -> SummaryResponse:
     """
-    Count the number of words in the summary and verify if it matches the required count.
+    Check the report length and sections locally, asking the model for a targeted fix if they are not met
     Args:
         ctx: The context
-        summary: The text to analyze
+        result: The report returned by the model
     Returns:
-        Dictionary containing word count, match status, and the summary
+        The report, if it meets the requirements
     """
-    words = summary.split()
-    word_count = len(words)
-    print(f'Current word count: {word_count}')
-    
-    return {
-        "word_count": word_count,
-        "summary": summary
-    }
+    requirements = ctx.deps.requirements
+    stats = ctx.deps.validation_stats
+    stats.checks += 1
+
+    word_count = len(result.summary.split())
+    headings = [line.lower() for line in result.summary.splitlines() if line.lstrip().startswith(('#', '**'))]
+    missing_sections = [
+        section for section in requirements.required_sections
+        if not any(section.lower() in heading for heading in headings)
+    ]
+    logger.info(f'Report word count: {word_count}, missing sections: {missing_sections or "none"}')
+
+    problems = []
+    if word_count <= requirements.min_words:
+        problems.append(f'it has {word_count} words, expand it to more than {requirements.min_words}')
+    if missing_sections:
+        problems.append(f'add headed sections for: {", ".join(missing_sections)}')
+    if problems:
+        stats.retries += 1
+        raise ModelRetry(f'Revise the report: {"; ".join(problems)}. Keep the existing content.')
+    stats.passed += 1
+    return result
 
 @agent.tool
+@accounted_tool
+@cassette_tool
 async def crawl_website(ctx: RunContext[Deps], url: str) -> str:
     """
     Website to crawl to get information
@@ -128,16 +197,18 @@ logging.basicConfig(
 logger = logging.getLogger('pdf_parser')
 
 @agent.tool
+@accounted_tool
+@cassette_tool
 async def parse_pdf_url(ctx: RunContext[Deps], input_pdf_url: str) -> str:
     """
-    Parse a PDF file from a given URL using LlamaParse
+    Parse a PDF file from a given URL using LlamaParse or the local extractor
     Args:
         ctx: The context
         input_pdf_url: URL of the PDF to parse
     Returns:
         Parsed PDF content or error message
     """
-    if ctx.deps.llama_api_key is None:
+    if ctx.deps.pdf_backend == "llamaparse" and ctx.deps.llama_api_key is None:
         logger.error("LlamaIndex API key not provided")
         return "Please provide LlamaIndex API key for PDF parsing"
     
@@ -182,6 +253,15 @@ async def parse_pdf_url(ctx: RunContext[Deps], input_pdf_url: str) -> str:
                     temp_file_path = temp_file.name
                     logger.info(f"PDF saved to temporary file: {temp_file_path}")
 
+        if ctx.deps.pdf_backend == "local":
+            logger.info("Starting local PDF extraction...")
+            parsed_content = await asyncio.to_thread(extract_pdf, temp_file_path)
+            if parsed_content:
+                logger.info(f"Successfully extracted PDF. Content length: {len(parsed_content)} characters")
+                return parsed_content
+            logger.warning("No content extracted from PDF")
+            return "No content parsed from PDF"
+
         # Set up parser
         logger.info("Initializing LlamaParse...")
         parser = LlamaParse(
@@ -224,17 +304,53 @@ async def main():
     async with AsyncClient() as client:
         serp_api_key = os.getenv('SERP_API_KEY')
         llama_api_key = os.getenv('LLAMA_API_KEY')
+        budget = RunBudget()
+        recorder = RunRecorder(model.model_name, budget)
         deps = Deps(
             client=client, 
             serp_api_key=serp_api_key,
-            llama_api_key=llama_api_key
-        )
-        result = await agent.run(
-            'Parse this pdf url https://www.bseindia.com/xml-data/corpfiling/AttachHis/3e629215-d629-4d24-9626-0d9a1561cc80.pdf and also crawl https://www.screener.in/company/CHAMBLFERT/consolidated/ to get more information PLEASE DO STUFF ONE BY ONE!'
-            'Then create a detailed report of more than 1200 words of the key findings, have multiple sections, like future guidance, historical financial data, what can be the thesis, should the stock be looked upon from a investment perspective. MAKE SURE THE REPORT IS OF MORE THAN 1200 WORDS', 
-            deps=deps
+            llama_api_key=llama_api_key,
+            pdf_backend=os.getenv('PDF_BACKEND', 'llamaparse'),
+            budget=budget,
+            recorder=recorder
         )
+        current_recorder.set(recorder)
+        # The requested length and sections come from the requirements validate_report enforces
+        requirements = deps.requirements
+        try:
+            result = await asyncio.wait_for(
+                agent.run(
+                    'Parse this pdf url https://www.bseindia.com/xml-data/corpfiling/AttachHis/3e629215-d629-4d24-9626-0d9a1561cc80.pdf and also crawl https://www.screener.in/company/CHAMBLFERT/consolidated/ to get more information PLEASE DO STUFF ONE BY ONE!'
+                    f'Then create a detailed report of more than {requirements.min_words} words of the key findings, '
+                    f'with a markdown heading for each of these sections: {", ".join(requirements.required_sections)}. '
+                    f'MAKE SURE THE REPORT IS OF MORE THAN {requirements.min_words} WORDS',
+                    deps=deps,
+                    usage_limits=budget.usage_limits()
+                ),
+                timeout=budget.deadline_seconds
+            )
+        except UsageLimitExceeded as e:
+            logger.error(f"Run stopped, budget exceeded: {e}")
+            recorder.write_report('budget_exceeded', error=str(e))
+            return
+        except asyncio.TimeoutError:
+            logger.error(f"Run stopped, deadline of {budget.deadline_seconds}s exceeded")
+            recorder.write_report('deadline_exceeded', error=f'Exceeded {budget.deadline_seconds}s deadline')
+            return
+
         debug(result)
+        stats = deps.validation_stats
+        recorder.write_report('completed', extra={
+            'validation_checks': stats.checks,
+            'validation_passed': stats.passed,
+            'validation_retries': stats.retries,
+            'round_trips_saved': stats.round_trips_saved,
+        })
+        print(
+            f'\nUsage: {result.usage()}'
+            f'\nValidation checks run locally: {stats.checks} ({stats.passed} passed, {stats.retries} retries requested)'
+            f'\nModel round trips saved: {stats.round_trips_saved}'
+        )
         print('\nREPORT:', result.data.summary)
 
 
@@ -0,0 +1,66 @@
+"""Benchmark for the local PDF extraction backend.
+
+Measures pages/sec for increasing page counts of the same PDF, serially and
+with the process pool, and optionally against LlamaParse.
+
+Usage:
+
+    python bench_pdf_extract.py annual-report.pdf --pages 5 20 50 100 --workers 1 4 8
+    python bench_pdf_extract.py annual-report.pdf --pages 20 --llamaparse
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from local_pdf import count_pages, iter_pdf_pages
+
+def bench_local(pdf_path: str, page_count: int, workers: int) -> dict:
+    """Times local extraction of the first `page_count` pages"""
+    start = time.perf_counter()
+    first_page_at = None
+    pages = 0
+    for _ in iter_pdf_pages(pdf_path, max_workers=workers, page_limit=page_count):
+        if first_page_at is None:
+            first_page_at = time.perf_counter() - start
+        pages += 1
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "seconds": elapsed, "first_page_seconds": first_page_at or 0.0}
+
+def bench_llamaparse(pdf_path: str) -> dict:
+    """Times LlamaParse on the whole PDF"""
+    from llama_cloud_services import LlamaParse
+
+    parser = LlamaParse(api_key=os.getenv("LLAMA_API_KEY", ""), result_type="markdown")
+    start = time.perf_counter()
+    documents = asyncio.run(parser.aload_data(pdf_path))
+    return {"pages": len(documents), "seconds": time.perf_counter() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local PDF extraction throughput")
+    parser.add_argument("pdf", help="PDF file to extract")
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 50, 100], help="Page counts to benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="Worker counts to compare")
+    parser.add_argument("--llamaparse", action="store_true", help="Also time LlamaParse on the whole PDF")
+    args = parser.parse_args()
+
+    total_pages = count_pages(args.pdf)
+    print(f"{args.pdf}: {total_pages} pages, {os.cpu_count()} cores\n")
+    print(f"{'pages':>6} {'workers':>8} {'seconds':>9} {'first page':>11} {'pages/sec':>10}")
+    for page_count in args.pages:
+        if page_count > total_pages:
+            print(f"{page_count:>6} skipped, the PDF only has {total_pages} pages")
+            continue
+        for workers in args.workers:
+            result = bench_local(args.pdf, page_count, workers)
+            print(
+                f"{result['pages']:>6} {workers:>8} {result['seconds']:>9.2f} "
+                f"{result['first_page_seconds']:>11.2f} {result['pages'] / result['seconds']:>10.1f}"
+            )
+
+    if args.llamaparse:
+        result = bench_llamaparse(args.pdf)
+        print(f"\nLlamaParse: {result['pages']} pages in {result['seconds']:.2f}s ({result['pages'] / result['seconds']:.1f} pages/sec)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Offline benchmark of the finance pipeline from a recorded cassette.
+
+Record a cassette once against the live services:
+
+    AGENT_CASSETTE=runs/cassette.jsonl AGENT_CASSETTE_MODE=record python batch_research.py companies.jsonl
+
+Then replay it as often as needed, without network access:
+
+    python bench_replay.py runs/cassette.jsonl companies.jsonl --runs 5 --timing instant --concurrency 2
+
+With --timing instant the measured time is the pipeline's own overhead (graph
+execution, checkpointing, parsing, blob storage); with --timing original it
+includes the recorded model and tool latencies.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded finance pipeline run and time it")
+    parser.add_argument("cassette", help="Cassette recorded with AGENT_CASSETTE_MODE=record")
+    parser.add_argument("companies", help="The companies file the cassette was recorded with")
+    parser.add_argument("--runs", type=int, default=3, help="Number of times to replay the batch")
+    parser.add_argument("--timing", choices=["instant", "original"], default="instant", help="Replay latency")
+    parser.add_argument("--concurrency", type=int, default=1, help="Companies replayed at the same time")
+    args = parser.parse_args()
+
+    # The cassette and settings are read when finance_agent is imported
+    os.environ["AGENT_CASSETTE"] = args.cassette
+    os.environ["AGENT_CASSETTE_MODE"] = "replay"
+    os.environ["AGENT_REPLAY_TIMING"] = args.timing
+    if args.timing == "instant":
+        os.environ.setdefault("BEDROCK_REQUESTS_PER_SECOND", "1000")
+        os.environ.setdefault("BEDROCK_MAX_BURST", "1000")
+    os.environ.setdefault("RESEARCH_CHECKPOINT_DB", os.path.join(tempfile.mkdtemp(), "bench_runs.sqlite"))
+
+    from batch_research import load_companies
+    from finance_agent import build_research_request, start_run
+
+    companies = load_companies(args.companies)
+
+    def research(entry: dict) -> dict:
+        return start_run(build_research_request(entry["company"], entry["urls"]), run_id=f"bench-{uuid.uuid4().hex[:8]}")
+
+    timings = []
+    input_tokens = output_tokens = cache_read_tokens = 0
+    analyst_latencies = defaultdict(list)
+    for run in range(args.runs):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(research, companies))
+        timings.append(time.perf_counter() - start)
+        for result in results:
+            for name, usage in result.get("analyst_usage", {}).items():
+                analyst_latencies[name].append(usage.get("latency_seconds", 0))
+                input_tokens += usage["input_tokens"]
+                output_tokens += usage["output_tokens"]
+                cache_read_tokens += usage["cache_read_tokens"]
+        print(f"run {run + 1}: {timings[-1]:.3f}s for {len(companies)} companies")
+
+    print(f"\nmean {statistics.mean(timings):.3f}s, median {statistics.median(timings):.3f}s, "
+          f"{len(companies) * 3600 / statistics.mean(timings):.0f} companies/hour")
+    print(f"analyst tokens per run: {input_tokens // args.runs} input, {output_tokens // args.runs} output, "
+          f"{cache_read_tokens // args.runs} read from cache")
+    print("\nmean analyst latency:")
+    for name, latencies in analyst_latencies.items():
+        print(f"  {name:<28}{statistics.mean(latencies):.3f}s")
+
+if __name__ == "__main__":
+    main()
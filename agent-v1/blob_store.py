@@ -0,0 +1,113 @@
+"""Content-addressed store for large tool payloads.
+
+Crawled pages and parsed PDFs are written once to local files named by their
+SHA-256, and graph state only carries small handles to them. Handles record
+the byte range of every markdown section, so a consumer that only needs a few
+sections reads just those ranges through a memory map instead of loading and
+copying the whole payload.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+from typing import Callable, Iterable, Optional
+
+# Tool results stored in the blob store are replaced by this text in ToolMessages
+HANDLE_PATTERN = re.compile(r"^\[blob (\{.*\})\]$", re.DOTALL)
+
+def is_blob_ref(value) -> bool:
+    return isinstance(value, dict) and "blob" in value
+
+def _write_atomic(path: str, data: bytes):
+    """Writes through a temporary file unique to this call, so concurrent writers never share one"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+class BlobStore:
+    """Stores text payloads under `root`, deduplicated by content hash"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv("RESEARCH_BLOB_DIR", ".research_blobs")
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, content: str) -> dict:
+        """Stores a payload and returns its handle.
+
+        Returns:
+            {"blob": sha256, "size": bytes, "sections": [[heading, start, end], ...]}
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, data)
+        return {"blob": digest, "size": len(data), "sections": self._index_sections(data)}
+
+    @staticmethod
+    def _index_sections(data: bytes) -> list:
+        """Byte ranges of the markdown sections, each starting at a heading line"""
+        starts = [(0, "")]
+        offset = 0
+        for line in data.splitlines(keepends=True):
+            if line.startswith(b"#"):
+                heading = line.decode("utf-8", errors="replace").lstrip("#").strip()
+                starts.append((offset, heading))
+            offset += len(line)
+        sections = []
+        for index, (start, heading) in enumerate(starts):
+            end = starts[index + 1][0] if index + 1 < len(starts) else len(data)
+            if end > start:
+                sections.append([heading, start, end])
+        return sections
+
+    def _read(self, digest: str, ranges: Iterable[tuple]) -> str:
+        path = self._path(digest)
+        if os.path.getsize(path) == 0:
+            return ""
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return "".join(data[start:end].decode("utf-8", errors="replace") for start, end in ranges)
+
+    def get(self, ref: dict, section_filter: Optional[Callable[[str], bool]] = None) -> str:
+        """Loads a payload, or only the sections whose heading passes `section_filter`"""
+        if section_filter is None:
+            return self._read(ref["blob"], [(0, ref["size"])])
+        return self._read(ref["blob"], [(start, end) for heading, start, end in ref["sections"] if section_filter(heading)])
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.root, "keys", key[:2], f"{key[2:]}.json")
+
+    def link(self, key: str, ref: dict):
+        """Records `ref` under a caller-chosen key, e.g. a hash of the input a payload was derived from"""
+        _write_atomic(self._key_path(key), json.dumps(ref).encode("utf-8"))
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """The handle linked to `key`, or None"""
+        try:
+            with open(self._key_path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def handle_text(ref: dict) -> str:
+        """Short stand-in for a stored payload, used as ToolMessage content"""
+        return f"[blob {json.dumps(ref)}]"
+
+    @staticmethod
+    def parse_handle(text) -> Optional[dict]:
+        """The handle in a ToolMessage content, or None if the content is not a handle"""
+        match = HANDLE_PATTERN.match(text) if isinstance(text, str) else None
+        return json.loads(match.group(1)) if match else None
+
+blob_store = BlobStore()
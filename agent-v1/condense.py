@@ -0,0 +1,107 @@
+"""Map-reduce condensation of oversized tool payloads.
+
+Annual reports and long pages can exceed what fits in a prompt, or make every
+request that carries them slow. Payloads over a token budget are split into
+chunks, the chunks are summarized concurrently (map), and the summaries are
+merged in groups until the result fits the budget (reduce). Results are
+cached in the blob store by a hash of the input, so the same filing is only
+condensed once.
+"""
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import List
+
+from blob_store import BlobStore
+from dedup import estimate_tokens
+from report_stream import message_text
+
+logger = logging.getLogger('condense')
+
+CHUNK_TOKENS = int(os.getenv("RESEARCH_CONDENSE_CHUNK_TOKENS", "8000"))
+MAX_CONCURRENCY = int(os.getenv("RESEARCH_CONDENSE_CONCURRENCY", "4"))
+MERGE_FAN_IN = 6
+MIN_SUMMARY_TOKENS = 300
+# Bump when the prompts change, so cached condensations are not reused
+PROMPT_VERSION = "1"
+
+MAP_PROMPT = """Condense this excerpt of a company filing or web page for an equity research team.
+Keep every figure with its period and unit, segment and product details, guidance, and management commentary on the business.
+Drop boilerplate, legal text and repetition. Keep tables as markdown tables.
+Use at most {words} words and reply with the condensed text only.
+
+{text}"""
+
+REDUCE_PROMPT = """Merge these condensed excerpts of the same source into one condensed text for an equity research team.
+Keep every figure with its period and unit, and remove repetition between the excerpts.
+Use at most {words} words and reply with the merged text only.
+
+{text}"""
+
+def split_into_chunks(text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Packs paragraphs into chunks of about `chunk_tokens`; longer paragraphs are cut by length"""
+    max_chars = chunk_tokens * 4
+    chunks, current, current_chars = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        pieces = [paragraph[i:i + max_chars] for i in range(0, len(paragraph), max_chars)] or [""]
+        for piece in pieces:
+            if current and current_chars + len(piece) > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_chars = [], 0
+            current.append(piece)
+            current_chars += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+class Condenser:
+    """Condenses text to a token budget with an LLM, caching results in a blob store.
+
+    Args:
+        model: LangChain chat model used for the map and reduce prompts
+        store: Blob store holding the condensed results
+    """
+
+    def __init__(self, model, store: BlobStore, chunk_tokens: int = CHUNK_TOKENS, max_concurrency: int = MAX_CONCURRENCY):
+        self.model = model
+        self.store = store
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+
+    def _run(self, template: str, texts: List[str], budget_tokens: int) -> List[str]:
+        words = max(MIN_SUMMARY_TOKENS, budget_tokens) * 3 // 4
+        prompts = [template.format(words=words, text=text) for text in texts]
+        responses = self.model.batch(prompts, config={"max_concurrency": self.max_concurrency})
+        return [message_text(response.content) for response in responses]
+
+    def condense(self, text: str, max_tokens: int) -> str:
+        """Returns `text` unchanged if it fits in `max_tokens`, otherwise a condensed version"""
+        tokens = estimate_tokens(text)
+        if tokens <= max_tokens:
+            return text
+
+        key = hashlib.sha256(f"{PROMPT_VERSION}:{max_tokens}:{text}".encode("utf-8")).hexdigest()
+        ref = self.store.lookup(key)
+        if ref is not None:
+            logger.info(f"♻️ Reusing condensed payload ({tokens} → {estimate_tokens(self.store.get(ref))} tokens)")
+            return self.store.get(ref)
+
+        start = time.perf_counter()
+        chunks = split_into_chunks(text, self.chunk_tokens)
+        # Each chunk gets its share of the budget, so the summaries usually fit without a reduce step
+        summaries = self._run(MAP_PROMPT, chunks, max_tokens // len(chunks))
+        levels = 0
+        while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > max_tokens:
+            groups = [summaries[i:i + MERGE_FAN_IN] for i in range(0, len(summaries), MERGE_FAN_IN)]
+            summaries = self._run(REDUCE_PROMPT, ["\n\n---\n\n".join(group) for group in groups], max_tokens // len(groups))
+            levels += 1
+
+        condensed = "\n\n".join(summaries)
+        self.store.link(key, self.store.put(condensed))
+        logger.info(
+            f"🗜️ Condensed {tokens} → {estimate_tokens(condensed)} tokens from {len(chunks)} chunks "
+            f"with {levels} merge levels in {time.perf_counter() - start:.1f}s"
+        )
+        return condensed
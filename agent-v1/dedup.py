@@ -0,0 +1,141 @@
+"""Near-duplicate and boilerplate elimination across collected sources.
+
+The same numbers and passages often appear in both the crawled page and the
+parsed PDF, and crawl markdown repeats navigation and footer blocks. Sources
+are split into paragraph chunks, each chunk gets a 64-bit SimHash fingerprint
+over its word shingles, and a chunk is dropped when it is boilerplate or lies
+within a small Hamming distance of a chunk that was already kept. Every kept
+chunk records where it came from and which dropped chunks it stands in for.
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('dedup')
+
+SHINGLE_SIZE = 3
+MAX_HAMMING_DISTANCE = 3
+MIN_CHUNK_WORDS = 4
+MAX_LINK_RATIO = 0.5
+
+_LINK_PATTERN = re.compile(r"!?\[[^\]]*\]\([^)]*\)")
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+@dataclass
+class Chunk:
+    source: str
+    index: int
+    text: str
+    duplicates: List[str] = field(default_factory=list)
+
+    @property
+    def provenance(self) -> str:
+        return f"{self.source}:{self.index}"
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4
+
+def _is_heading(paragraph: str) -> bool:
+    return all(line.lstrip().startswith("#") for line in paragraph.splitlines())
+
+def split_chunks(text: str) -> List[str]:
+    """Splits text into paragraph chunks; tables and lists stay whole.
+
+    Headings are joined to the chunk that follows them, so a short heading is
+    never dropped as boilerplate on its own and kept tables and paragraphs keep
+    their section labels.
+    """
+    chunks = []
+    headings = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if _is_heading(paragraph):
+            headings.append(paragraph)
+            continue
+        chunks.append("\n\n".join(headings + [paragraph]))
+        headings = []
+    if headings:
+        chunks.append("\n\n".join(headings))
+    return chunks
+
+def _normalize(text: str) -> List[str]:
+    text = _LINK_PATTERN.sub(" ", text)
+    return re.findall(r"[a-z0-9]+(?:[.,][0-9]+)*%?", text.lower())
+
+def is_boilerplate(text: str) -> bool:
+    """Navigation, footer and other blocks with too few words or mostly links"""
+    words = _normalize(text)
+    if len(words) < MIN_CHUNK_WORDS:
+        return True
+    link_chars = sum(len(match) for match in _LINK_PATTERN.findall(text))
+    return link_chars / len(text) > MAX_LINK_RATIO
+
+def simhash(words: List[str]) -> np.uint64:
+    """64-bit SimHash of a chunk's word shingles"""
+    shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    # One row per shingle, one column per bit; bits vote +1/-1 and the sign gives the fingerprint bit
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int64)
+    votes = (2 * bits - 1).sum(axis=0)
+    return np.uint64(((votes > 0).astype(np.uint64) << _BIT_SHIFTS).sum())
+
+def hamming_distances(fingerprint: np.uint64, fingerprints: np.ndarray) -> np.ndarray:
+    """Hamming distance from one fingerprint to each of `fingerprints`"""
+    xor = np.bitwise_xor(fingerprints, fingerprint)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def deduplicate(sources: List[Tuple[str, str]]) -> Tuple[List[Chunk], Dict[str, int]]:
+    """Removes boilerplate and near-duplicate chunks across sources.
+
+    Args:
+        sources: (source name, text) pairs; earlier sources win when chunks collide
+    Returns:
+        The kept chunks in source order, and statistics on what was removed
+    """
+    kept: List[Chunk] = []
+    fingerprints = np.empty(0, dtype=np.uint64)
+    stats = {"chunks_in": 0, "boilerplate": 0, "near_duplicates": 0, "tokens_in": 0}
+
+    for source, text in sources:
+        for index, chunk_text in enumerate(split_chunks(text)):
+            stats["chunks_in"] += 1
+            stats["tokens_in"] += estimate_tokens(chunk_text)
+            if is_boilerplate(chunk_text):
+                stats["boilerplate"] += 1
+                continue
+            chunk = Chunk(source, index, chunk_text)
+            fingerprint = simhash(_normalize(chunk_text))
+            if len(fingerprints):
+                distances = hamming_distances(fingerprint, fingerprints)
+                nearest = int(distances.argmin())
+                if distances[nearest] <= MAX_HAMMING_DISTANCE:
+                    kept[nearest].duplicates.append(chunk.provenance)
+                    stats["near_duplicates"] += 1
+                    continue
+            kept.append(chunk)
+            fingerprints = np.append(fingerprints, fingerprint)
+
+    stats["chunks_out"] = len(kept)
+    stats["tokens_out"] = sum(estimate_tokens(chunk.text) for chunk in kept)
+    return kept, stats
+
+def render_corpus(chunks: List[Chunk]) -> str:
+    """Renders kept chunks as markdown grouped by source"""
+    parts = []
+    source = None
+    for chunk in chunks:
+        if chunk.source != source:
+            source = chunk.source
+            parts.append(f"### Source: {source}")
+        parts.append(chunk.text)
+    return "\n\n".join(parts)
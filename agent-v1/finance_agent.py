@@ -1,10 +1,12 @@
 from typing import Annotated, List, Optional
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_aws import ChatBedrock
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
 import asyncio
 import serpapi
@@ -13,8 +15,31 @@ import aiohttp
 import tempfile
 import os
 import logging
+import threading
+import functools
+import inspect
+import sqlite3
+import uuid
+import argparse
+import re
+import sys
+import json
+import time
+from urllib.parse import urlparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
 from llama_cloud_services import LlamaParse
 from IPython.display import Image, display
+from local_pdf import extract_pdf
+from blob_store import blob_store
+from replay import active_cassette, cassette_tool, CassetteBedrockClient
+from report_stream import ReportWriter, format_section, message_text
+from financial_tables import parse_financial_tables, compute_metrics, format_metrics, strip_tables, is_statement_heading
+from dedup import deduplicate, render_corpus, estimate_tokens
+from condense import Condenser
+from analysts import ANALYSTS, MODEL_TIERS, AnalystSpec
 
 # Configure logging
 logging.basicConfig(
@@ -27,7 +52,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger('research_agent')
 
+### Tool cache
+# Sources are shared between runs in the same process (e.g. batch mode), so each
+# URL is fetched once. In-flight calls are shared too: a second caller waits on
+# the first caller's future instead of fetching the same URL concurrently.
+_tool_cache = {}
+_tool_cache_lock = threading.Lock()
+
+def _is_tool_error(result) -> bool:
+    """Tools report failures as strings, which must not be cached"""
+    return isinstance(result, str) and result.startswith(("Error", "Failed"))
+
+def cached_tool(func):
+    """Memoizes a tool by name and arguments for the lifetime of the process"""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Positional and keyword calls (prefetch vs. ToolNode) share an entry
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__, tuple(bound.arguments.items()))
+        with _tool_cache_lock:
+            future = _tool_cache.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = _tool_cache[key] = Future()
+        if not is_owner:
+            logger.info(f"♻️ Reusing cached {func.__name__} result")
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            with _tool_cache_lock:
+                _tool_cache.pop(key, None)
+            future.set_exception(e)
+            raise
+        if _is_tool_error(result):
+            with _tool_cache_lock:
+                _tool_cache.pop(key, None)
+        future.set_result(result)
+        return result
+    return wrapper
+
 ### Tools
+@cached_tool
+@cassette_tool
 def crawl_webpage(url: str) -> str:
     """Crawls a webpage and returns its content.
     
@@ -51,11 +122,16 @@ def crawl_webpage(url: str) -> str:
     finally:
         loop.close()
 
-async def parse_pdf(pdf_url: str) -> str:
+# PDF extraction backend: "llamaparse" (remote service) or "local" (see local_pdf.py).
+# Can be overridden per run with config["configurable"]["pdf_backend"].
+PDF_BACKEND = os.getenv("PDF_BACKEND", "llamaparse")
+
+async def parse_pdf(pdf_url: str, backend: str = PDF_BACKEND) -> str:
     """Parses a PDF from a URL and returns its content.
     
     Args:
         pdf_url (str): URL of the PDF to parse
+        backend (str): "llamaparse" or "local"
     """
     try:
         with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
@@ -67,8 +143,12 @@ async def parse_pdf(pdf_url: str) -> str:
                     temp_file.write(content)
                     temp_file_path = temp_file.name
 
+            if backend == "local":
+                parsed_content = await asyncio.to_thread(extract_pdf, temp_file_path)
+                return parsed_content if parsed_content else "No content parsed from PDF"
+
             parser = LlamaParse(
-                api_key="",
+                api_key=os.getenv("LLAMA_API_KEY", ""),
                 result_type="markdown"
             )
             parsed_content = await parser.aload_data(temp_file_path)
@@ -84,14 +164,25 @@ async def parse_pdf(pdf_url: str) -> str:
             except Exception as cleanup_error:
                 logger.error(f"Error cleaning up temporary file: {str(cleanup_error)}")
 
-def sync_parse_pdf(pdf_url: str) -> str:
+@cached_tool
+@cassette_tool
+def _sync_parse_pdf(pdf_url: str, backend: str) -> str:
     """Synchronous wrapper for parse_pdf function"""
     loop = asyncio.new_event_loop()
     try:
-        return loop.run_until_complete(parse_pdf(pdf_url))
+        return loop.run_until_complete(parse_pdf(pdf_url, backend))
     finally:
         loop.close()
 
+def sync_parse_pdf(pdf_url: str, config: RunnableConfig) -> str:
+    """Parses a PDF from a URL and returns its content.
+    
+    Args:
+        pdf_url: URL of the PDF to parse
+    """
+    backend = config.get("configurable", {}).get("pdf_backend", PDF_BACKEND)
+    return _sync_parse_pdf(pdf_url, backend)
+
 def web_search(query: str) -> str:
     """Performs a web search using SerpAPI.
     
@@ -135,59 +226,273 @@ class ResearchState(MessagesState):
     risk_analysis: Optional[list] = None
     investment_recommendation: Optional[list] = None
     final_report: Optional[str] = None
+    analyst_usage: Annotated[dict, merge_dicts] = {}  # Token usage and latency per analyst
 
 ### LLM Setup
-llm = ChatBedrock(
-    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-    model_kwargs=dict(temperature=0),
+# One limiter for every Bedrock call in the process, so concurrent runs share
+# the account's request rate instead of each throttling independently
+bedrock_rate_limiter = InMemoryRateLimiter(
+    requests_per_second=float(os.getenv("BEDROCK_REQUESTS_PER_SECOND", "1")),
+    check_every_n_seconds=0.1,
+    max_bucket_size=int(os.getenv("BEDROCK_MAX_BURST", "2")),
 )
 
-# Bind tools to LLM
-tools = [crawl_webpage, sync_parse_pdf]
+def make_llm(model_id: str, **model_kwargs) -> ChatBedrock:
+    """Bedrock chat model sharing the process-wide rate limiter"""
+    # The Converse API is what accepts cachePoint content blocks
+    model = ChatBedrock(
+        model_id=model_id,
+        model_kwargs=dict(temperature=0, **model_kwargs),
+        beta_use_converse_api=True,
+        rate_limiter=bedrock_rate_limiter,
+    )
+    # With AGENT_CASSETTE set, Converse calls are recorded or replayed (see replay.py).
+    # Streaming calls can't be recorded, so streaming is turned off.
+    if active_cassette is not None:
+        model.client = CassetteBedrockClient(model.client, active_cassette)
+        model.disable_streaming = True
+    return model
+
+llm = make_llm(MODEL_TIERS["large"])
+
+@functools.lru_cache(maxsize=None)
+def analyst_llm(model_tier: str, max_tokens: int) -> ChatBedrock:
+    """The model for an analyst's tier and output limit, shared by analysts with the same settings"""
+    return make_llm(MODEL_TIERS[model_tier], max_tokens=max_tokens)
+
+# Payloads over these budgets (estimated tokens) are condensed before they are put
+# into prompts: per source for the data collector, and the whole analyst context
+SOURCE_TOKEN_BUDGET = int(os.getenv("RESEARCH_SOURCE_TOKENS", "40000"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RESEARCH_CONTEXT_TOKENS", "100000"))
+condenser = Condenser(llm, blob_store)
+
+# Bind tools to LLM. They are bound as LangChain tools so that the RunnableConfig
+# argument of sync_parse_pdf is injected at call time and left out of the schema
+# the model sees.
+tool_functions = [crawl_webpage, sync_parse_pdf]
+tools = [tool(func) for func in tool_functions]
 llm_with_tools = llm.bind_tools(tools)
 
+def stored_tool(func):
+    """Stores a tool's result in the blob store, returning a small handle in its place.
+    
+    Keeps large payloads out of the ToolMessages in graph state; data_collector expands
+    the handles again when it sends the messages to the LLM.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if _is_tool_error(result):
+            return result
+        return blob_store.handle_text(blob_store.put(str(result)))
+    return wrapper
+
+### Context handling
+# Tool payloads live in the blob store; context["tool_responses"] maps each tool
+# name to a list of blob handles, one per call.
+def add_tool_response(tool_responses: dict, name: str, ref: dict) -> dict:
+    """Adds a tool result handle, keeping earlier results of the same tool"""
+    return {**tool_responses, name: tool_responses.get(name, []) + [ref]}
+
+def load_tool_response(tool_responses: dict, name: str, section_filter=None) -> str:
+    """Loads the results of a tool, optionally only the sections whose heading passes `section_filter`"""
+    return "\n\n".join(blob_store.get(ref, section_filter) for ref in tool_responses.get(name, []))
+
+# Bookkeeping kept in the context for reports and debugging, not shown to analysts
+NON_PROMPT_CONTEXT_KEYS = {"corpus_provenance", "dedup_stats", "prefetched_urls"}
+
+def render_sources(tool_responses: dict) -> str:
+    """Renders stored tool payloads for the data collector, condensing oversized ones"""
+    return "\n\n".join(
+        f"## {name}\n{condenser.condense(blob_store.get(ref), SOURCE_TOKEN_BUDGET)}"
+        for name, refs in tool_responses.items()
+        for ref in refs
+    )
+
+def render_context(context: dict) -> str:
+    """Renders the research context as prompt text, loading stored tool payloads.
+
+    Once the sources are deduplicated, the deduplicated corpus replaces the raw tool responses.
+    """
+    parts = []
+    for key, value in context.items():
+        if key in NON_PROMPT_CONTEXT_KEYS or (key == "tool_responses" and "corpus" in context):
+            continue
+        if key == "corpus":
+            parts.append(f"## sources\n{blob_store.get(value)}")
+        elif key == "tool_responses":
+            for name in value:
+                parts.append(f"## {name}\n{load_tool_response(value, name)}")
+        else:
+            parts.append(f"## {key}\n{value}")
+    return "\n\n".join(parts)
+
+### Analyst prompt layout
+# All analysts share the system prompt and the collected context, and only the
+# trailing instructions differ. Keeping the shared part first and ending it with
+# a cache point lets Bedrock reuse the processed prefix across analysts, so the
+# full context is paid for once per report instead of once per analyst.
+ANALYST_SYSTEM_PROMPT = """You are part of an equity research team writing one section of an investment report.
+The research data collected for the company is provided first, followed by the instructions for your section.
+Only use facts present in the research data."""
+
+CACHE_POINT = {"type": "cachePoint", "cachePoint": {"type": "default"}}
+
+def build_analyst_messages(context: dict, instructions: str) -> list:
+    """Builds analyst messages with the shared, cacheable prefix first.
+    
+    Args:
+        context: The collected research context shared by all analysts
+        instructions: The analyst-specific instructions
+    """
+    return [
+        SystemMessage(content=ANALYST_SYSTEM_PROMPT),
+        HumanMessage(content=[
+            {"type": "text", "text": f"Research data:\n{render_context(context)}"},
+            CACHE_POINT,
+            {"type": "text", "text": instructions},
+        ]),
+    ]
+
+def get_token_usage(response: AIMessage) -> dict:
+    """Extracts input, output and cache token counts from a Bedrock response"""
+    usage_metadata = response.usage_metadata or {}
+    details = usage_metadata.get("input_token_details", {})
+    raw_usage = response.response_metadata.get("usage", {})
+    return {
+        "input_tokens": usage_metadata.get("input_tokens", 0),
+        "output_tokens": usage_metadata.get("output_tokens", 0),
+        "cache_read_tokens": details.get("cache_read", raw_usage.get("cacheReadInputTokens", 0)),
+        "cache_write_tokens": details.get("cache_creation", raw_usage.get("cacheWriteInputTokens", 0)),
+    }
+
+def analyst_context(spec: AnalystSpec, context: dict) -> dict:
+    """The part of the research context an analyst sees"""
+    if spec.context_keys is None:
+        return context
+    return {key: value for key, value in context.items() if key in spec.context_keys}
+
+def invoke_analyst(spec: AnalystSpec, state: ResearchState):
+    """Runs an analyst prompt against the shared context and reports its token usage and latency"""
+    messages = build_analyst_messages(analyst_context(spec, state["context"]), spec.instructions)
+    start = time.perf_counter()
+    response = analyst_llm(spec.model_tier, spec.max_tokens).invoke(messages)
+    usage = {
+        **get_token_usage(response),
+        "model_tier": spec.model_tier,
+        "latency_seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(
+        f"🧮 {spec.name} ({spec.model_tier}): {usage['latency_seconds']}s, {usage['input_tokens']} input tokens, "
+        f"{usage['cache_read_tokens']} read from cache, {usage['cache_write_tokens']} written to cache"
+    )
+    return response, {spec.name: usage}
+
+def format_analyst_usage(analyst_usage: dict) -> str:
+    """One line per analyst with its tier, latency and tokens, for tuning the model tiers"""
+    lines = []
+    for spec in ANALYSTS:
+        usage = analyst_usage.get(spec.name)
+        if usage:
+            lines.append(
+                f"{spec.name:<28}{usage.get('model_tier', 'large'):<7}{usage.get('latency_seconds', 0):>8.1f}s"
+                f"{usage['input_tokens']:>9} in{usage['output_tokens']:>7} out"
+            )
+    return "\n".join(lines)
+
 ### Nodes
+URL_PATTERN = re.compile(r"https?://[^\s'\"<>]+")
+
+def is_pdf_url(url: str) -> bool:
+    """Classifies a source URL as a PDF (parsed) or a web page (crawled)"""
+    return urlparse(url).path.lower().endswith(".pdf")
+
+def prefetch_sources(state: ResearchState, config: RunnableConfig):
+    """Fetches every source listed in the request concurrently, before the LLM sees it"""
+    urls = []
+    for msg in state["messages"]:
+        if not isinstance(msg, HumanMessage):
+            continue
+        for url in URL_PATTERN.findall(msg.content):
+            url = url.rstrip(".,)")
+            if url not in urls:
+                urls.append(url)
+    if not urls:
+        logger.info("No source URLs in the request, leaving collection to the LLM")
+        return {}
+
+    logger.info(f"⚡ Prefetching {len(urls)} sources")
+    backend = config.get("configurable", {}).get("pdf_backend", PDF_BACKEND)
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        futures = {
+            url: executor.submit(_sync_parse_pdf, url, backend) if is_pdf_url(url) else executor.submit(crawl_webpage, url)
+            for url in urls
+        }
+
+    tool_responses = {}
+    prefetched_urls = []
+    for url, future in futures.items():
+        name = "sync_parse_pdf" if is_pdf_url(url) else "crawl_webpage"
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Error prefetching {url}: {str(e)}")
+            continue
+        if _is_tool_error(result):
+            logger.warning(f"Could not prefetch {url}: {result}")
+            continue
+        tool_responses = add_tool_response(tool_responses, name, blob_store.put(str(result)))
+        prefetched_urls.append(url)
+
+    logger.info(f"✅ Prefetched {len(prefetched_urls)}/{len(urls)} sources")
+    return {"context": {"tool_responses": tool_responses, "prefetched_urls": prefetched_urls}}
+
 def data_collector(state: ResearchState):
     """Initial node that collects all data from tools once"""
     logger.info("🔄 Starting data collection node")
     logger.info(state["messages"])
-    sys_msg = SystemMessage(content="""You are a data collection assistant. 
-    Use the tools to gather information about Time Technoplast:
-    1. Use parse_pdf to extract information from the earnings transcript
-    2. Use crawl_webpage to get financial data from screener.in
+    prefetched = state.get("context", {}).get("tool_responses", {})
+    prefetched_urls = state.get("context", {}).get("prefetched_urls", [])
+    prompt = """You are a data collection assistant. 
+    Use the tools to gather information about the company in the request:
+    1. Use sync_parse_pdf to extract information from the PDF sources (e.g. earnings transcripts)
+    2. Use crawl_webpage to get financial data from the web sources (e.g. screener.in)
     
     IMPORTANT: After you have used both tools and gathered all the information, 
-    provide a comprehensive summary of all collected data. Do not use any more tools after summarizing.""")
+    provide a comprehensive summary of all collected data. Do not use any more tools after summarizing."""
+    if prefetched:
+        # Sources were fetched up front; the LLM only fills gaps, so collection is usually one call
+        prompt += f"""
+    
+    These sources have already been fetched, do not fetch them again: {", ".join(prefetched_urls)}
+    Only use tools for sources in the request that are missing below. If nothing is missing, summarize right away.
+    
+    Already fetched data:
+    {render_sources(prefetched)}"""
+    sys_msg = SystemMessage(content=prompt)
+    
+    # Tool results are stored as blob handles in state; expand them for the LLM only
+    messages = []
+    for msg in state["messages"]:
+        ref = blob_store.parse_handle(msg.content) if isinstance(msg, ToolMessage) else None
+        if ref:
+            msg = msg.model_copy(update={"content": condenser.condense(blob_store.get(ref), SOURCE_TOKEN_BUDGET)})
+        messages.append(msg)
     
     # Return just the LLM response - tools will be handled by the graph structure
-    response = llm_with_tools.invoke([sys_msg] + state["messages"])
+    response = llm_with_tools.invoke([sys_msg] + messages)
     
-    # Store the collected data in context if it's a summary (not a tool call)
-    if not response.additional_kwargs.get('tool_calls'):
+    # Store the collected data in context if it's a summary (not a tool call).
+    # The Converse API only reports tool calls in AIMessage.tool_calls.
+    if not response.tool_calls:
         logger.info("✅ Data collection complete, moving to analysis")
         
-        # Collect all tool responses
-        tool_responses = {}
-        count_parse_pdf = 0
-        count_crawl = 0
+        # Combine prefetched sources with anything the LLM fetched to fill gaps
+        tool_responses = prefetched
         for msg in state["messages"]:
-            if hasattr(msg, 'name') and hasattr(msg, 'content'):  # Check if it's a tool message
-                tool_responses[msg.name] = msg.content
-                print(msg.name)
-                if msg.name == 'crawl_webpage':
-                    count_crawl = 1
-                if msg.name == 'sync_parse_pdf':
-                    count_parse_pdf = 1
-                if count_crawl>0 and count_parse_pdf>0:
-                    print('here count crawl parse pdf')
-                    return {
-                        "messages": [response],
-                        "context": {
-                            "tool_responses": tool_responses,  # Raw tool data
-                            "collected_data": response.content  # LLM's summary
-                        }
-                    }
-                    
+            if isinstance(msg, ToolMessage):
+                ref = blob_store.parse_handle(msg.content) or blob_store.put(str(msg.content))
+                tool_responses = add_tool_response(tool_responses, msg.name, ref)
         
         return {
             "messages": [response],
@@ -200,320 +505,88 @@ def data_collector(state: ResearchState):
     logger.info("🔧 Using tools to collect data")
     return {"messages": [response]}
 
-def company_info_analyst(state: ResearchState):
-    """Analyzes basic company information"""
-    logger.info("🏢 Starting company info analysis")
-    sys_msg = SystemMessage(content="""You are a specialized company information analyst. Analyze the provided data and create a structured overview of the company with these specific sections:
-
-1. Company Background
-   - Year founded
-   - Key milestones
-   - Corporate structure
-
-2. Core Business Areas
-   - Main product lines
-   - Key technologies/patents
-   - Manufacturing facilities
-
-3. Geographic Presence
-   - Key markets
-   - Distribution network
-   - Export presence
-
-4. Management Overview
-   - Key management personnel
-   - Notable expertise
-
-Be precise and data-focused. Avoid generic statements. Use specific numbers and facts from the provided data.
-Limit your response to 500 words and maintain a professional analytical tone.""")
-    
-    # Pass both raw tool responses and the summary
-    context_data = {
-        "tool_responses": state["context"]["tool_responses"],
-        "summary": state["context"]["collected_data"]
+def financial_metrics_node(state: ResearchState):
+    """Parses the crawled financial tables and computes the standard metrics locally"""
+    logger.info("🧮 Computing financial metrics")
+    tool_responses = state["context"].get("tool_responses", {})
+    if not tool_responses.get("crawl_webpage"):
+        logger.warning("No crawled page to compute financial metrics from")
+        return {}
+
+    # Only the statement sections of the stored pages are read for parsing
+    tables = parse_financial_tables(load_tool_response(tool_responses, "crawl_webpage", is_statement_heading))
+    if not tables:
+        logger.warning("No financial tables found in the crawled page")
+        return {}
+
+    # Analysts get the compact metric tables instead of the parsed statement tables;
+    # every other table (growth rates, ratios, peers, shareholding) is kept as it is.
+    # Each statement was parsed from the first page that has it, so only that one is removed.
+    remaining = list(tables)
+    stripped = []
+    for ref in tool_responses["crawl_webpage"]:
+        markdown, removed = strip_tables(blob_store.get(ref), remaining)
+        remaining = [section for section in remaining if section not in removed]
+        stripped.append(blob_store.put(markdown) if removed else ref)
+    logger.info("✅ Financial metrics computed")
+    return {
+        "context": {
+            "financial_metrics": format_metrics(compute_metrics(tables)),
+            "tool_responses": {**tool_responses, "crawl_webpage": stripped},
+        }
     }
-    
-    messages = [sys_msg, HumanMessage(content=str(context_data))]
-    response = llm.invoke(messages)
-    logger.info("✅ Company info analysis complete")
-    return {"company_info": response.content}
-
-def business_model_analyst(state: ResearchState):
-    """Analyzes business model"""
-    logger.info("💼 Starting business model analysis")
-    sys_msg = SystemMessage(content="""You are a business model analysis specialist. Create a detailed analysis of the company's business model with these specific sections:
-
-1. Value Proposition
-   - Core offerings
-   - Customer segments
-   - Unique selling points
-
-2. Operational Structure
-   - Manufacturing process
-   - Supply chain overview
-   - Distribution channels
-
-3. Competitive Advantages
-   - Technology differentiators
-   - Cost advantages
-   - Market positioning
-
-4. Strategic Partnerships
-   - Key collaborations
-   - Integration with suppliers/customers
-
-Focus on quantifiable metrics where possible. Highlight specific examples that demonstrate the business model's effectiveness.
-Limit response to 500 words and maintain an analytical perspective.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Business model analysis complete")
-    return {"business_model": response.content}
-
-def revenue_analyst(state: ResearchState):
-    """Analyzes revenue sources"""
-    logger.info("💰 Starting revenue analysis")
-    sys_msg = SystemMessage(content="""You are a revenue analysis expert. Provide a comprehensive breakdown of the company's revenue structure:
-
-1. Revenue Segmentation
-   - Product-wise breakdown
-   - Geographic distribution
-   - Customer segment contribution
-
-2. Revenue Trends
-   - YoY growth rates
-   - Segment-wise growth
-   - Seasonal patterns
-
-3. Revenue Quality Analysis
-   - Revenue concentration
-   - Recurring vs one-time
-   - Contract nature (long-term/short-term)
-
-4. Pricing Power
-   - Pricing trends
-   - Margin analysis by segment
-
-Use specific numbers and percentages. Compare with historical data where available.
-Create clear insights about revenue sustainability and growth.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Revenue analysis complete")
-    return {"revenue_sources": response.content}
-
-def financial_analyst(state: ResearchState):
-    """Analyzes financial metrics"""
-    logger.info("📊 Starting financial metrics analysis")
-    sys_msg = SystemMessage(content="""You are a financial analysis expert. Conduct a thorough financial analysis with these specific sections:
-
-1. Profitability Metrics
-   - Gross margins and trends
-   - EBITDA margins
-   - Net profit margins
-   - Return ratios (ROE, ROCE)
-
-2. Balance Sheet Strength
-   - Working capital analysis
-   - Debt metrics and coverage
-   - Asset utilization ratios
-   - Capital structure
-
-3. Cash Flow Analysis
-   - Operating cash flow trends
-   - Free cash flow generation
-   - Cash conversion cycle
-   - Working capital management
-
-4. Key Financial Indicators
-   - Liquidity ratios
-   - Solvency metrics
-   - Efficiency ratios
-
-Present specific numbers, ratios, and their trends. Compare with industry standards where relevant.
-Highlight both strengths and areas of concern.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Financial analysis complete")
-    return {"financial_analysis": response.content}
-
-def growth_analyst(state: ResearchState):
-    """Analyzes growth triggers"""
-    logger.info("📈 Starting growth triggers analysis")
-    sys_msg = SystemMessage(content="""You are a growth analysis specialist. Identify and analyze key growth drivers:
-
-1. Organic Growth Drivers
-   - Market expansion opportunities
-   - Product development pipeline
-   - Capacity expansion plans
-   - Technology upgrades
-
-2. External Growth Factors
-   - Industry tailwinds
-   - Policy support
-   - Export opportunities
-   - Market consolidation potential
-
-3. Operational Growth Levers
-   - Operating leverage
-   - Efficiency improvements
-   - Cost optimization initiatives
-
-4. Future Growth Catalysts
-   - New market entries
-   - Product launches
-   - Strategic initiatives
-
-Quantify growth potential where possible. Provide specific timelines and metrics for growth initiatives.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Growth analysis complete")
-    return {"growth_triggers": response.content}
-
-def capex_analyst(state: ResearchState):
-    """Analyzes CAPEX and order books"""
-    logger.info("🏗️ Starting CAPEX analysis")
-    sys_msg = SystemMessage(content="""You are a CAPEX and order book analysis specialist. Provide detailed analysis of:
-
-1. CAPEX Plans
-   - Ongoing projects
-   - Planned investments
-   - Expansion timelines
-   - Technology upgrades
-
-2. Order Book Analysis
-   - Current order book value
-   - Order book composition
-   - Execution timeline
-   - Client concentration
-
-3. Funding Structure
-   - Source of funds
-   - Cost of capital
-   - Debt-equity mix
-   - Return projections
-
-4. Impact Analysis
-   - Capacity addition
-   - Revenue potential
-   - Margin implications
-   - Payback periods
-
-Use specific numbers and timelines. Analyze the quality of CAPEX and its strategic alignment.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ CAPEX analysis complete")
-    return {"capex_analysis": response.content}
-
-def market_analyst(state: ResearchState):
-    """Analyzes market position and tailwinds"""
-    logger.info("🌐 Starting market position analysis")
-    sys_msg = SystemMessage(content="""You are a market analysis expert. Evaluate the company's market position:
-
-1. Market Share Analysis
-   - Overall market position
-   - Segment-wise share
-   - Competitive ranking
-   - Market share trends
-
-2. Industry Analysis
-   - Market size and growth
-   - Demand drivers
-   - Supply dynamics
-   - Regulatory environment
-
-3. Competitive Landscape
-   - Key competitors
-   - Competitive advantages
-   - Entry barriers
-   - Threat assessment
-
-4. Market Opportunities
-   - Untapped segments
-   - Geographic expansion
-   - Product gaps
-   - Market consolidation
-
-Provide specific market sizes, growth rates, and competitive positions.
-Analyze both short-term and long-term market dynamics.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Market analysis complete")
-    return {"market_position": response.content}
 
-def risk_analyst(state: ResearchState):
-    """Analyzes risks"""
-    logger.info("⚠️ Starting risk analysis")
-    sys_msg = SystemMessage(content="""You are a risk assessment specialist. Identify and analyze key risks:
+def dedup_sources_node(state: ResearchState):
+    """Drops boilerplate and near-duplicate chunks across all collected sources"""
+    logger.info("🧹 Deduplicating collected sources")
+    tool_responses = state["context"].get("tool_responses", {})
+    sources = [
+        (f"{name}#{index}", blob_store.get(ref))
+        for name, refs in tool_responses.items()
+        for index, ref in enumerate(refs)
+    ]
+    if not sources:
+        return {}
+
+    chunks, stats = deduplicate(sources)
+    # Whatever still exceeds the analyst context budget is condensed
+    corpus = condenser.condense(render_corpus(chunks), CONTEXT_TOKEN_BUDGET)
+    stats["tokens_prompt"] = estimate_tokens(corpus)
+    provenance = [
+        {"source": chunk.provenance, "duplicates": chunk.duplicates}
+        for chunk in chunks
+    ]
+    reduction = 1 - stats["tokens_out"] / stats["tokens_in"] if stats["tokens_in"] else 0.0
+    logger.info(
+        f"✅ Kept {stats['chunks_out']} of {stats['chunks_in']} chunks "
+        f"({stats['boilerplate']} boilerplate, {stats['near_duplicates']} near-duplicates), "
+        f"~{stats['tokens_in']} → ~{stats['tokens_out']} tokens ({reduction:.0%} less)"
+    )
+    return {
+        "context": {
+            "corpus": blob_store.put(corpus),
+            "corpus_provenance": blob_store.put(json.dumps(provenance)),
+            "dedup_stats": stats,
+        }
+    }
 
-1. Operational Risks
-2. Financial Risks
-3. Market Risks
+def make_analyst_node(spec: AnalystSpec):
+    """Graph node that writes the report section of `spec`"""
+    def analyst_node(state: ResearchState):
+        logger.info(f"{spec.icon} Starting {spec.description}")
+        response, usage = invoke_analyst(spec, state)
+        logger.info(f"✅ {spec.description[0].upper()}{spec.description[1:]} complete")
+        return {spec.name: response.content, "analyst_usage": usage}
+    analyst_node.__name__ = f"{spec.name}_analyst"
+    return analyst_node
 
-Rate each risk category (High/Medium/Low). Provide specific examples and mitigation strategies.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Risk analysis complete")
-    return {"risk_analysis": response.content}
-
-def investment_analyst(state: ResearchState):
-    """Provides investment recommendation"""
-    logger.info("💡 Starting investment recommendation analysis")
-    sys_msg = SystemMessage(content="""You are an investment recommendation specialist. Provide a comprehensive investment analysis:
-
-1. Investment Thesis
-   - Key investment merits
-   - Growth catalysts
-   - Competitive advantages
-   - Management quality
-
-2. Valuation Analysis
-   - Current valuations
-   - Peer comparison
-   - Historical trends
-   - Fair value assessment
-
-3. Return Potential
-   - Expected growth rates
-   - Margin expansion
-   - Multiple re-rating
-   - Dividend potential
-
-4. Investment Risks
-   - Key concerns
-   - Risk-reward ratio
-   - Investment horizon
-   - Entry/exit points
-
-Conclude with a clear recommendation (Buy/Hold/Sell) and target price range.
-Provide specific triggers for reviewing the recommendation.""")
-    
-    messages = [sys_msg, HumanMessage(content=str(state["context"]))]
-    response = llm.invoke(messages)
-    logger.info("✅ Investment recommendation complete")
-    return {"investment_recommendation": response.content}
+# Report sections in canonical order, as (title, state key)
+REPORT_SECTIONS = [(spec.title, spec.name) for spec in ANALYSTS]
 
 def report_compiler(state: ResearchState):
     """Compiles final report from all analyses"""
     logger.info("📝 Starting final report compilation")
-    sections = [
-        ("BASIC INFORMATION", state["company_info"]),
-        ("BUSINESS MODEL", state["business_model"]),
-        ("REVENUE SOURCES", state["revenue_sources"]),
-        ("FINANCIAL ANALYSIS", state["financial_analysis"]),
-        ("GROWTH TRIGGERS", state["growth_triggers"]),
-        ("CAPEX AND ORDER BOOK ANALYSIS", state["capex_analysis"]),
-        ("MARKET POSITION AND TAILWINDS", state["market_position"]),
-        ("RISK ANALYSIS", state["risk_analysis"]),
-        ("INVESTMENT RECOMMENDATION", state["investment_recommendation"])
-    ]
-    
-    final_report = "\n\n".join(f"New section\n{content}" for title, content in sections)
+    final_report = "\n\n".join(format_section(title, state[key]) for title, key in REPORT_SECTIONS)
     logger.info("✅ Final report compilation complete")
     return {"final_report": final_report, "messages": [AIMessage(content=final_report)]}
 
@@ -523,14 +596,14 @@ def route_data_collector(state):
     last_message = state["messages"][-1]
     
     # If there are tool calls, route to tools
-    if hasattr(last_message, 'additional_kwargs') and last_message.additional_kwargs.get('tool_calls'):
+    if getattr(last_message, 'tool_calls', None):
         logger.info("🔄 Routing to tools")
         return "tools"
     
     # If we have collected data in context, route to analysis
     if state.get("context", {}).get("collected_data"):
         logger.info("✅ Data collection complete, routing to analysis")
-        return "info_analysis"
+        return "financial_metrics"
     
     # If still collecting data but no tool calls, continue collecting
     logger.info("🔄 Continuing data collection")
@@ -540,57 +613,218 @@ def route_data_collector(state):
 builder = StateGraph(ResearchState)
 
 # Add nodes
+builder.add_node("prefetch_sources", prefetch_sources)
 builder.add_node("data_collector", data_collector)
-builder.add_node("tools", ToolNode(tools))
-builder.add_node("info_analysis", company_info_analyst)
-builder.add_node("model_analysis", business_model_analyst)
-builder.add_node("revenue_analysis", revenue_analyst)
-builder.add_node("financial_analysis_node", financial_analyst)
-builder.add_node("growth_analysis", growth_analyst)
-builder.add_node("capex_analysis_node", capex_analyst)
-builder.add_node("market_analysis", market_analyst)
-builder.add_node("risk_analysis_node", risk_analyst)
-builder.add_node("investment_analysis", investment_analyst)
+builder.add_node("tools", ToolNode([tool(stored_tool(func)) for func in tool_functions]))
+builder.add_node("financial_metrics", financial_metrics_node)
+builder.add_node("dedup_sources", dedup_sources_node)
+for spec in ANALYSTS:
+    builder.add_node(spec.node, make_analyst_node(spec))
 builder.add_node("report_compilation", report_compiler)
 
 # Add edges
-builder.add_edge(START, "data_collector")
+builder.add_edge(START, "prefetch_sources")
+builder.add_edge("prefetch_sources", "data_collector")
 builder.add_conditional_edges(
     "data_collector",
     route_data_collector,  # Use our custom routing function
     {
         "tools": "tools",
-        "info_analysis": "info_analysis"
+        "financial_metrics": "financial_metrics"
     }
 )
 builder.add_edge("tools", "data_collector")
+builder.add_edge("financial_metrics", "dedup_sources")
+builder.add_edge("dedup_sources", ANALYSTS[0].node)
+
+# Nodes whose LLM output is streamed as report progress
+ANALYST_NODES = {spec.node for spec in ANALYSTS}
 
-# Analysis flow
-builder.add_edge("info_analysis", "model_analysis")
-builder.add_edge("model_analysis", "revenue_analysis")
-builder.add_edge("revenue_analysis", "financial_analysis_node")
-builder.add_edge("financial_analysis_node", "growth_analysis")
-builder.add_edge("growth_analysis", "capex_analysis_node")
-builder.add_edge("capex_analysis_node", "market_analysis")
-builder.add_edge("market_analysis", "risk_analysis_node")
-builder.add_edge("risk_analysis_node", "investment_analysis")
-builder.add_edge("investment_analysis", "report_compilation")
+# Analysis flow, in report order
+for spec, next_spec in zip(ANALYSTS, ANALYSTS[1:]):
+    builder.add_edge(spec.node, next_spec.node)
+builder.add_edge(ANALYSTS[-1].node, "report_compilation")
 builder.add_edge("report_compilation", END)
 
 # Compile graph
-graph = builder.compile()
-display(Image(graph.get_graph(xray=True).draw_mermaid_png()))
+# Every completed node is checkpointed to a local SQLite database keyed by run id,
+# so a run that fails late (e.g. a throttled analyst) resumes from the last
+# completed node instead of re-crawling and re-analyzing from scratch.
+CHECKPOINT_DB = os.getenv("RESEARCH_CHECKPOINT_DB", "research_runs.sqlite")
+
+@functools.lru_cache(maxsize=None)
+def get_checkpointer() -> SqliteSaver:
+    """The run checkpointer, opened on first use so importing this module creates no database"""
+    return SqliteSaver(sqlite3.connect(CHECKPOINT_DB, check_same_thread=False))
+
+@functools.lru_cache(maxsize=None)
+def research_graph():
+    """The compiled, checkpointed research graph"""
+    return builder.compile(checkpointer=get_checkpointer())
+
+def run_config(run_id: str, pdf_backend: Optional[str] = None) -> dict:
+    """Graph config for a research run"""
+    return {"configurable": {"thread_id": run_id, "pdf_backend": pdf_backend or PDF_BACKEND}}
+
+def start_run(request: HumanMessage, run_id: Optional[str] = None, pdf_backend: Optional[str] = None) -> dict:
+    """Starts a new checkpointed research run.
+    
+    Args:
+        request: The research request, see build_research_request
+        run_id: Id to store the run under, a random one is generated if not given
+        pdf_backend: PDF extraction backend for this run, defaults to PDF_BACKEND
+    """
+    run_id = run_id or uuid.uuid4().hex[:12]
+    logger.info(f"🆕 Starting research run {run_id}")
+    return research_graph().invoke({"messages": [request]}, run_config(run_id, pdf_backend))
+
+def resume_run(run_id: str, pdf_backend: Optional[str] = None) -> dict:
+    """Resumes a failed or interrupted run from its last completed node.
+    
+    Args:
+        run_id: Id of the run to resume
+        pdf_backend: PDF extraction backend for the rest of the run, defaults to PDF_BACKEND
+    """
+    snapshot = research_graph().get_state(run_config(run_id))
+    if not snapshot.values:
+        raise ValueError(f"No stored run with id {run_id}")
+    if not snapshot.next:
+        logger.info(f"✅ Run {run_id} is already complete")
+        return snapshot.values
+    logger.info(f"⏯️ Resuming run {run_id} at {', '.join(snapshot.next)}")
+    return research_graph().invoke(None, run_config(run_id, pdf_backend))
+
+def run_or_resume(request: HumanMessage, run_id: str, pdf_backend: Optional[str] = None) -> dict:
+    """Resumes the run if it was stored before, otherwise starts it"""
+    if research_graph().get_state(run_config(run_id)).values:
+        return resume_run(run_id, pdf_backend)
+    return start_run(request, run_id, pdf_backend)
+
+async def stream_run(request: Optional[HumanMessage], run_id: str, out, pdf_backend: Optional[str] = None) -> dict:
+    """Runs (or resumes, when request is None) a research run, streaming the report as it is written.
+    
+    Analyst tokens are echoed to stderr as they are generated, and each report section is
+    written to `out` in canonical order as soon as it and all earlier sections are done.
+    
+    Args:
+        request: The research request, or None to resume the stored run
+        run_id: Id of the run
+        out: File or stream the report sections are written to
+        pdf_backend: PDF extraction backend for this run, defaults to PDF_BACKEND
+    """
+    writer = ReportWriter(REPORT_SECTIONS, out)
+    # SqliteSaver is sync only; the async saver shares the same database, so runs
+    # started here can be listed and resumed like any other
+    async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_DB) as saver:
+        streaming_graph = builder.compile(checkpointer=saver)
+        config = run_config(run_id, pdf_backend)
+        if request is None:
+            # Sections finished before the interruption go out first
+            snapshot = await streaming_graph.aget_state(config)
+            if not snapshot.values:
+                raise ValueError(f"No stored run with id {run_id}")
+            for _, key in REPORT_SECTIONS:
+                writer.add(key, snapshot.values.get(key))
+        inputs = {"messages": [request]} if request is not None else None
+
+        current_node = None
+        async for mode, chunk in streaming_graph.astream(inputs, config, stream_mode=["updates", "messages"]):
+            if mode == "messages":
+                message, metadata = chunk
+                node = metadata.get("langgraph_node")
+                if node in ANALYST_NODES:
+                    if node != current_node:
+                        sys.stderr.write(f"\n\n[{node}]\n")
+                        current_node = node
+                    sys.stderr.write(message_text(message.content))
+                    sys.stderr.flush()
+            else:
+                for update in chunk.values():
+                    for key, value in (update or {}).items():
+                        for title in writer.add(key, value):
+                            logger.info(f"📤 Section written: {title}")
+        return (await streaming_graph.aget_state(config)).values
+
+def list_runs() -> List[dict]:
+    """Lists stored runs, most recently updated first"""
+    checkpointer = get_checkpointer()
+    checkpointer.setup()
+    # Only the run ids are read here; get_state then loads each run's latest checkpoint.
+    # Checkpoint ids are time-ordered, so the largest is the latest.
+    with checkpointer.lock:
+        rows = checkpointer.conn.execute(
+            "SELECT thread_id FROM checkpoints WHERE checkpoint_ns = '' "
+            "GROUP BY thread_id ORDER BY MAX(checkpoint_id) DESC"
+        ).fetchall()
+
+    runs = []
+    for (run_id,) in rows:
+        snapshot = research_graph().get_state(run_config(run_id))
+        messages = snapshot.values.get("messages") or []
+        first_message = messages[0] if messages else None
+        runs.append({
+            "run_id": run_id,
+            "status": f"stopped before {', '.join(snapshot.next)}" if snapshot.next else "complete",
+            "updated_at": snapshot.created_at,
+            "request": first_message.content.splitlines()[0] if first_message else "",
+        })
+    return runs
+
+def build_research_request(company: str, urls: List[str]) -> HumanMessage:
+    """Builds the initial research request for a company and its sources.
+    
+    Args:
+        company: Name of the company to research
+        urls: Source URLs; PDFs are parsed and everything else is crawled
+    """
+    source_lines = "\n".join(
+        f"You can parse this pdf {url}" if is_pdf_url(url) else f"You can crawl this website {url}"
+        for url in urls
+    )
+    return HumanMessage(content=f"""Research {company} using these sources:
+{source_lines}
+Create a detailed report on {company}.""")
 
 # Example usage
 if __name__ == "__main__":
-    result = graph.invoke({
-        "messages": [
-            HumanMessage(content="""Research time technoplast using these sources:
-            You can parse this pdf https://www.timetechnoplast.com/wp-content/uploads/2024/12/q3-transcript.pdf
-            You can crawl this website https://www.screener.in/company/TIMETECHNO/consolidated/
-            Create a detailed report on Time technoplast.""")
-        ]
-    })
+    parser = argparse.ArgumentParser(description="Research a company with the finance agent")
+    parser.add_argument("--run-id", help="Id to store a new run under")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a failed or interrupted run")
+    parser.add_argument("--list-runs", action="store_true", help="List stored runs and their status")
+    parser.add_argument("--pdf-backend", choices=["llamaparse", "local"], help="PDF extraction backend for this run")
+    parser.add_argument("--stream", metavar="PATH", help="Stream report sections to PATH ('-' for stdout) as they complete")
+    args = parser.parse_args()
+
+    if args.list_runs:
+        for run in list_runs():
+            print(f"{run['run_id']}\t{run['status']}\t{run['updated_at']}\t{run['request']}")
+        raise SystemExit(0)
+
+    request = None
+    if not args.resume:
+        display(Image(research_graph().get_graph(xray=True).draw_mermaid_png()))
+        request = build_research_request("Time Technoplast", [
+            "https://www.timetechnoplast.com/wp-content/uploads/2024/12/q3-transcript.pdf",
+            "https://www.screener.in/company/TIMETECHNO/consolidated/",
+        ])
+
+    if args.stream:
+        run_id = args.resume or args.run_id or uuid.uuid4().hex[:12]
+        out = sys.stdout if args.stream == "-" else open(args.stream, "w")
+        try:
+            result = asyncio.run(stream_run(request, run_id, out, args.pdf_backend))
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        # Kept out of the report when it is streamed to stdout
+        print(format_analyst_usage(result.get("analyst_usage", {})), file=sys.stderr if out is sys.stdout else sys.stdout)
+        raise SystemExit(0)
+
+    if args.resume:
+        result = resume_run(args.resume, args.pdf_backend)
+    else:
+        result = start_run(request, run_id=args.run_id, pdf_backend=args.pdf_backend)
     # print(result)
     for m in result['messages']:
         m.pretty_print()
+    print(format_analyst_usage(result.get("analyst_usage", {})))
@@ -0,0 +1,277 @@
+"""Structured extraction of screener.in financial tables.
+
+Parses the markdown tables returned by crawl_webpage for a screener.in company
+page (quarterly results, profit & loss, balance sheet, cash flows) into
+numeric arrays, and computes the standard ratio set and growth series locally
+in vectorized form. The analysts get these compact, deterministic metric tables
+instead of having the model work the ratios out from raw markdown.
+"""
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('financial_tables')
+
+# Section headings on screener.in company pages, by the key we store them under
+SECTIONS = {
+    "quarterly": ("quarterly results",),
+    "profit_loss": ("profit & loss", "profit and loss"),
+    "balance_sheet": ("balance sheet",),
+    "cash_flow": ("cash flow",),
+}
+
+@dataclass
+class FinancialTable:
+    """A financial statement: one float array per row, aligned with `periods`"""
+    name: str
+    periods: List[str]
+    rows: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def row(self, *labels: str) -> np.ndarray:
+        """Returns the first row whose label starts with one of `labels`, or NaNs if there is none"""
+        for label in labels:
+            for row_label, values in self.rows.items():
+                if row_label.startswith(label.lower()):
+                    return values
+        return np.full(len(self.periods), np.nan)
+
+def _parse_number(cell: str) -> float:
+    """Parses a screener.in cell such as '1,234', '-12.5' or '18%'"""
+    cell = cell.replace(",", "").replace("%", "").strip()
+    try:
+        return float(cell)
+    except ValueError:
+        return np.nan
+
+def _clean_label(cell: str) -> str:
+    """Normalizes a row label, dropping screener's expandable-row ' +' marker"""
+    cell = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", cell)  # markdown links
+    return re.sub(r"[\s+ ]+$", "", cell).strip().lower()
+
+def _split_row(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+def _section_for_heading(heading: str) -> Optional[str]:
+    heading = heading.lower()
+    for key, names in SECTIONS.items():
+        if any(name in heading for name in names):
+            return key
+    return None
+
+def is_statement_heading(heading: str) -> bool:
+    """Whether a heading starts one of the statement sections parsed here"""
+    return _section_for_heading(heading) is not None
+
+def _build_table(name: str, lines: List[str]) -> Optional[FinancialTable]:
+    rows = [_split_row(line) for line in lines if not re.fullmatch(r"[\s|:\-]+", line)]
+    if len(rows) < 2:
+        return None
+    periods = rows[0][1:]
+    table = FinancialTable(name=name, periods=periods)
+    for cells in rows[1:]:
+        label = _clean_label(cells[0])
+        if not label:
+            continue
+        values = [_parse_number(cell) for cell in cells[1:len(periods) + 1]]
+        values += [np.nan] * (len(periods) - len(values))
+        table.rows[label] = np.array(values, dtype=np.float64)
+    return table
+
+def parse_financial_tables(markdown: str) -> Dict[str, FinancialTable]:
+    """Parses the screener.in statement tables out of crawled markdown.
+
+    Args:
+        markdown: Page markdown as returned by crawl_webpage
+    Returns:
+        Tables keyed by "quarterly", "profit_loss", "balance_sheet" and "cash_flow"
+    """
+    tables = {}
+    section = None
+    table_lines = []
+
+    def flush():
+        if section and section not in tables and table_lines:
+            table = _build_table(section, table_lines)
+            if table is not None:
+                tables[section] = table
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            table_lines.append(stripped)
+            continue
+        if table_lines:
+            flush()
+            table_lines = []
+        if stripped.startswith("#"):
+            section = _section_for_heading(stripped.lstrip("#"))
+    flush()
+    logger.info(f"Parsed financial tables: {', '.join(tables) or 'none'}")
+    return tables
+
+def strip_tables(markdown: str, sections=tuple(SECTIONS)) -> Tuple[str, List[str]]:
+    """Removes the statement tables of the given sections, keeping everything else.
+
+    Only the table parse_financial_tables reads for a section (the first one that
+    parses) is removed; other tables under the same heading, such as screener's
+    compounded growth and return tables, are kept.
+
+    Args:
+        markdown: Page markdown as returned by crawl_webpage
+        sections: Section keys whose tables are dropped, defaults to all statement sections
+    Returns:
+        The markdown without those tables, and the sections whose table was removed
+    """
+    kept = []
+    stripped_sections = []
+    section = None
+    table_lines = []
+
+    def flush():
+        if section in sections and section not in stripped_sections and _build_table(section, table_lines) is not None:
+            stripped_sections.append(section)
+        else:
+            kept.extend(table_lines)
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            table_lines.append(line)
+            continue
+        if table_lines:
+            flush()
+            table_lines = []
+        if stripped.startswith("#"):
+            section = _section_for_heading(stripped.lstrip("#"))
+        kept.append(line)
+    if table_lines:
+        flush()
+    return "\n".join(kept), stripped_sections
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+def _growth(values: np.ndarray, lag: int = 1) -> np.ndarray:
+    """Period-over-period growth, NaN where there is no earlier period"""
+    growth = np.full(len(values), np.nan)
+    if len(values) > lag:
+        growth[lag:] = _ratio(values[lag:] - values[:-lag], np.abs(values[:-lag]))
+    return growth
+
+def _average(values: np.ndarray) -> np.ndarray:
+    """Average of each period with the previous one, falling back to the period itself"""
+    average = values.copy()
+    average[1:] = (values[1:] + values[:-1]) / 2
+    return average
+
+def _aligned(table: FinancialTable, periods: List[str]) -> FinancialTable:
+    """Restricts a table to the given periods, in that order"""
+    index = [table.periods.index(period) for period in periods]
+    return FinancialTable(table.name, periods, {label: values[index] for label, values in table.rows.items()})
+
+def compute_metrics(tables: Dict[str, FinancialTable]) -> Dict[str, FinancialTable]:
+    """Computes the standard ratio set and growth series from parsed statements.
+
+    Ratios are fractions (0.12 is 12%), except coverage and turnover multiples.
+    Args:
+        tables: Tables returned by parse_financial_tables
+    Returns:
+        Metric tables keyed by "annual" and "quarterly"
+    """
+    metrics = {}
+
+    pl = tables.get("profit_loss")
+    if pl is not None:
+        # Balance sheet and cash flow ratios need the same annual periods (no TTM column)
+        periods = [p for p in pl.periods if p.upper() != "TTM"]
+        for name in ("balance_sheet", "cash_flow"):
+            if name in tables:
+                periods = [p for p in periods if p in tables[name].periods]
+        pl = _aligned(pl, periods)
+        sales = pl.row("sales", "revenue")
+        operating_profit = pl.row("operating profit", "financing profit")
+        net_profit = pl.row("net profit")
+        interest = pl.row("interest")
+        pbt = pl.row("profit before tax")
+        ebit = pbt + np.nan_to_num(interest)
+
+        annual = FinancialTable("annual", periods, {
+            "sales": sales,
+            "sales growth": _growth(sales),
+            "operating margin": _ratio(operating_profit, sales),
+            "net profit": net_profit,
+            "net profit growth": _growth(net_profit),
+            "net margin": _ratio(net_profit, sales),
+            "eps growth": _growth(pl.row("eps")),
+            "interest coverage": _ratio(ebit, interest),
+        })
+
+        if "balance_sheet" in tables:
+            bs = _aligned(tables["balance_sheet"], periods)
+            equity = bs.row("equity capital") + bs.row("reserves")
+            borrowings = np.nan_to_num(bs.row("borrowings"))
+            capital_employed = equity + borrowings
+            working_capital = bs.row("other assets") - bs.row("other liabilities")
+            annual.rows.update({
+                "roe": _ratio(net_profit, _average(equity)),
+                "roce": _ratio(ebit, _average(capital_employed)),
+                "debt to equity": _ratio(borrowings, equity),
+                "asset turnover": _ratio(sales, _average(bs.row("total assets"))),
+                "working capital to sales": _ratio(working_capital, sales),
+            })
+
+        if "cash_flow" in tables:
+            cf = _aligned(tables["cash_flow"], periods)
+            operating_cash_flow = cf.row("cash from operating")
+            annual.rows.update({
+                "operating cash flow": operating_cash_flow,
+                "cash conversion (cfo / net profit)": _ratio(operating_cash_flow, net_profit),
+                "cfo + cfi": operating_cash_flow + cf.row("cash from investing"),
+            })
+        metrics["annual"] = annual
+
+    quarterly = tables.get("quarterly")
+    if quarterly is not None:
+        sales = quarterly.row("sales", "revenue")
+        net_profit = quarterly.row("net profit")
+        metrics["quarterly"] = FinancialTable("quarterly", quarterly.periods, {
+            "sales": sales,
+            "sales growth qoq": _growth(sales),
+            "sales growth yoy": _growth(sales, lag=4),
+            "operating margin": _ratio(quarterly.row("operating profit", "financing profit"), sales),
+            "net profit": net_profit,
+            "net profit growth yoy": _growth(net_profit, lag=4),
+        })
+    return metrics
+
+# Rows shown as percentages; everything else is an absolute value or multiple
+_PERCENT_HINTS = ("growth", "margin", "roe", "roce", "to sales")
+
+def _format_value(label: str, value: float) -> str:
+    if np.isnan(value):
+        return "-"
+    if any(hint in label for hint in _PERCENT_HINTS):
+        return f"{value * 100:.1f}%"
+    if abs(value) >= 100:
+        return f"{value:,.0f}"
+    return f"{value:.2f}"
+
+def format_metrics(metrics: Dict[str, FinancialTable], max_periods: int = 8) -> str:
+    """Renders metric tables as compact markdown, keeping the latest `max_periods` periods"""
+    sections = []
+    for name, table in metrics.items():
+        periods = table.periods[-max_periods:]
+        lines = [
+            f"### {name.title()} metrics (computed)",
+            "| Metric | " + " | ".join(periods) + " |",
+            "|---" * (len(periods) + 1) + "|",
+        ]
+        for label, values in table.rows.items():
+            cells = [_format_value(label, value) for value in values[-max_periods:]]
+            lines.append(f"| {label} | " + " | ".join(cells) + " |")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
@@ -0,0 +1,131 @@
+"""Local PDF extraction backend.
+
+An alternative to LlamaParse that runs entirely on this machine. The PDF is
+split into page ranges which are extracted in a process pool across cores;
+each page becomes markdown with its text followed by any tables found on it.
+Pages are streamed back as their range finishes, so callers can start using
+the first pages before the whole filing has been processed.
+
+The process pool is shared across PDFs and started with forkserver (spawn where
+that isn't available): extraction is called from worker threads, and forking a
+threaded process can copy locks held by other threads into the children.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pdfplumber
+
+logger = logging.getLogger('local_pdf')
+
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Process pools by worker count, created on first use and reused for every PDF
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers, mp_context=_MP_CONTEXT)
+        return pool
+
+def _drop_pool(max_workers: int, pool: ProcessPoolExecutor):
+    """Forgets a broken pool so the next extraction starts a new one"""
+    with _pools_lock:
+        if _pools.get(max_workers) is pool:
+            del _pools[max_workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def table_to_markdown(rows: List[List[Optional[str]]]) -> str:
+    """Converts rows extracted by pdfplumber into a markdown table"""
+    rows = [[(cell or "").replace("\n", " ").strip() for cell in row] for row in rows if row]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    header, *body = rows
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + " --- |" * width,
+    ]
+    lines.extend("| " + " | ".join(row) + " |" for row in body)
+    return "\n".join(lines)
+
+def _page_to_markdown(page) -> str:
+    """Extracts a page's running text and its tables as markdown"""
+    tables = page.find_tables()
+    # Drop table regions from the running text so table values aren't emitted twice
+    text_page = page
+    for table in tables:
+        text_page = text_page.outside_bbox(table.bbox)
+    parts = [text_page.extract_text() or ""]
+    parts.extend(table_to_markdown(table.extract()) for table in tables)
+    return "\n\n".join(part for part in parts if part.strip())
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Worker: extracts pages [start, end) of a PDF"""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [(index + 1, _page_to_markdown(pdf.pages[index])) for index in range(start, end)]
+
+def count_pages(pdf_path: str) -> int:
+    """Number of pages in a PDF"""
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def iter_pdf_pages(pdf_path: str, max_workers: Optional[int] = None, pages_per_range: Optional[int] = None,
+                   page_limit: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Extracts a PDF in parallel, yielding (page_number, markdown) as page ranges finish.
+
+    Pages within a range are yielded in order, but ranges are yielded in completion order.
+
+    Args:
+        pdf_path: Path of the PDF on disk
+        max_workers: Number of worker processes in the shared pool, defaults to the number of cores
+        pages_per_range: Pages extracted per task, defaults to spreading the PDF over ~4 tasks per worker
+        page_limit: Only extract the first `page_limit` pages
+    """
+    total_pages = count_pages(pdf_path)
+    if page_limit is not None:
+        total_pages = min(total_pages, page_limit)
+    if total_pages == 0:
+        return
+    max_workers = max_workers or os.cpu_count() or 1
+    pages_per_range = pages_per_range or max(1, -(-total_pages // (max_workers * 4)))
+    ranges = [(start, min(start + pages_per_range, total_pages)) for start in range(0, total_pages, pages_per_range)]
+    logger.info(f"Extracting {total_pages} pages in {len(ranges)} ranges with {max_workers} workers")
+
+    if max_workers == 1:
+        for start, end in ranges:
+            yield from _extract_page_range(pdf_path, start, end)
+        return
+
+    pool = _get_pool(max_workers)
+    futures = []
+    try:
+        futures.extend(pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges)
+        for future in as_completed(futures):
+            yield from future.result()
+    except BrokenProcessPool:
+        _drop_pool(max_workers, pool)
+        raise
+    finally:
+        # Don't leave ranges of an abandoned extraction queued ahead of other PDFs
+        for future in futures:
+            future.cancel()
+
+def extract_pdf(pdf_path: str, max_workers: Optional[int] = None) -> str:
+    """Extracts a whole PDF into markdown, with pages in document order.
+
+    Args:
+        pdf_path: Path of the PDF on disk
+        max_workers: Number of worker processes, defaults to the number of cores
+    """
+    pages = dict(iter_pdf_pages(pdf_path, max_workers=max_workers))
+    return "\n\n".join(f"<!-- page {number} -->\n{pages[number]}" for number in sorted(pages))
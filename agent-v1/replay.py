@@ -0,0 +1,202 @@
+"""Record/replay of LLM and tool calls.
+
+Records real Bedrock, Anthropic and tool interactions to a cassette file once,
+then replays them without network access, either with their original latency
+or with none. This makes the pipelines' own overhead, concurrency changes and
+token usage measurable repeatably on any machine.
+
+Cassettes are JSON lines files with one recorded call per line. Calls are
+matched by kind and a hash of their request; identical requests are replayed
+in the order they were recorded, wrapping around when replayed more often.
+
+Configured through the environment:
+
+    AGENT_CASSETTE=runs/time-technoplast.jsonl
+    AGENT_CASSETTE_MODE=record | replay
+    AGENT_REPLAY_TIMING=original | instant
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger('replay')
+
+class CassetteMiss(KeyError):
+    """Raised when a replayed call has no recording"""
+
+def request_key(kind: str, payload) -> str:
+    """Stable hash of a call's request"""
+    data = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(f"{kind}:{data}".encode("utf-8")).hexdigest()
+
+class Cassette:
+    """Recorded calls, read from and appended to a JSON lines file"""
+
+    def __init__(self, path: str, mode: str = "replay", timing: str = "original"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if timing not in ("original", "instant"):
+            raise ValueError(f"Unknown replay timing: {timing}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._entries = defaultdict(deque)
+        if mode == "replay":
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[(entry["kind"], entry["key"])].append(entry)
+            logger.info(f"Replaying {sum(len(e) for e in self._entries.values())} recorded calls from {path}")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def record(self, kind: str, key: str, response, latency: float):
+        entry = {"kind": kind, "key": key, "latency": round(latency, 4), "response": response}
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def _take(self, kind: str, key: str) -> dict:
+        # Entries are rotated rather than consumed, so a cassette can be replayed repeatedly
+        with self._lock:
+            entries = self._entries.get((kind, key))
+            if not entries:
+                raise CassetteMiss(f"No recorded {kind} call matches this request ({key[:12]})")
+            entry = entries.popleft()
+            entries.append(entry)
+            return entry
+
+    def replay(self, kind: str, key: str):
+        entry = self._take(kind, key)
+        if self.timing == "original":
+            time.sleep(entry["latency"])
+        return entry["response"]
+
+    async def areplay(self, kind: str, key: str):
+        entry = self._take(kind, key)
+        if self.timing == "original":
+            await asyncio.sleep(entry["latency"])
+        return entry["response"]
+
+def cassette_from_env() -> Optional[Cassette]:
+    """The cassette configured by AGENT_CASSETTE, or None to run live"""
+    path = os.getenv("AGENT_CASSETTE")
+    if not path:
+        return None
+    return Cassette(path, os.getenv("AGENT_CASSETTE_MODE", "replay"), os.getenv("AGENT_REPLAY_TIMING", "original"))
+
+active_cassette = cassette_from_env()
+
+def _recordable(result):
+    """Tool results are recorded as JSON; anything else (e.g. LlamaParse documents) as its string form"""
+    try:
+        json.dumps(result)
+        return result
+    except TypeError:
+        return str(result)
+
+def cassette_tool(func):
+    """Records or replays a tool through the active cassette, keyed by its arguments.
+
+    Context and config arguments (pydantic-ai RunContext, LangChain config) are not part of the key.
+    """
+    kind = f"tool:{func.__name__}"
+    signature = inspect.signature(func)
+
+    def key_for(args, kwargs) -> str:
+        bound = signature.bind_partial(*args, **kwargs)
+        payload = {name: value for name, value in bound.arguments.items() if name not in ("ctx", "config")}
+        return request_key(kind, payload)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if active_cassette is None:
+                return await func(*args, **kwargs)
+            key = key_for(args, kwargs)
+            if not active_cassette.recording:
+                return await active_cassette.areplay(kind, key)
+            start = time.perf_counter()
+            result = _recordable(await func(*args, **kwargs))
+            active_cassette.record(kind, key, result, time.perf_counter() - start)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if active_cassette is None:
+            return func(*args, **kwargs)
+        key = key_for(args, kwargs)
+        if not active_cassette.recording:
+            return active_cassette.replay(kind, key)
+        start = time.perf_counter()
+        result = _recordable(func(*args, **kwargs))
+        active_cassette.record(kind, key, result, time.perf_counter() - start)
+        return result
+    return wrapper
+
+class CassetteBedrockClient:
+    """Wraps a boto3 bedrock-runtime client, recording or replaying Converse calls.
+
+    Streaming calls are not recorded, so models using this client should have streaming disabled.
+    """
+
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+
+    def converse(self, **kwargs):
+        key = request_key("bedrock:converse", kwargs)
+        if not self._cassette.recording:
+            return self._cassette.replay("bedrock:converse", key)
+        start = time.perf_counter()
+        response = self._client.converse(**kwargs)
+        self._cassette.record("bedrock:converse", key, response, time.perf_counter() - start)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records or replays model API calls (used by the Anthropic client)"""
+
+    def __init__(self, cassette: Cassette, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._cassette = cassette
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key("http", {"method": request.method, "path": request.url.path, "body": body.decode("utf-8", errors="replace")})
+        if not self._cassette.recording:
+            recorded = await self._cassette.areplay("http", key)
+            return httpx.Response(recorded["status"], headers={"content-type": recorded["content_type"]},
+                                  content=recorded["body"].encode("utf-8"), request=request)
+
+        start = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        content = await response.aread()
+        self._cassette.record("http", key, {
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": content.decode("utf-8", errors="replace"),
+        }, time.perf_counter() - start)
+        # The body is already decoded, so drop the headers that describe the wire encoding
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self):
+        await self._transport.aclose()
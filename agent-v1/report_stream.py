@@ -0,0 +1,57 @@
+"""Incremental report emission.
+
+Writes report sections in their canonical order as soon as a section and all
+the sections before it are done, so readers see the start of a long report
+while later analysts are still running.
+"""
+from typing import List, TextIO, Tuple
+
+def format_section(title: str, content) -> str:
+    """Formats one report section under its title"""
+    return f"## {title}\n\n{content}"
+
+def message_text(content) -> str:
+    """Text of a message or message chunk, whose content may be a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+class ReportWriter:
+    """Writes sections to `out` in canonical order as they become available.
+
+    Args:
+        sections: (title, state key) pairs in report order
+        out: File or stream to write the report to
+    """
+
+    def __init__(self, sections: List[Tuple[str, str]], out: TextIO):
+        self.sections = sections
+        self.out = out
+        self.keys = {key for _, key in sections}
+        self.contents = {}
+        self.next_index = 0
+
+    def add(self, key: str, content) -> List[str]:
+        """Records a finished section and writes every section that is now ready.
+
+        Returns:
+            Titles of the sections written by this call
+        """
+        if content is None or key not in self.keys or key in self.contents:
+            return []
+        self.contents[key] = content
+        written = []
+        while self.next_index < len(self.sections):
+            title, section_key = self.sections[self.next_index]
+            if section_key not in self.contents:
+                break
+            separator = "\n\n" if self.next_index else ""
+            self.out.write(separator + format_section(title, self.contents[section_key]))
+            self.out.flush()
+            written.append(title)
+            self.next_index += 1
+        return written
+
+    @property
+    def complete(self) -> bool:
+        return self.next_index == len(self.sections)
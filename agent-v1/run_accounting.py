@@ -0,0 +1,160 @@
+"""Per-run budgets and cost/latency accounting for the pydantic-ai research agent.
+
+A RunBudget caps a run's model requests, input/output tokens, calls per tool
+and wall-clock time, so a runaway tool loop stops cleanly instead of crawling
+the same page over and over. A RunRecorder times every tool call and model
+request, and appends a JSON line per run with token counts and estimated cost
+so runs can be compared over time.
+"""
+import contextvars
+import functools
+import json
+import logging
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.usage import UsageLimits
+
+logger = logging.getLogger('run_accounting')
+
+# USD per million input / output tokens
+MODEL_PRICES = {
+    'anthropic.claude-3-5-sonnet-20241022-v2:0': (3.0, 15.0),
+    'us.anthropic.claude-3-7-sonnet-20250219-v1:0': (3.0, 15.0),
+    'anthropic.claude-3-5-haiku-20241022-v1:0': (0.8, 4.0),
+}
+
+@dataclass
+class RunBudget:
+    max_requests: int = 25
+    max_input_tokens: int = 500_000
+    max_output_tokens: int = 50_000
+    max_tool_calls: dict[str, int] = field(default_factory=lambda: {'crawl_website': 5, 'parse_pdf_url': 5})
+    deadline_seconds: float = 900.0
+
+    def usage_limits(self) -> UsageLimits:
+        """Request and token limits in the form agent.run enforces them"""
+        return UsageLimits(
+            request_limit=self.max_requests,
+            request_tokens_limit=self.max_input_tokens,
+            response_tokens_limit=self.max_output_tokens,
+        )
+
+# The recorder of the run in progress; httpx hooks run in the caller's context, so
+# requests made by the shared Anthropic client are attributed to the right run
+current_recorder: contextvars.ContextVar[Optional['RunRecorder']] = contextvars.ContextVar('current_recorder', default=None)
+
+class RunRecorder:
+    """Collects timings, token counts and tool usage for one agent run"""
+
+    def __init__(self, model_name: str, budget: RunBudget, report_path: str = 'run_reports.jsonl'):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.model_name = model_name
+        self.budget = budget
+        self.report_path = report_path
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.tool_calls: list[dict] = []
+        self.tool_counts: Counter = Counter()
+        self.model_requests: list[dict] = []
+        self._request_starts: dict[int, float] = {}
+
+    def check_tool_budget(self, tool_name: str):
+        """Counts a tool call, raising UsageLimitExceeded once the tool's budget is used up"""
+        self.tool_counts[tool_name] += 1
+        limit = self.budget.max_tool_calls.get(tool_name)
+        if limit is not None and self.tool_counts[tool_name] > limit:
+            raise UsageLimitExceeded(f'Exceeded the {tool_name} limit of {limit} calls')
+
+    def record_tool_call(self, tool_name: str, seconds: float, ok: bool):
+        self.tool_calls.append({'tool': tool_name, 'seconds': round(seconds, 3), 'ok': ok})
+
+    async def on_request(self, request: httpx.Request):
+        self._request_starts[id(request)] = time.perf_counter()
+
+    async def on_response(self, response: httpx.Response):
+        start = self._request_starts.pop(id(response.request), None)
+        await response.aread()
+        try:
+            usage = response.json().get('usage', {})
+        except ValueError:
+            usage = {}
+        self.model_requests.append({
+            'seconds': round(time.perf_counter() - start, 3) if start else None,
+            'status': response.status_code,
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0),
+        })
+
+    def estimated_cost(self, input_tokens: int, output_tokens: int) -> Optional[float]:
+        prices = MODEL_PRICES.get(self.model_name)
+        if prices is None:
+            return None
+        return round((input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000, 4)
+
+    def write_report(self, status: str, error: Optional[str] = None, extra: Optional[dict] = None) -> dict:
+        """Appends this run's report to the JSONL report file and returns it"""
+        input_tokens = sum(request['input_tokens'] for request in self.model_requests)
+        output_tokens = sum(request['output_tokens'] for request in self.model_requests)
+        report = {
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(),
+            'model': self.model_name,
+            'status': status,
+            'error': error,
+            'wall_seconds': round(time.perf_counter() - self._start, 3),
+            'requests': len(self.model_requests),
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'estimated_cost_usd': self.estimated_cost(input_tokens, output_tokens),
+            'tool_counts': dict(self.tool_counts),
+            'tool_calls': self.tool_calls,
+            'model_requests': self.model_requests,
+            **(extra or {}),
+        }
+        with open(self.report_path, 'a') as f:
+            f.write(json.dumps(report) + '\n')
+        logger.info(f"Run {self.run_id} {status}: {report['requests']} requests, {input_tokens} input / "
+                    f"{output_tokens} output tokens, ~${report['estimated_cost_usd']}, {report['wall_seconds']}s")
+        return report
+
+async def _on_request(request: httpx.Request):
+    recorder = current_recorder.get()
+    if recorder is not None:
+        await recorder.on_request(request)
+
+async def _on_response(response: httpx.Response):
+    recorder = current_recorder.get()
+    if recorder is not None:
+        await recorder.on_response(response)
+
+def accounting_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """HTTP client for the model API that reports every request to the current run's recorder"""
+    return httpx.AsyncClient(transport=transport, event_hooks={'request': [_on_request], 'response': [_on_response]})
+
+def accounted_tool(func):
+    """Enforces the per-tool call budget and times each call of an agent tool.
+
+    The wrapped tool's deps must have a `recorder` attribute; tools run unaccounted when it is None.
+    """
+    @functools.wraps(func)
+    async def wrapper(ctx, *args, **kwargs):
+        recorder = ctx.deps.recorder
+        if recorder is None:
+            return await func(ctx, *args, **kwargs)
+        recorder.check_tool_budget(func.__name__)
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await func(ctx, *args, **kwargs)
+            ok = True
+            return result
+        finally:
+            recorder.record_tool_call(func.__name__, time.perf_counter() - start, ok)
+    return wrapper
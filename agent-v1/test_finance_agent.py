@@ -0,0 +1,88 @@
+"""Offline tests of the data collector's routing.
+
+The Bedrock client is replaced with a stub that returns fixed Converse
+responses, so no AWS access is needed:
+
+    python -m pytest test_finance_agent.py
+"""
+import copy
+import os
+import tempfile
+
+# Read when finance_agent is imported
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+os.environ.setdefault("RESEARCH_CHECKPOINT_DB", os.path.join(tempfile.mkdtemp(), "test_runs.sqlite"))
+
+from langchain_core.messages import HumanMessage
+
+import finance_agent
+from analysts import MODEL_TIERS
+
+SOURCE_URL = "https://www.screener.in/company/TIMETECHNO/consolidated/"
+
+def converse_response(content: list, stop_reason: str) -> dict:
+    return {
+        "output": {"message": {"role": "assistant", "content": content}},
+        "stopReason": stop_reason,
+        "usage": {"inputTokens": 100, "outputTokens": 20, "totalTokens": 120},
+        "metrics": {"latencyMs": 10},
+    }
+
+TOOL_USE_RESPONSE = converse_response(
+    [{"toolUse": {"toolUseId": "tooluse-1", "name": "crawl_webpage", "input": {"url": SOURCE_URL}}}],
+    "tool_use",
+)
+SUMMARY_RESPONSE = converse_response([{"text": "Summary of the collected data."}], "end_turn")
+
+class StubBedrockClient:
+    """Answers every Converse call with the same response"""
+
+    def __init__(self, response: dict):
+        self.response = response
+        self.requests = []
+
+    def converse(self, **kwargs):
+        self.requests.append(kwargs)
+        return copy.deepcopy(self.response)
+
+def stub_collector_llm(monkeypatch, response: dict) -> StubBedrockClient:
+    """Replaces the data collector's model with one whose client returns `response`"""
+    model = finance_agent.make_llm(MODEL_TIERS["large"])
+    client = StubBedrockClient(response)
+    model.client = client
+    model.disable_streaming = True
+    monkeypatch.setattr(finance_agent, "llm_with_tools", model.bind_tools(finance_agent.tools))
+    return client
+
+def collect(state: dict) -> dict:
+    """Runs the data collector and applies its update to the state"""
+    update = finance_agent.data_collector(state)
+    return {
+        "messages": state["messages"] + update["messages"],
+        "context": {**state["context"], **update.get("context", {})},
+    }
+
+def research_state() -> dict:
+    return {"messages": [HumanMessage(content=f"Research Time Technoplast. You can crawl this website {SOURCE_URL}")], "context": {}}
+
+def test_tool_use_routes_to_tools(monkeypatch):
+    client = stub_collector_llm(monkeypatch, TOOL_USE_RESPONSE)
+
+    state = collect(research_state())
+
+    assert len(client.requests) == 1
+    assert state["messages"][-1].tool_calls[0]["name"] == "crawl_webpage"
+    assert "collected_data" not in state["context"]
+    assert finance_agent.route_data_collector(state) == "tools"
+
+def test_summary_routes_to_analysis(monkeypatch):
+    stub_collector_llm(monkeypatch, SUMMARY_RESPONSE)
+
+    state = collect(research_state())
+
+    assert state["context"]["collected_data"]
+    assert finance_agent.route_data_collector(state) == "financial_metrics"
+
+def test_pdf_tool_schema_has_no_config_argument():
+    schema = next(t for t in finance_agent.tools if t.name == "sync_parse_pdf").tool_call_schema.model_json_schema()
+    assert list(schema["properties"]) == ["pdf_url"]
@@ -0,0 +1,77 @@
+"""Encode/decode benchmark of the stored conversation formats.
+
+Compares legacy JSON text with msgpack and msgpack + zstd on synthetic
+conversations of growing length, with long assistant and reasoning messages
+like the ones Claude 3.7 produces:
+
+    python benchmarks/bench_codec.py --messages 10 100 1000 --repeat 20
+
+Reports payload size (what Redis keeps in memory and DynamoDB bills per KB)
+and encode/decode time per conversation.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.models import Message
+from src.storage.codec import JsonCodec, MsgpackCodec, decode
+
+WORDS = (
+    "revenue latency model request token stream region cache message user assistant reasoning "
+    "the a of to and in is that for it with as on be this by are we can will not"
+).split()
+
+def make_conversation(num_messages: int, seed: int = 0) -> List[Message]:
+    """Alternating user, reasoning and assistant messages of realistic lengths."""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(num_messages):
+        kind = ("user", "assistant_reasoning", "assistant")[i % 3]
+        length = {"user": 40, "assistant_reasoning": 600, "assistant": 350}[kind]
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(length // 2, length * 2)))
+        messages.append(Message(content=content, type=kind))
+    return messages
+
+def time_per_call(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stored conversation codecs")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000], help="Conversation lengths")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per measurement (median is reported)")
+    args = parser.parse_args()
+
+    codecs = {
+        "json": JsonCodec(),
+        "msgpack": MsgpackCodec(compression_threshold=1 << 62),
+        "msgpack+zstd": MsgpackCodec(compression_threshold=0),
+    }
+    print(f"{'messages':>8}  {'codec':<13}{'bytes':>11}{'ratio':>7}{'encode ms':>11}{'decode ms':>11}")
+    for num_messages in args.messages:
+        messages = make_conversation(num_messages)
+        baseline = None
+        for name, codec in codecs.items():
+            payload = codec.encode(messages)
+            assert decode(payload) == messages
+            baseline = baseline or len(payload)
+            # Fresh messages each run, so the per-message packing cache doesn't hide the encode cost
+            encode_ms = time_per_call(
+                lambda: codec.encode([Message(m.content, m.type, m.truncated) for m in messages]), args.repeat
+            ) * 1000
+            decode_ms = time_per_call(lambda: decode(payload), args.repeat) * 1000
+            print(f"{num_messages:>8}  {name:<13}{len(payload):>11}{len(payload) / baseline:>7.2f}"
+                  f"{encode_ms:>11.3f}{decode_ms:>11.3f}")
+
+if __name__ == "__main__":
+    main()
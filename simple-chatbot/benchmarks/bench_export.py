@@ -0,0 +1,107 @@
+"""Throughput benchmark of the bulk conversation export.
+
+Exports synthetic conversations (see bench_codec.py) from an in-memory
+stand-in for the DynamoDB table, which splits items into Scan segments,
+returns pages of up to 1 MB and waits `--latency-ms` per page like a network
+round trip, with growing numbers of segments and worker threads:
+
+    python benchmarks/bench_export.py --conversations 5000 --workers 1 4 8 16
+
+Reports conversations and messages exported per second and output size.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_codec import make_conversation
+from src.storage.codec import get_codec
+from src.storage.dynamodb import REASONING_ID_PREFIX
+from src.storage.export import ConversationExporter
+
+# DynamoDB returns at most this much data per Scan page
+PAGE_BYTES = 1 << 20
+
+class FakeTable:
+    """Just enough of a DynamoDB Table for segmented Scans."""
+
+    def __init__(self, items: list, latency: float):
+        self.items = items
+        self.latency = latency
+        self._segments = {}
+
+    def _segment_items(self, segment: int, total_segments: int) -> list:
+        key = (segment, total_segments)
+        if key not in self._segments:
+            self._segments[key] = [
+                item for item in self.items
+                if int(hashlib.md5(item["id"].encode()).hexdigest(), 16) % total_segments == segment
+            ]
+        return self._segments[key]
+
+    def scan(self, Segment=0, TotalSegments=1, ExclusiveStartKey=None, Limit=None):
+        time.sleep(self.latency)
+        items = self._segment_items(Segment, TotalSegments)
+        start = 0
+        if ExclusiveStartKey:
+            start = next(i for i, item in enumerate(items) if item["id"] == ExclusiveStartKey["id"]) + 1
+        page, size = [], 0
+        for item in items[start:]:
+            if page and (size >= PAGE_BYTES or (Limit and len(page) >= Limit)):
+                break
+            page.append(item)
+            size += len(item.get("payload", Binary(b"")).value) + 100
+        response = {"Items": page}
+        if start + len(page) < len(items):
+            response["LastEvaluatedKey"] = {"id": page[-1]["id"]}
+        return response
+
+def make_items(num_conversations: int, messages_per_conversation: int) -> list:
+    codec = get_codec()
+    items = []
+    for i in range(num_conversations):
+        messages = make_conversation(messages_per_conversation, seed=i)
+        items.append({
+            "id": f"conversation-{i}",
+            "owner": "default",
+            "updated_at": Decimal(1700000000000 + i),
+            "payload": Binary(codec.encode(messages)),
+            "title": messages[0].content[:30],
+        })
+        if i % 3 == 0:
+            items.append({"id": f"{REASONING_ID_PREFIX}{i}", "reasoning": "..."})
+    return items
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk conversation export")
+    parser.add_argument("--conversations", type=int, default=5000, help="Conversations in the table")
+    parser.add_argument("--messages", type=int, default=12, help="Messages per conversation")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16], help="Segments and scanning threads")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated Scan round trip per page")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    args = parser.parse_args()
+
+    table = FakeTable(make_items(args.conversations, args.messages), args.latency_ms / 1000)
+    print(f"{'workers':>7}{'conv/s':>10}{'msgs/s':>11}{'pages':>8}{'files':>7}{'MB out':>9}")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as directory:
+            exporter = ConversationExporter(
+                directory, file_format=args.format, segments=workers, workers=workers, table_factory=lambda: table
+            )
+            stats = exporter.run()
+            assert stats.conversations == args.conversations
+            size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6
+            print(f"{workers:>7}{stats.conversations / stats.seconds:>10.0f}{stats.messages / stats.seconds:>11.0f}"
+                  f"{stats.pages:>8}{stats.files:>7}{size_mb:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Rerun-time benchmark of the chat history view.
+
+Runs `display_messages` under Streamlit's AppTest on synthetic conversations
+(see bench_codec.py) and compares the windowed view, which draws the latest
+HISTORY_PAGE_SIZE messages, with drawing the whole history:
+
+    python benchmarks/bench_history.py --messages 50 500 5000 --repeat 5
+
+Reports the first run (nothing rendered yet) and the median of the reruns
+that follow, which is what a user waits for after each interaction.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from streamlit.testing.v1 import AppTest
+
+from bench_codec import make_conversation
+
+def history_app():
+    from src.ui.streamlit_app import display_messages
+    display_messages()
+
+def time_run(app: AppTest) -> float:
+    start = time.perf_counter()
+    app.run(timeout=600)
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed
+
+def bench(num_messages: int, windowed: bool, repeat: int):
+    """First-run and median rerun seconds for one conversation length."""
+    app = AppTest.from_function(history_app)
+    app.session_state["conversation_id"] = "bench"
+    app.session_state["messages"] = make_conversation(num_messages)
+    app.session_state["reasoning_cache"] = {}
+    app.session_state["history_windows"] = {} if windowed else {"bench": num_messages}
+    first = time_run(app)
+    reruns = [time_run(app) for _ in range(repeat)]
+    return first, statistics.median(reruns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat history rerun time")
+    parser.add_argument("--messages", type=int, nargs="+", default=[50, 500, 5000], help="Conversation lengths")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed reruns per measurement (median is reported)")
+    args = parser.parse_args()
+
+    print(f"{'messages':>8}  {'view':<10}{'first ms':>11}{'rerun ms':>11}")
+    for num_messages in args.messages:
+        for view, windowed in (("full", False), ("windowed", True)):
+            first, rerun = bench(num_messages, windowed, args.repeat)
+            print(f"{num_messages:>8}  {view:<10}{first * 1000:>11.1f}{rerun * 1000:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Search benchmark of the long-term memory vector index.
+
+Fills temporary VectorIndexes with random unit vectors and times batched
+top-k searches for the MEMORY_* settings that trade size against latency and
+recall (entries, embedding dimensions, vector dtype):
+
+    python benchmarks/bench_memory.py --entries 10000 100000 --dimensions 256 512 1024
+
+Reports index size, median search time per batch of queries, and recall@k of
+float16 vectors against float32 results for the same vectors.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage.vector_index import VectorEntry, VectorIndex
+
+def unit_vectors(rng: np.random.Generator, count: int, dimensions: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build_index(directory: str, dtype: str, vectors: np.ndarray) -> VectorIndex:
+    index = VectorIndex(os.path.join(directory, dtype), vectors.shape[1], dtype)
+    entries = [VectorEntry(f"conversation-{row // 20}", "default", row % 20, "") for row in range(len(vectors))]
+    index.add(entries, vectors)
+    return index
+
+def time_search(index: VectorIndex, queries: np.ndarray, k: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index.search(queries, k, "default")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the long-term memory vector index")
+    parser.add_argument("--entries", type=int, nargs="+", default=[10000, 100000], help="Indexed messages")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256, 512, 1024], help="Embedding dimensions")
+    parser.add_argument("--queries", type=int, default=2, help="Queries searched together")
+    parser.add_argument("--k", type=int, default=3, help="Results per query")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per measurement (median is reported)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'entries':>8}{'dims':>6}  {'dtype':<8}{'MB':>8}{'search ms':>11}{'recall@k':>10}")
+    for num_entries in args.entries:
+        for dimensions in args.dimensions:
+            vectors = unit_vectors(rng, num_entries, dimensions)
+            # Queries near stored vectors, as a recalled message is near its query
+            queries = unit_vectors(rng, args.queries, dimensions) * 0.3 + vectors[:args.queries]
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            with tempfile.TemporaryDirectory() as directory:
+                exact = None
+                for dtype in ("float32", "float16"):
+                    index = build_index(directory, dtype, vectors)
+                    found = [{(e.conversation_id, e.position) for _, e in hits} for hits in index.search(queries, args.k, "default")]
+                    exact = exact or found
+                    recall = np.mean([len(a & b) / args.k for a, b in zip(found, exact)])
+                    size_mb = num_entries * dimensions * np.dtype(dtype).itemsize / 1e6
+                    search_ms = time_search(index, queries, args.k, args.repeat) * 1000
+                    print(f"{num_entries:>8}{dimensions:>6}  {dtype:<8}{size_mb:>8.1f}{search_ms:>11.2f}{recall:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Query-time benchmark of the conversation search index.
+
+Indexes synthetic conversations drawn from a Zipf-distributed vocabulary into
+a temporary SearchIndex, then times searches for common, mid-frequency and
+rare words, and for a prefix as typed in the sidebar:
+
+    python benchmarks/bench_search.py --conversations 1000 10000 50000
+
+Reports indexing throughput and the median query time per kind of query.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.models import Message
+from src.storage.search_index import SearchIndex
+
+VOCABULARY_SIZE = 20000
+
+def make_vocabulary(rng: random.Random) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(VOCABULARY_SIZE)]
+
+def make_conversation(rng: random.Random, vocabulary: list, cum_weights: list, num_messages: int) -> list:
+    """Alternating user and assistant messages of realistic lengths."""
+    messages = []
+    for i in range(num_messages):
+        kind = ("user", "assistant")[i % 2]
+        length = {"user": 40, "assistant": 350}[kind]
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(length // 2, length * 2))
+        messages.append(Message(content=" ".join(words), type=kind))
+    return messages
+
+def time_query(index: SearchIndex, query: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversation search")
+    parser.add_argument("--conversations", type=int, nargs="+", default=[1000, 10000], help="Indexed conversations")
+    parser.add_argument("--messages", type=int, default=10, help="Messages per conversation")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query (median is reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY_SIZE)))
+    queries = {
+        "common": vocabulary[0],
+        "mid": vocabulary[500],
+        "rare": vocabulary[15000],
+        "two words": f"{vocabulary[50]} {vocabulary[800]}",
+        "prefix": vocabulary[300][:3],
+    }
+
+    print(f"{'conversations':>13}  {'index conv/s':>12}  " + "".join(f"{name + ' ms':>14}" for name in queries))
+    for num_conversations in args.conversations:
+        with tempfile.TemporaryDirectory() as directory:
+            index = SearchIndex(os.path.join(directory, "search_index.db"))
+            start = time.perf_counter()
+            for i in range(num_conversations):
+                messages = make_conversation(rng, vocabulary, cum_weights, args.messages)
+                index.index(f"conversation-{i}", messages, messages[0].content[:30], "default")
+            indexing_rate = num_conversations / (time.perf_counter() - start)
+            timings = [time_query(index, query, args.repeat) * 1000 for query in queries.values()]
+            print(f"{num_conversations:>13}  {indexing_rate:>12.0f}  " + "".join(f"{ms:>14.2f}" for ms in timings))
+
+if __name__ == "__main__":
+    main()
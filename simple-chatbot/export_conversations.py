@@ -0,0 +1,37 @@
+import argparse
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from src.core.config import settings
+from src.storage.export import ConversationExporter
+
+def main():
+    """Export all conversations to per-message JSONL or Parquet files."""
+    parser = argparse.ArgumentParser(description="Export conversations from DynamoDB")
+    parser.add_argument("output_dir", help="Directory for the exported files; rerun with the same one to resume")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="gzip JSON Lines or Parquet")
+    parser.add_argument("--segments", type=int, default=settings.EXPORT_SEGMENTS, help="Parallel Scan segments")
+    parser.add_argument("--workers", type=int, default=None, help="Scanning threads (default: one per segment)")
+    parser.add_argument("--rows-per-file", type=int, default=settings.EXPORT_ROWS_PER_FILE, help="Messages per part file")
+    args = parser.parse_args()
+
+    exporter = ConversationExporter(
+        args.output_dir,
+        file_format=args.format,
+        segments=args.segments,
+        workers=args.workers,
+        rows_per_file=args.rows_per_file
+    )
+    stats = exporter.run()
+    print(
+        f"Exported {stats.conversations} conversations ({stats.messages} messages) to {stats.files} files "
+        f"in {stats.seconds:.1f}s, {stats.conversations / max(stats.seconds, 1e-9):.0f} conversations/s"
+    )
+    if stats.skipped:
+        print(f"Skipped {stats.skipped} conversations that couldn't be decoded; see the log")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from src.storage.conversation_store import ConversationStore
 from src.storage.dynamodb import DynamoDBStorage
 from src.core.config import settings
 
@@ -10,6 +11,11 @@ def init_project():
     storage = DynamoDBStorage()
     storage.create_table_if_not_exists()
     
+    # Conversations from before the recency index are only listed once backfilled
+    print("Backfilling conversations saved before the recency index...")
+    backfilled = ConversationStore(durable=storage).backfill()
+    print(f"Backfilled {backfilled} conversations")
+    
     print("Project initialization complete!")
 
 if __name__ == "__main__":
@@ -18,5 +18,8 @@ setup(
         "langchain-core",
         "streamlit==1.39.0",
         "streamlit-keyup==0.2.4",
+        "msgpack",
+        "zstandard",
+        "numpy",
     ],
 ) 
\ No newline at end of file
@@ -15,18 +15,41 @@ class Settings:
     
     # DynamoDB Configuration
     DYNAMODB_TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "chatbot_conversations")
+    DYNAMODB_BILLING_MODE = os.getenv("DYNAMODB_BILLING_MODE", "PAY_PER_REQUEST")  # or PROVISIONED
+    DYNAMODB_READ_CAPACITY = int(os.getenv("DYNAMODB_READ_CAPACITY", "5"))  # PROVISIONED only
+    DYNAMODB_WRITE_CAPACITY = int(os.getenv("DYNAMODB_WRITE_CAPACITY", "5"))  # PROVISIONED only
+    CONVERSATION_TTL_DAYS = int(os.getenv("CONVERSATION_TTL_DAYS", "0"))  # Days after the last save until deletion; 0 keeps conversations forever
+    CHAT_OWNER = os.getenv("CHAT_OWNER", "default")  # Owner recorded on conversations
+    SESSION_PAGE_SIZE = 20  # Conversations per page in the sidebar
+    SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")  # Local full-text index of conversations
+    SEARCH_PAGE_SIZE = 10  # Search results per page in the sidebar
+    REASONING_TTL_DAYS = int(os.getenv("REASONING_TTL_DAYS", "30"))  # 0 keeps reasoning until its conversation is deleted
     
     # LLM Configuration
     AVAILABLE_MODELS: Dict[str, Dict] = {
         "Claude 3.7 Sonnet": {
             "provider": "bedrock",
             "model_id": "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-            "description": "Latest Claude 3 Sonnet model - Latest Model with Best quality responses"
+            "description": "Latest Claude 3 Sonnet model - Latest Model with Best quality responses",
+            # A backup request goes to another region when the first token is late
+            # (see src/core/hedging.py); threshold_seconds None learns it from the recent p95
+            "hedge": {
+                "fallback": {"region": "us-east-1"},
+                "threshold_seconds": None,
+                "default_threshold_seconds": 10.0,
+                "max_hedge_rate": 0.1
+            }
         },
         "Claude 3.5 Sonnet v2": {
             "provider": "bedrock",
             "model_id": "anthropic.claude-3-5-sonnet-20241022-v2:0",
-            "description": "Claude 3.5 Sonnet v2 - Best in terms of quality and speed"
+            "description": "Claude 3.5 Sonnet v2 - Best in terms of quality and speed",
+            "hedge": {
+                "fallback": {"model_id": "us.anthropic.claude-3-5-sonnet-20241022-v2:0", "region": "us-east-1"},
+                "threshold_seconds": None,
+                "default_threshold_seconds": 5.0,
+                "max_hedge_rate": 0.1
+            }
         },
         # "Deepseek R1": {
         #     "provider": "bedrock",
@@ -37,10 +60,35 @@ class Settings:
     DEFAULT_MODEL = "Claude 3.5 Sonnet v2"
     
     # Memory Configuration
-    MAX_HISTORY_LENGTH = 50  # Maximum number of messages to keep in memory
+    MAX_HISTORY_LENGTH = 50  # Maximum number of recent messages sent to the model
+    HISTORY_PAGE_SIZE = 30  # Messages shown in the chat at first, and added per "Show earlier messages"
     
-    # Storage Configuration
-    STORAGE_BATCH_SIZE = 20  # Number of messages before storing to DynamoDB
+    # Long-term memory (see src/core/memory.py)
+    MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+    MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", "memory_index")
+    MEMORY_EMBEDDING_MODEL = os.getenv("MEMORY_EMBEDDING_MODEL", "amazon.titan-embed-text-v2:0")
+    MEMORY_EMBEDDING_DIMENSIONS = 512  # 256, 512 or 1024: fewer is smaller and faster to search, more recalls better
+    MEMORY_VECTOR_DTYPE = "float32"  # float16 halves the index size but searches slower
+    MEMORY_MAX_ENTRIES = 100000  # The oldest messages are forgotten beyond this
+    MEMORY_EMBEDDING_BATCH_SIZE = 16  # Messages embedded per batch when remembering
+    MEMORY_QUERY_MESSAGES = 2  # Latest messages of the conversation used to recall memories
+    MEMORY_TOP_K = 3  # Remembered messages added to the prompt
+    MEMORY_MIN_SIMILARITY = 0.4  # Cosine similarity below which memories are ignored
+    MEMORY_SNIPPET_CHARS = 500  # Characters of each remembered message kept for the prompt
+    
+    # Turn Configuration
+    TURN_ABANDON_SECONDS = 30  # Cancel a generation nobody has watched for this long
+    TURN_CANCEL_TIMEOUT = 10  # Seconds to wait for a cancelled generation to stop
+
+    # Stored conversation encoding (see src/storage/codec.py)
+    STORAGE_CODEC = os.getenv("STORAGE_CODEC", "msgpack")  # or json
+    STORAGE_COMPRESSION_THRESHOLD = 2048  # Payloads larger than this many bytes are compressed
+    STORAGE_COMPRESSION_LEVEL = 3  # zstd level
+
+    # Bulk export (see src/storage/export.py)
+    EXPORT_SEGMENTS = 8  # Parallel Scan segments
+    EXPORT_ROWS_PER_FILE = 50000  # Messages per part file; progress is checkpointed per part
+    EXPORT_QUEUE_PAGES = 16  # Scanned pages waiting to be written before the scan pauses
 
     # Redis Configuration
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
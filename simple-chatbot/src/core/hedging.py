@@ -0,0 +1,235 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Learned thresholds need this many observed first-token latencies
+MIN_LATENCY_SAMPLES = 20
+
+@dataclass
+class HedgeStats:
+    """How often hedges were needed, allowed and useful for one model."""
+    requests: int = 0
+    hedges_fired: int = 0
+    hedges_won: int = 0
+    hedges_denied: int = 0
+    error_fallbacks: int = 0
+
+class LatencyTracker:
+    """Recent time-to-first-token latencies of a model."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th quantile of recent latencies, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+class HedgeBudget:
+    """Caps the share of recent requests that fire a hedge."""
+
+    def __init__(self, max_rate: float, window: int = 200):
+        self.max_rate = max_rate
+        self._hedged = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def allows_hedge(self) -> bool:
+        with self._lock:
+            return sum(self._hedged) + 1 <= self.max_rate * (len(self._hedged) + 1)
+
+    def record(self, hedged: bool):
+        with self._lock:
+            self._hedged.append(hedged)
+
+class HedgePolicy:
+    """When to send a backup request for one model.
+
+    A backup request is sent when the first token hasn't arrived after
+    `threshold_seconds`, or, when that is None, after the recent p95 of the
+    model's time to first token (`default_threshold_seconds` until enough
+    latencies are known). At most `max_hedge_rate` of requests are hedged.
+    When a hedge wins, the primary's latency is recorded as the time it had
+    waited by then, a lower bound of its time to first token.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        threshold_seconds: Optional[float] = None,
+        default_threshold_seconds: float = 10.0,
+        max_hedge_rate: float = 0.1,
+        percentile: float = 0.95,
+    ):
+        self.model_id = model_id
+        self.threshold_seconds = threshold_seconds
+        self.default_threshold_seconds = default_threshold_seconds
+        self.percentile = percentile
+        self.latency = LatencyTracker()
+        self.budget = HedgeBudget(max_hedge_rate)
+        self.stats = HedgeStats()
+
+    def threshold(self) -> float:
+        if self.threshold_seconds is not None:
+            return self.threshold_seconds
+        learned = self.latency.percentile(self.percentile)
+        return learned if learned is not None else self.default_threshold_seconds
+
+_policies: Dict[str, HedgePolicy] = {}
+_policies_lock = threading.Lock()
+
+def get_hedge_policy(model_config: Dict[str, Any]) -> Optional[HedgePolicy]:
+    """The shared hedge policy of a model, or None if the model isn't hedged."""
+    hedge = model_config.get("hedge")
+    if not hedge:
+        return None
+    with _policies_lock:
+        policy = _policies.get(model_config["model_id"])
+        if policy is None:
+            policy = _policies[model_config["model_id"]] = HedgePolicy(
+                model_config["model_id"],
+                threshold_seconds=hedge.get("threshold_seconds"),
+                default_threshold_seconds=hedge.get("default_threshold_seconds", 10.0),
+                max_hedge_rate=hedge.get("max_hedge_rate", 0.1),
+            )
+        return policy
+
+def get_hedge_stats() -> Dict[str, Dict[str, Any]]:
+    """Hedge counters and the current threshold per model."""
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {
+        policy.model_id: {**asdict(policy.stats), "threshold_seconds": round(policy.threshold(), 3)}
+        for policy in policies
+    }
+
+async def _first_chunk(stream: AsyncIterator):
+    """Wait for a stream's first chunk, returning the iterator and the chunk."""
+    iterator = stream.__aiter__()
+    try:
+        return iterator, await iterator.__anext__()
+    except BaseException:
+        await _close(iterator)
+        raise
+
+async def _close(iterator):
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        with suppress(Exception):
+            await aclose()
+
+async def _discard(task: asyncio.Task, stream: AsyncIterator):
+    """Cancel a losing attempt and close its stream."""
+    if not task.done():
+        task.cancel()
+        with suppress(BaseException):
+            await task
+    await _close(stream)
+
+async def hedged_astream(
+    policy: Optional[HedgePolicy],
+    primary: Callable[[], AsyncIterator],
+    backup: Optional[Callable[[], AsyncIterator]] = None,
+) -> AsyncIterator:
+    """Stream from `primary`, racing a `backup` stream when the first token is late.
+
+    The first stream to produce a chunk wins and the other is cancelled and
+    closed. Closing only stops the losing request if its stream releases the
+    underlying response when closed (see bedrock_astream in src/graph/nodes.py);
+    otherwise the loser keeps generating until it is garbage collected. If the
+    primary fails before streaming, the backup is used as a fallback.
+    """
+    if policy is None or backup is None:
+        async for chunk in primary():
+            yield chunk
+        return
+
+    stats = policy.stats
+    stats.requests += 1
+    start = time.perf_counter()
+    # Each attempt's task and the stream it reads, kept so the loser can be closed
+    attempts = {}
+
+    def launch(name: str, factory: Callable[[], AsyncIterator]) -> asyncio.Task:
+        stream = factory()
+        task = asyncio.create_task(_first_chunk(stream))
+        attempts[task] = (name, stream)
+        return task
+
+    launch("primary", primary)
+    backup_task = None
+    hedged = False
+    winner = None
+    try:
+        threshold = policy.threshold()
+        done, _ = await asyncio.wait(set(attempts), timeout=threshold)
+        if not done:
+            if policy.budget.allows_hedge():
+                hedged = True
+                stats.hedges_fired += 1
+                logger.info(f"No first token from {policy.model_id} after {threshold:.1f}s, sending hedge request")
+                backup_task = launch("backup", backup)
+            else:
+                stats.hedges_denied += 1
+        policy.budget.record(hedged)
+
+        pending = set(attempts)
+        while winner is None:
+            if not pending:
+                if backup_task is not None:
+                    break
+                # The primary failed before streaming anything: fall back instead of failing the turn
+                stats.error_fallbacks += 1
+                logger.warning(f"{policy.model_id} failed before streaming, falling back")
+                backup_task = launch("backup", backup)
+                pending = {backup_task}
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if task.exception() is None), None)
+
+        primary_task = next(iter(attempts))
+        if winner is None:
+            # Every attempt failed; surface the primary's error
+            primary_task.result()
+
+        elapsed = time.perf_counter() - start
+        if attempts[winner][0] == "primary":
+            policy.latency.record(elapsed)
+        else:
+            if hedged:
+                stats.hedges_won += 1
+                logger.info(f"Hedge request won for {policy.model_id} ({stats.hedges_won}/{stats.hedges_fired} hedges won)")
+            # A primary that lost took at least this long to its first token. Recording
+            # the lower bound keeps slow requests in the learned threshold, which would
+            # otherwise only see the fast ones and drift down.
+            if not (primary_task.done() and primary_task.exception() is not None):
+                policy.latency.record(elapsed)
+        for task, (_, stream) in attempts.items():
+            if task is not winner:
+                await _discard(task, stream)
+
+        iterator, chunk = winner.result()
+        try:
+            yield chunk
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            await _close(iterator)
+    finally:
+        for task, (_, stream) in attempts.items():
+            if task is not winner:
+                await _discard(task, stream)
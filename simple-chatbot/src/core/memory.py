@@ -0,0 +1,119 @@
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_aws import BedrockEmbeddings
+
+from src.core.config import settings
+from src.core.logger import get_logger
+from src.core.models import Message
+from src.storage.vector_index import VectorEntry, VectorIndex
+
+logger = get_logger(__name__)
+
+# Message types worth remembering; reasoning is left out
+REMEMBERED_TYPES = ("user", "assistant")
+# Longer messages are cut to this many characters before embedding
+MAX_EMBEDDED_CHARS = 8000
+
+def _normalize(vectors: List[List[float]]) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class LongTermMemory:
+    """Recalls relevant messages from a user's earlier conversations.
+
+    Stored messages are embedded with a Bedrock embedding model into a local
+    VectorIndex as they are saved. Before each turn, the latest messages are
+    embedded together and the closest messages of the user's other
+    conversations are returned, to be added to the prompt instead of longer
+    histories.
+    """
+
+    def __init__(self, index: Optional[VectorIndex] = None, embeddings=None):
+        self._index = index
+        self._embeddings = embeddings
+        # Saves of one conversation can overlap; each message must be embedded once
+        self._remember_lock = threading.Lock()
+        # Deleted conversations, so a save still queued in the background doesn't re-add them
+        self._forgotten = set()
+
+    @property
+    def index(self) -> VectorIndex:
+        if self._index is None:
+            self._index = VectorIndex(
+                settings.MEMORY_INDEX_DIR,
+                settings.MEMORY_EMBEDDING_DIMENSIONS,
+                settings.MEMORY_VECTOR_DTYPE,
+                settings.MEMORY_MAX_ENTRIES
+            )
+        return self._index
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = BedrockEmbeddings(
+                model_id=settings.MEMORY_EMBEDDING_MODEL,
+                region_name=settings.AWS_REGION,
+                model_kwargs={"dimensions": settings.MEMORY_EMBEDDING_DIMENSIONS, "normalize": True}
+            )
+        return self._embeddings
+
+    def remember(self, conversation_id: str, messages: List[Message], owner: str = settings.CHAT_OWNER):
+        """Embed and index the conversation's messages added since it was last remembered."""
+        with self._remember_lock:
+            if conversation_id in self._forgotten:
+                return
+            start = self.index.indexed_count(conversation_id)
+            new = [
+                (position, message)
+                for position, message in enumerate(messages[start:], start=start)
+                if message.type in REMEMBERED_TYPES and message.content.strip()
+            ]
+            if not new:
+                return
+            
+            vectors = []
+            for batch_start in range(0, len(new), settings.MEMORY_EMBEDDING_BATCH_SIZE):
+                batch = new[batch_start:batch_start + settings.MEMORY_EMBEDDING_BATCH_SIZE]
+                vectors.extend(self.embeddings.embed_documents([message.content[:MAX_EMBEDDED_CHARS] for _, message in batch]))
+            entries = [
+                VectorEntry(conversation_id, owner, position, message.content[:settings.MEMORY_SNIPPET_CHARS])
+                for position, message in new
+            ]
+            self.index.add(entries, _normalize(vectors))
+        logger.info(f"Remembered {len(entries)} messages of conversation {conversation_id}")
+
+    def recall(self, queries: List[str], owner: str = settings.CHAT_OWNER, exclude_conversation: Optional[str] = None) -> List[str]:
+        """The remembered messages most relevant to any of the queries, best first."""
+        if not queries or len(self.index) == 0:
+            return []
+
+        vectors = _normalize(self.embeddings.embed_documents([query[:MAX_EMBEDDED_CHARS] for query in queries]))
+        results = self.index.search(
+            vectors,
+            settings.MEMORY_TOP_K,
+            owner,
+            exclude_conversation=exclude_conversation,
+            min_similarity=settings.MEMORY_MIN_SIMILARITY
+        )
+        # Merge the queries' results, keeping each message's best score
+        best = {}
+        for score, entry in (hit for hits in results for hit in hits):
+            key = (entry.conversation_id, entry.position)
+            if key not in best or score > best[key][0]:
+                best[key] = (score, entry.text)
+        ranked = sorted(best.values(), key=lambda hit: hit[0], reverse=True)
+        return [text for _, text in ranked[:settings.MEMORY_TOP_K]]
+
+    def forget(self, conversation_id: str):
+        """Remove a conversation's messages from memory, and keep them out.
+
+        Waits for a save of the conversation that is being embedded to finish.
+        """
+        with self._remember_lock:
+            self._forgotten.add(conversation_id)
+            self.index.delete(conversation_id)
+
+long_term_memory = LongTermMemory()
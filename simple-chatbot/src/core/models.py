@@ -1,19 +1,71 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
 
-class Message(BaseModel):
-    """Represents a single message in the conversation."""
+@dataclass(frozen=True, slots=True, eq=False)
+class Message:
+    """Represents a single message in the conversation.
+    
+    Messages are immutable and passed as-is through the UI, the graph and the
+    stores, so derived forms (the LangChain message, the stored row) are built
+    once per message and cached instead of being rebuilt for the whole history
+    every turn.
+    """
     content: str
-    type: str = Field(..., description="Type of message: 'user' or 'assistant'")
+    type: str  # 'user', 'assistant' or, in older conversations, 'assistant_reasoning'
+    truncated: bool = False  # Whether generation was stopped before the message was complete
+    reasoning_id: Optional[str] = None  # The assistant's reasoning trace, kept in the reasoning store
+    _cache: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def cached(self, key: str, build: Callable[["Message"], Any]) -> Any:
+        """A derived form of this message, built on first use."""
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = build(self)
+        return value
+
+    def to_record(self) -> Dict[str, Any]:
+        """The message as a plain dict; shared, so callers must not modify it."""
+        return self.cached("record", lambda m: {
+            "content": m.content,
+            "type": m.type,
+            "truncated": m.truncated,
+            "reasoning_id": m.reasoning_id
+        })
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Message":
+        return cls(
+            content=record["content"],
+            type=record["type"],
+            truncated=record.get("truncated", False),
+            reasoning_id=record.get("reasoning_id")
+        )
+
+    def _key(self) -> tuple:
+        return (self.content, self.type, self.truncated, self.reasoning_id)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
 
 class Conversation(BaseModel):
     """Represents a conversation with its messages and metadata."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
     id: str
     messages: List[Message] = Field(default_factory=list)
     title: Optional[str] = None
+    owner: str = "default"
+    updated_at: Optional[datetime] = None
 
 class ChatState(BaseModel):
     """Represents the current state of the chat in the LangGraph workflow."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
     conversation_id: str
     messages: List[Message]
     metadata: dict = Field(default_factory=dict) 
\ No newline at end of file
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+@dataclass
+class Turn:
+    """A single generation, running on the TurnManager's event loop."""
+    key: str
+    cancel_event: asyncio.Event = field(default_factory=asyncio.Event)
+    future: Optional[Future] = None
+    partial_text: str = ""
+    partial_reasoning: str = ""
+    cancelled: bool = False
+    last_seen: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def update(self, reasoning: str, text: str):
+        """Record the output streamed so far, for display while the turn runs."""
+        self.partial_reasoning = reasoning
+        self.partial_text = text
+
+class TurnManager:
+    """Runs chat turns on a background event loop so they can be cancelled.
+
+    Streamlit reruns the script on every interaction, so a turn can't be awaited
+    by the script itself: a click on Stop would have to wait for the turn to end.
+    Turns run on a loop shared by all sessions instead, one turn per key. Starting
+    a new turn cancels the key's previous one, and turns nobody has looked at for
+    `abandon_after` seconds (e.g. the browser tab was closed) are cancelled too.
+    A cancelled turn stays tracked until its task has actually ended.
+    """
+
+    def __init__(self, abandon_after: float = settings.TURN_ABANDON_SECONDS):
+        self.abandon_after = abandon_after
+        self._turns: Dict[str, Turn] = {}
+        # Cancelled turns replaced by a newer turn of their key before they ended
+        self._stopping: List[Turn] = []
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="chat-turns", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._cancel_abandoned(), self._loop)
+
+    def start(self, key: str, run: Callable[[Turn], Awaitable[Any]]) -> Turn:
+        """Start a turn, cancelling the key's previous turn if it is still running."""
+        self.cancel(key)
+        turn = Turn(key=key)
+        with self._lock:
+            previous = self._turns.get(key)
+            self._turns[key] = turn
+            still_running = previous is not None and not previous.done
+            if still_running:
+                self._stopping.append(previous)
+        if still_running:
+            # Outside the lock: the callback runs right away if the turn has ended meanwhile
+            previous.future.add_done_callback(lambda _: self._forget_stopping(previous))
+        turn.future = asyncio.run_coroutine_threadsafe(run(turn), self._loop)
+        logger.info(f"Started turn for {key}")
+        return turn
+
+    def get(self, key: str) -> Optional[Turn]:
+        """Get the key's current turn, marking it as still watched."""
+        with self._lock:
+            turn = self._turns.get(key)
+        if turn is not None:
+            turn.last_seen = time.monotonic()
+        return turn
+
+    def cancel(self, key: str):
+        """Ask the key's running turn to stop; its partial output is kept."""
+        with self._lock:
+            turn = self._turns.get(key)
+        if turn is None or turn.done or turn.cancelled:
+            return
+        turn.cancelled = True
+        self._loop.call_soon_threadsafe(turn.cancel_event.set)
+        logger.info(f"Cancelling turn for {key}")
+
+    def finish(self, key: str, timeout: float = settings.TURN_CANCEL_TIMEOUT) -> Any:
+        """Wait for the key's turn to end, remove it and return its result.
+
+        A turn that hasn't ended within `timeout` raises TimeoutError and stays
+        tracked, so it can be finished again once it has stopped.
+        """
+        with self._lock:
+            turn = self._turns.get(key)
+        if turn is None:
+            return None
+        try:
+            return turn.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Turn for {key} did not stop within {timeout}s")
+            raise
+        finally:
+            if turn.done:
+                with self._lock:
+                    if self._turns.get(key) is turn:
+                        del self._turns[key]
+
+    def _forget_stopping(self, turn: Turn):
+        with self._lock:
+            self._stopping = [stopping for stopping in self._stopping if stopping is not turn]
+        logger.info(f"Replaced turn for {turn.key} has stopped")
+
+    async def _cancel_abandoned(self):
+        while True:
+            await asyncio.sleep(min(5.0, self.abandon_after))
+            now = time.monotonic()
+            with self._lock:
+                abandoned = [
+                    key for key, turn in self._turns.items()
+                    if not turn.done and not turn.cancelled and now - turn.last_seen > self.abandon_after
+                ]
+            for key in abandoned:
+                logger.info(f"Turn for {key} was abandoned")
+                self.cancel(key)
+
+turn_manager = TurnManager()
@@ -7,9 +7,9 @@ from src.graph.state import ChatbotState
 from src.core.config import settings
 from src.graph.nodes import (
     message_handler_node,
+    memory_node,
     conversation_node,
-    storage_node,
-    should_store
+    storage_node
 )
 
 @lru_cache(maxsize=1)
@@ -21,6 +21,7 @@ def create_chat_graph() -> StateGraph:
     
     # Add nodes
     graph.add_node("message_handler", message_handler_node)
+    graph.add_node("memory", memory_node)
     graph.add_node("conversation", conversation_node)
     graph.add_node("storage", storage_node)
     
@@ -28,18 +29,14 @@ def create_chat_graph() -> StateGraph:
     # Start with message handling
     graph.add_edge(START, "message_handler")
     
+    # Recall relevant messages from earlier conversations
+    graph.add_edge("message_handler", "memory")
+    
     # Then process conversation
-    graph.add_edge("message_handler", "conversation")
+    graph.add_edge("memory", "conversation")
     
-    # Add conditional edge for storage
-    graph.add_conditional_edges(
-        "conversation",
-        should_store,
-        {
-            "store": "storage",  # Store if needed
-            "skip": END  # Skip storage
-        }
-    )
+    # Store every turn; the conversation store writes through to DynamoDB
+    graph.add_edge("conversation", "storage")
     graph.add_edge("storage", END)
     
     return graph
@@ -55,5 +52,7 @@ def create_initial_state(conversation_id: str, model_name: str = None) -> Dict[s
         "conversation_id": conversation_id,
         "messages": [],
         "metadata": {},
+        "memories": [],
+        "reasoning": {},
         "model_config": model_config
     } 
\ No newline at end of file
@@ -1,157 +1,303 @@
-from typing import Dict, Any
-from langchain_core.messages import HumanMessage, AIMessage
+import asyncio
+import threading
+from contextlib import suppress
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 # from langchain_community.chat_models import BedrockChat
 from langchain_aws import ChatBedrockConverse
 from typing_extensions import Literal
 
 from src.core.config import settings
 from src.core.models import Message
-from src.storage.dynamodb import DynamoDBStorage
+from src.storage.conversation_store import ConversationStore
+from src.storage.reasoning_store import new_reasoning_id
 from src.core.logger import get_logger
+from src.core.hedging import get_hedge_policy, hedged_astream
+from src.core.memory import long_term_memory
 
 # Initialize storage and logger
-storage = DynamoDBStorage()
+store = ConversationStore()
 logger = get_logger(__name__)
 
+# Reply recorded for a turn that was stopped before the model wrote any text
+STOPPED_PLACEHOLDER = "(Response stopped before it started.)"
+
+class ClosableStreamClient:
+    """Wraps a bedrock-runtime client, keeping the response streams it opens so they can be closed.
+
+    ChatBedrockConverse reads Bedrock's response stream in an executor thread.
+    Cancelling the asyncio side only abandons that thread's iterator, and the
+    HTTP stream stays open, with Bedrock still generating, until the iterator
+    is garbage collected. Closing the streams ends the generation.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._streams = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def converse_stream(self, **kwargs):
+        response = self._client.converse_stream(**kwargs)
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._streams.append(response["stream"])
+        if closed:
+            # The stream was closed while the request was in flight
+            response["stream"].close()
+        return response
+
+    def close_streams(self):
+        with self._lock:
+            self._closed = True
+            streams, self._streams = self._streams, []
+        for stream in streams:
+            with suppress(Exception):
+                stream.close()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
 def get_bedrock_chat(model_config: Dict[str, str]):
-    """Get the Bedrock chat model."""
+    """Get the Bedrock chat model, for a single streamed response (see bedrock_astream)."""
     think_params= {
         "thinking": {
             "type": "enabled",
             "budget_tokens": 16000
         }
     }
-    return ChatBedrockConverse(
+    chat = ChatBedrockConverse(
         model_id=model_config["model_id"],
-        region_name=settings.AWS_REGION,
+        region_name=model_config.get("region", settings.AWS_REGION),
         max_tokens=16001,
         additional_model_request_fields=think_params
         # model_kwargs={"temperature": 0.7}
     )
+    chat.client = ClosableStreamClient(chat.client)
+    return chat
+
+async def bedrock_astream(chat, lc_messages: List) -> AsyncIterator:
+    """Stream a response, closing Bedrock's response stream when the stream is closed or cancelled."""
+    try:
+        async for chunk in chat.astream(lc_messages):
+            yield chunk
+    finally:
+        chat.client.close_streams()
+
+def _build_langchain_message(message: Message) -> Optional[BaseMessage]:
+    if message.type == "user":
+        return HumanMessage(content=message.content)
+    if message.type == "assistant":
+        return AIMessage(content=message.content)
+    return None
+
+def to_langchain(message: Message) -> Optional[BaseMessage]:
+    """The message in LangChain form, or None for messages the model doesn't see."""
+    if message.type not in ("user", "assistant"):
+        return None
+    return message.cached("langchain", _build_langchain_message)
 
 async def message_handler_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Process incoming messages and prepare for conversation."""
     logger.info("Entering message_handler_node")
-    logger.debug(f"Input state: {state}")
+    logger.debug("Input state: %s", state)
     
     # Get the last message
     last_message = state["messages"][-1]
     logger.info(f"Processing message: {last_message}")
     
     # Convert to LangChain format for the model
-    if last_message["type"] == "user":
-        lc_message = HumanMessage(content=last_message["content"])
-    else:
-        lc_message = AIMessage(content=last_message["content"])
+    lc_message = to_langchain(last_message)
     
     logger.info("Exiting message_handler_node")
     return {"current_message": lc_message}
 
-async def conversation_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def memory_prompt(memories: List[str]) -> str:
+    """System prompt giving the model what it remembers from earlier conversations."""
+    excerpts = "\n\n".join(f"- {memory}" for memory in memories)
+    return (
+        "Excerpts from the user's earlier conversations that may be relevant. "
+        "Use them only if they help answer the current message:\n\n" + excerpts
+    )
+
+async def memory_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Recall messages from the user's earlier conversations relevant to this turn."""
+    logger.info("Entering memory_node")
+    if not settings.MEMORY_ENABLED:
+        return {"memories": []}
+    
+    queries = [
+        message.content
+        for message in state["messages"][-settings.MEMORY_QUERY_MESSAGES:]
+        if message.type in ("user", "assistant")
+    ]
+    try:
+        # Embedding calls Bedrock, so it runs off the event loop
+        memories = await asyncio.to_thread(
+            long_term_memory.recall, queries, exclude_conversation=state["conversation_id"]
+        )
+    except Exception as e:
+        # A turn without memories is better than a failed turn
+        logger.warning(f"Failed to recall memories: {e}")
+        memories = []
+    
+    logger.info(f"Recalled {len(memories)} memories")
+    return {"memories": memories}
+
+async def conversation_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
     """Process the conversation and generate a response."""
     logger.info("Entering conversation_node")
-    logger.debug(f"Input state: {state}")
-    
-    # Get all messages for context
-    lc_messages = []
-    for msg in state["messages"]:
-        logger.debug(f"Converting message: {msg}")
-        message_type = msg.get("type", "")
-        logger.info(f"Message type: {message_type}")
-        
-        if message_type == "user":
-            logger.info("Converting to HumanMessage")
-            lc_messages.append(HumanMessage(content=msg["content"]))
-        elif message_type == "assistant":
-            logger.info("Converting to AIMessage")
-            lc_messages.append(AIMessage(content=msg["content"]))
-        else:
-            logger.warning(f"Unknown message type: {message_type}")
+    logger.debug("Input state: %s", state)
+    
+    # Get the most recent messages for context; reasoning isn't sent back to the model
+    lc_messages = [
+        lc_message
+        for lc_message in map(to_langchain, state["messages"][-settings.MAX_HISTORY_LENGTH:])
+        if lc_message is not None
+    ]
+    if state.get("memories"):
+        lc_messages.insert(0, SystemMessage(content=memory_prompt(state["memories"])))
+    logger.info(f"Sending {len(lc_messages)} messages to the model")
     
-    logger.info(f"Converted messages for model: {lc_messages}")
+    # A cancellable turn passes its cancel event and a callback for partial output
+    configurable = (config or {}).get("configurable", {})
+    cancel_event = configurable.get("cancel_event")
+    on_partial = configurable.get("on_partial")
     
     # Get response from selected model
-    chat = get_bedrock_chat(state["model_config"])
     try:
-        response = await chat.ainvoke(lc_messages)
-        logger.info(f"Received response from model: {response}")
+        stream = model_stream(state["model_config"], lc_messages)
+        content, truncated = await stream_response(stream, cancel_event, on_partial)
+        logger.info(f"Received response from model (truncated: {truncated}): {content}")
         
-        # Handle Claude 3.7 response format
-        if isinstance(response.content, list) and state["model_config"]["model_id"] == "us.anthropic.claude-3-7-sonnet-20250219-v1:0":
-            # Extract reasoning and final response
-            reasoning = None
-            final_response = None
-            
-            for content in response.content:
-                if content.get("type") == "reasoning_content":
-                    reasoning = content["reasoning_content"]["text"]
-                elif content.get("type") == "text":
-                    final_response = content["text"]
-            
-            # Create messages for both reasoning and response
-            messages = []
-            if reasoning:
-                messages.append({
-                    "content": reasoning,
-                    "type": "assistant_reasoning"
-                })
-            if final_response:
-                messages.append({
-                    "content": final_response,
-                    "type": "assistant"
-                })
-            
-            return {"messages": messages}
-        else:
-            # Handle regular response format
-            return {"messages": [{
-                "content": response.content,
-                "type": "assistant"
-            }]}
+        reasoning, final_response = split_response_content(content)
+        
+        if not (final_response or truncated):
+            return {"messages": [], "reasoning": {}}
+        
+        # Reasoning is stored on its own and referenced from the response
+        reasoning_id = new_reasoning_id() if reasoning else None
+        # Bedrock requires turns to alternate, so a turn stopped before any text still gets a reply
+        message = Message(
+            content=final_response or STOPPED_PLACEHOLDER,
+            type="assistant",
+            truncated=truncated,
+            reasoning_id=reasoning_id
+        )
+        
+        return {"messages": [message], "reasoning": {reasoning_id: reasoning} if reasoning_id else {}}
             
     except Exception as e:
         logger.error(f"Error from model: {str(e)}")
         raise
 
-async def storage_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Store the conversation in DynamoDB."""
-    logger.info("Entering storage_node")
-    logger.debug(f"Input state: {state}")
-    
-    from src.core.models import Conversation, Message
+def split_response_content(content: Any) -> Tuple[Optional[str], str]:
+    """Split model output into its reasoning and final text."""
+    if not isinstance(content, list):
+        return None, content or ""
     
-    # Convert dict messages to Message objects
-    messages = [
-        Message(
-            content=msg["content"],
-            type=msg["type"]
-        )
-        for msg in state["messages"]
-    ]
+    # Claude 3.7 returns reasoning and text as separate content blocks
+    reasoning = ""
+    text = ""
+    for block in content:
+        if block.get("type") == "reasoning_content":
+            reasoning += block["reasoning_content"].get("text", "")
+        elif block.get("type") == "text":
+            text += block["text"]
+    return reasoning or None, text
+
+def model_stream(model_config: Dict[str, Any], lc_messages: List) -> AsyncIterator:
+    """Stream the model's response, hedged with the model's fallback when it has one."""
+    chat = get_bedrock_chat(model_config)
+    hedge = model_config.get("hedge")
+    if not hedge:
+        return bedrock_astream(chat, lc_messages)
     
-    # Create conversation object
-    conversation = Conversation(
-        id=state["conversation_id"],
-        messages=messages
+    fallback_chat = get_bedrock_chat({**model_config, **hedge["fallback"]})
+    return hedged_astream(
+        get_hedge_policy(model_config),
+        lambda: bedrock_astream(chat, lc_messages),
+        lambda: bedrock_astream(fallback_chat, lc_messages),
     )
+
+async def stream_response(stream: AsyncIterator, cancel_event: Optional[asyncio.Event] = None, on_partial=None) -> Tuple[Any, bool]:
+    """Stream a model response, stopping early when `cancel_event` is set.
+    
+    Returns the content received so far and whether the response was cut short.
+    Stopping closes the model stream, and with it Bedrock's HTTP response stream
+    (see ClosableStreamClient), so Bedrock stops generating the rest.
+    """
+    response = None
+    
+    async def consume():
+        nonlocal response
+        async for chunk in stream:
+            response = chunk if response is None else response + chunk
+            if on_partial:
+                on_partial(*split_response_content(response.content))
+    
+    consumer = asyncio.create_task(consume())
+    if cancel_event is None:
+        await consumer
+        return response.content if response else "", False
+    
+    cancelled = asyncio.create_task(cancel_event.wait())
+    try:
+        await asyncio.wait({consumer, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        cancelled.cancel()
+    if consumer.done():
+        consumer.result()  # Re-raise model errors
+        return response.content if response else "", False
+    
+    consumer.cancel()
+    try:
+        await consumer
+    except asyncio.CancelledError:
+        pass
+    # Closing the stream closes Bedrock's response stream, if cancelling hasn't already
+    if hasattr(stream, "aclose"):
+        await stream.aclose()
+    logger.info("Generation cancelled, keeping partial output")
+    return response.content if response else "", True
+
+async def storage_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the conversation in Redis and DynamoDB."""
+    logger.info("Entering storage_node")
+    logger.debug("Input state: %s", state)
     
-    # Save to DynamoDB
+    # Save to both storage tiers; reasoning first, so saved messages never reference a missing trace
     try:
-        storage.save_conversation(conversation)
-        logger.info("Successfully saved conversation to DynamoDB")
+        store.reasoning.save_all(state.get("reasoning", {}))
+        store.save(state["conversation_id"], state["messages"])
+        logger.info("Successfully saved conversation")
     except Exception as e:
-        logger.error(f"Error saving to DynamoDB: {str(e)}")
+        logger.error(f"Error saving conversation: {str(e)}")
         raise
     
+    if settings.MEMORY_ENABLED:
+        # Embedding the new messages isn't needed to finish the turn, so it runs in the background
+        asyncio.get_running_loop().run_in_executor(None, remember, state["conversation_id"], state["messages"])
+    
     logger.info("Exiting storage_node")
     return {}
 
+def remember(conversation_id: str, messages: List[Message]):
+    """Add a conversation's new messages to long-term memory."""
+    try:
+        long_term_memory.remember(conversation_id, messages)
+    except Exception as e:
+        # Messages that failed to embed are retried on the next save
+        logger.warning(f"Failed to remember conversation {conversation_id}: {e}")
+
 def should_continue(state: Dict[str, Any]) -> Literal["continue", "__end__"]:
     """Determine if the conversation should continue."""
     logger.info("Checking if conversation should continue")
     
     # Check if the last message indicates end of conversation
-    last_message = state["messages"][-1]["content"].lower()
+    last_message = state["messages"][-1].content.lower()
     
     if "goodbye" in last_message or "bye" in last_message:
         logger.info("Conversation ending")
@@ -159,25 +305,3 @@ def should_continue(state: Dict[str, Any]) -> Literal["continue", "__end__"]:
     
     logger.info("Conversation continuing")
     return "continue"
-
-def should_store(state: Dict[str, Any]) -> Literal["store", "skip"]:
-    """Determine if we should store the conversation."""
-    logger.info("Checking if conversation should be stored")
-    
-    # Get number of messages
-    num_messages = len(state["messages"])
-    logger.info(f"Current message count: {num_messages}")
-    
-    # Store if we've reached the batch size or it's a goodbye message
-    if num_messages >= settings.STORAGE_BATCH_SIZE:
-        logger.info("Storing conversation - reached batch size")
-        return "store"
-        
-    # Check if it's a goodbye message
-    last_message = state["messages"][-1]["content"].lower()
-    if "goodbye" in last_message or "bye" in last_message:
-        logger.info("Storing conversation - goodbye message")
-        return "store"
-    
-    logger.info("Skipping storage")
-    return "skip" 
\ No newline at end of file
@@ -1,6 +1,7 @@
+import operator
 from langgraph.graph import MessagesState
 from pydantic import Field
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any
 
 from src.core.models import Message
 from src.core.config import settings
@@ -8,31 +9,26 @@ from src.core.config import settings
 class ChatbotState(MessagesState):
     """State for the chatbot workflow."""
     conversation_id: str = Field(..., description="ID of the current conversation")
-    messages: List[Dict[str, Any]] = Field(default_factory=list)
+    # Nodes return only the messages they add, which are appended to the history
+    messages: Annotated[List[Message], operator.add] = Field(default_factory=list)
     metadata: dict = Field(default_factory=dict)
-    current_message: Optional[Dict[str, Any]] = Field(default=None)
+    current_message: Optional[Any] = Field(default=None)
+    # Messages recalled from earlier conversations for this turn
+    memories: List[str] = Field(default_factory=list)
+    # Reasoning traces written this turn, by id; saved to the reasoning store, not the history
+    reasoning: Dict[str, str] = Field(default_factory=dict)
     model_config: Dict[str, Any] = Field(
         default_factory=lambda: settings.AVAILABLE_MODELS[settings.DEFAULT_MODEL],
         description="Configuration for the selected language model"
     )
 
     def add_message(self, message: Message):
-        """Add a message to the state, converting it to a dict."""
-        message_dict = {
-            "content": message.content,
-            "type": message.type,
-        }
-        self.messages.append(message_dict)
+        """Add a message to the state."""
+        self.messages.append(message)
 
     def get_messages(self) -> List[Message]:
-        """Get messages as Message objects."""
-        return [
-            Message(
-                content=msg["content"],
-                type=msg["type"]
-            )
-            for msg in self.messages
-        ]
+        """Get the state's messages."""
+        return list(self.messages)
 
     def update_model_config(self, model_name: str):
         """Update the model configuration."""
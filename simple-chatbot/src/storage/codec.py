@@ -0,0 +1,96 @@
+import json
+import threading
+from typing import List, Union
+
+import msgpack
+import zstandard
+
+from src.core.config import settings
+from src.core.models import Message
+
+# The first byte of an encoded payload tells how it was written. Legacy payloads
+# are plain JSON text, which always starts with '[' or '{'.
+FORMAT_MSGPACK = 0x01
+FORMAT_MSGPACK_ZSTD = 0x02
+
+# Messages are packed as rows in this field order, to avoid repeating the keys.
+# Fields are only ever appended, so rows written before a field existed still decode.
+MESSAGE_FIELDS = ("content", "type", "truncated", "reasoning_id")
+
+class CodecError(ValueError):
+    """Raised when a stored payload can't be decoded."""
+
+class JsonCodec:
+    """Plain JSON text, the format conversations were originally stored in."""
+
+    def encode(self, messages: List[Message]) -> bytes:
+        return json.dumps([message.to_record() for message in messages]).encode("utf-8")
+
+    def decode(self, data: Union[bytes, str]) -> List[Message]:
+        return decode(data)
+
+class MsgpackCodec:
+    """msgpack rows, compressed with zstd when larger than `compression_threshold` bytes."""
+
+    def __init__(self, compression_threshold: int = 2048, compression_level: int = 3):
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self._local = threading.local()
+
+    def encode(self, messages: List[Message]) -> bytes:
+        # Each message's packed row is cached on the message, so re-saving a long
+        # conversation only packs the new messages
+        packed = _array_header(len(messages)) + b"".join(message.cached("msgpack", _pack_row) for message in messages)
+        if len(packed) > self.compression_threshold:
+            return bytes([FORMAT_MSGPACK_ZSTD]) + self._compressor().compress(packed)
+        return bytes([FORMAT_MSGPACK]) + packed
+
+    def decode(self, data: Union[bytes, str]) -> List[Message]:
+        return decode(data)
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        # zstd contexts can't be shared between threads
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.compression_level)
+        return compressor
+
+def _pack_row(message: Message) -> bytes:
+    return msgpack.packb([getattr(message, field) for field in MESSAGE_FIELDS], use_bin_type=True)
+
+def _array_header(length: int) -> bytes:
+    return msgpack.Packer().pack_array_header(length)
+
+_local = threading.local()
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    # zstd contexts can't be shared between threads
+    decompressor = getattr(_local, "decompressor", None)
+    if decompressor is None:
+        decompressor = _local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+def decode(data: Union[bytes, str]) -> List[Message]:
+    """Decode a payload written by any codec, including legacy JSON."""
+    if not data:
+        raise CodecError("Empty payload")
+    if isinstance(data, str) or data[0] in (ord("["), ord("{")):
+        return [Message.from_record(record) for record in json.loads(data)]
+
+    version = data[0]
+    if version == FORMAT_MSGPACK:
+        packed = data[1:]
+    elif version == FORMAT_MSGPACK_ZSTD:
+        packed = _decompressor().decompress(data[1:])
+    else:
+        raise CodecError(f"Unknown payload format {version:#x}")
+    rows = msgpack.unpackb(packed, raw=False)
+    return [Message(*row) for row in rows]
+
+def get_codec(name: str = settings.STORAGE_CODEC):
+    """The codec used for writing; every codec reads all formats."""
+    if name == "json":
+        return JsonCodec()
+    if name == "msgpack":
+        return MsgpackCodec(settings.STORAGE_COMPRESSION_THRESHOLD, settings.STORAGE_COMPRESSION_LEVEL)
+    raise ValueError(f"Unknown storage codec: {name}")
@@ -0,0 +1,135 @@
+from typing import List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.logger import get_logger
+from src.core.models import Conversation, Message
+from src.storage.dynamodb import DynamoDBStorage
+from src.storage.reasoning_store import ReasoningStore
+from src.storage.redis_storage import RedisStorage
+from src.storage.search_index import SearchIndex, SearchResult
+
+logger = get_logger(__name__)
+
+def conversation_title(messages: List[Message]) -> Optional[str]:
+    """Title for a conversation, taken from its first message."""
+    if not messages:
+        return None
+    content = messages[0].content
+    return content[:30] + "..." if len(content) > 30 else content
+
+class ConversationStore:
+    """Conversations in Redis (hot tier) in front of DynamoDB (durable tier).
+
+    Writes go to both tiers, so a conversation that expires from Redis is still
+    in DynamoDB. Reads try Redis first and promote conversations found only in
+    DynamoDB back into Redis. Assistant reasoning is kept separately in
+    `self.reasoning`. Saved and opened conversations are added to a local
+    full-text index for searching.
+    """
+
+    def __init__(
+        self,
+        hot: Optional[RedisStorage] = None,
+        durable: Optional[DynamoDBStorage] = None,
+        search_index: Optional[SearchIndex] = None
+    ):
+        self.hot = hot or RedisStorage()
+        self.durable = durable or DynamoDBStorage()
+        self.reasoning = ReasoningStore(self.hot, self.durable)
+        self.search_index = search_index or SearchIndex()
+
+    def save(self, conversation_id: str, messages: List[Message], owner: str = settings.CHAT_OWNER):
+        """Save a conversation to both tiers."""
+        title = conversation_title(messages)
+        self.durable.save_conversation(Conversation(id=conversation_id, messages=messages, title=title, owner=owner))
+        self.hot.save_chat_session(conversation_id, messages)
+        self._index(conversation_id, messages, title, owner)
+
+    def _index(self, conversation_id: str, messages: List[Message], title: Optional[str], owner: str):
+        # The index can be rebuilt from the stores, so failing to update it doesn't fail the save
+        try:
+            self.search_index.index(conversation_id, messages, title, owner)
+        except Exception as e:
+            logger.warning(f"Failed to index conversation {conversation_id}: {e}")
+
+    def get(self, conversation_id: str) -> List[Message]:
+        """Get a conversation's messages, promoting it to Redis if it was only in DynamoDB."""
+        messages = self.hot.get_chat_session(conversation_id)
+        if messages:
+            self.hot.touch_chat_session(conversation_id)
+            return messages
+
+        conversation = self.durable.get_conversation(conversation_id)
+        if conversation is None:
+            return []
+        logger.info(f"Promoting conversation {conversation_id} to Redis")
+        self.hot.save_chat_session(conversation_id, conversation.messages)
+        # Conversations saved before the search index existed are indexed once opened
+        self._index(conversation_id, conversation.messages, conversation.title, conversation.owner)
+        return conversation.messages
+
+    def delete(self, conversation_id: str):
+        """Delete a conversation and its reasoning from both tiers."""
+        messages = self.hot.get_chat_session(conversation_id)
+        if not messages:
+            conversation = self.durable.get_conversation(conversation_id)
+            messages = conversation.messages if conversation else []
+        self.reasoning.delete(message.reasoning_id for message in messages if message.reasoning_id)
+        
+        self.durable.delete_conversation(conversation_id)
+        self.hot.delete_chat_session(conversation_id)
+        self.search_index.delete(conversation_id)
+
+    def backfill(self, owner: str = settings.CHAT_OWNER) -> int:
+        """Make conversations stored before the recency index listable and searchable.
+        
+        Legacy DynamoDB conversations are added to the recency index, and
+        sessions that only exist in Redis are written through to DynamoDB.
+        Both are added to the search index. Safe to run more than once.
+        
+        Returns:
+            How many conversations were backfilled
+        """
+        legacy_ids = self.durable.backfill_legacy_conversations(owner)
+        for conversation_id in legacy_ids:
+            conversation = self.durable.get_conversation(conversation_id)
+            if conversation is not None:
+                self._index(conversation_id, conversation.messages, conversation.title, owner)
+        
+        redis_only = 0
+        for conversation_id in self.hot.get_all_sessions():
+            if self.durable.get_conversation(conversation_id) is not None:
+                continue
+            messages = self.hot.get_chat_session(conversation_id)
+            if messages:
+                self.save(conversation_id, messages, owner)
+                redis_only += 1
+        logger.info(f"Backfilled {len(legacy_ids)} DynamoDB and {redis_only} Redis-only conversations")
+        return len(legacy_ids) + redis_only
+
+    def list_sessions(
+        self,
+        owner: str = settings.CHAT_OWNER,
+        limit: int = settings.SESSION_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """List an owner's conversations by id and title, most recent first.
+        
+        Every conversation is written through to DynamoDB, so its recency index
+        lists both tiers. Returns a page and the cursor for the next one.
+        """
+        return self.durable.list_conversations(owner, limit, cursor)
+
+    def search(
+        self,
+        text: str,
+        owner: str = settings.CHAT_OWNER,
+        limit: int = settings.SEARCH_PAGE_SIZE,
+        offset: int = 0
+    ) -> Tuple[List[SearchResult], bool]:
+        """Search an owner's conversations by title and message content, best matches first.
+        
+        Answered from the local index alone. Returns a page of results and
+        whether there are more.
+        """
+        return self.search_index.search(text, owner, limit, offset)
@@ -1,12 +1,49 @@
 import boto3
-from typing import List, Optional
+import base64
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List, Optional, Tuple
 import logging
 
 from src.core.config import settings
 from src.core.models import Conversation, Message
+from src.storage.codec import decode, get_codec
 
 logger = logging.getLogger(__name__)
 
+# Global secondary index on owner + updated_at, for listing recent conversations
+RECENCY_INDEX = 'owner-updated_at-index'
+# Epoch seconds after which DynamoDB deletes a conversation
+TTL_ATTRIBUTE = 'expires_at'
+# Reasoning traces share the table under prefixed ids. They have no owner, so
+# they stay out of the recency index.
+REASONING_ID_PREFIX = 'reasoning#'
+
+ATTRIBUTE_DEFINITIONS = [
+    {
+        'AttributeName': 'id',
+        'AttributeType': 'S'
+    },
+    {
+        'AttributeName': 'owner',
+        'AttributeType': 'S'
+    },
+    {
+        'AttributeName': 'updated_at',
+        'AttributeType': 'N'
+    }
+]
+
+def _encode_cursor(last_evaluated_key: dict) -> str:
+    """Opaque page cursor for a query's LastEvaluatedKey."""
+    key = {name: int(value) if isinstance(value, Decimal) else value for name, value in last_evaluated_key.items()}
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def _decode_cursor(cursor: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
 class DynamoDBStorage:
     """Handles conversation storage in DynamoDB."""
     
@@ -18,48 +55,166 @@ class DynamoDBStorage:
             region_name=settings.AWS_REGION
         )
         self.table = self.dynamodb.Table(settings.DYNAMODB_TABLE_NAME)
+        self.codec = get_codec()
         self._batch_count = 0
     
-    def create_table_if_not_exists(self):
-        """Creates the DynamoDB table if it doesn't exist."""
+    def create_table_if_not_exists(
+        self,
+        billing_mode: Optional[str] = None,
+        read_capacity: Optional[int] = None,
+        write_capacity: Optional[int] = None
+    ):
+        """Creates the DynamoDB table if it doesn't exist.
+        
+        The table has a TTL attribute for automatic expiry and a global secondary
+        index on owner and last-updated time for listing recent conversations.
+        Missing TTL settings or index are added to an existing table.
+        """
+        billing_mode = billing_mode or settings.DYNAMODB_BILLING_MODE
+        throughput = {
+            'ReadCapacityUnits': read_capacity or settings.DYNAMODB_READ_CAPACITY,
+            'WriteCapacityUnits': write_capacity or settings.DYNAMODB_WRITE_CAPACITY
+        }
+        recency_index = {
+            'IndexName': RECENCY_INDEX,
+            'KeySchema': [
+                {
+                    'AttributeName': 'owner',
+                    'KeyType': 'HASH'
+                },
+                {
+                    'AttributeName': 'updated_at',
+                    'KeyType': 'RANGE'
+                }
+            ],
+            # Only what the session list shows; messages stay out of the index
+            'Projection': {
+                'ProjectionType': 'INCLUDE',
+                'NonKeyAttributes': ['title']
+            }
+        }
+        if billing_mode == 'PROVISIONED':
+            recency_index['ProvisionedThroughput'] = throughput
+        
+        client = self.dynamodb.meta.client
         try:
-            self.dynamodb.create_table(
-                TableName=settings.DYNAMODB_TABLE_NAME,
-                KeySchema=[
+            params = {
+                'TableName': settings.DYNAMODB_TABLE_NAME,
+                'KeySchema': [
                     {
                         'AttributeName': 'id',
                         'KeyType': 'HASH'
                     }
                 ],
-                AttributeDefinitions=[
-                    {
-                        'AttributeName': 'id',
-                        'AttributeType': 'S'
-                    }
-                ],
-                ProvisionedThroughput={
-                    'ReadCapacityUnits': 5,
-                    'WriteCapacityUnits': 5
-                }
-            )
-            print(f"Table {settings.DYNAMODB_TABLE_NAME} created successfully")
-        except self.dynamodb.meta.client.exceptions.ResourceInUseException:
+                'AttributeDefinitions': ATTRIBUTE_DEFINITIONS,
+                'GlobalSecondaryIndexes': [recency_index],
+                'BillingMode': billing_mode
+            }
+            if billing_mode == 'PROVISIONED':
+                params['ProvisionedThroughput'] = throughput
+            self.dynamodb.create_table(**params)
+            client.get_waiter('table_exists').wait(TableName=settings.DYNAMODB_TABLE_NAME)
+            print(f"Table {settings.DYNAMODB_TABLE_NAME} created successfully ({billing_mode})")
+        except client.exceptions.ResourceInUseException:
             print(f"Table {settings.DYNAMODB_TABLE_NAME} already exists")
+            self._add_recency_index(recency_index)
+        
+        self._enable_ttl()
+    
+    def _add_recency_index(self, recency_index: dict):
+        """Adds the recency index to a table created without it."""
+        description = self.dynamodb.meta.client.describe_table(TableName=settings.DYNAMODB_TABLE_NAME)['Table']
+        indexes = [index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])]
+        if RECENCY_INDEX in indexes:
+            return
+        if 'ProvisionedThroughput' not in recency_index and description.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+            # Tables from before billing modes were selectable are provisioned
+            recency_index['ProvisionedThroughput'] = {
+                'ReadCapacityUnits': description['ProvisionedThroughput']['ReadCapacityUnits'],
+                'WriteCapacityUnits': description['ProvisionedThroughput']['WriteCapacityUnits']
+            }
+        self.dynamodb.meta.client.update_table(
+            TableName=settings.DYNAMODB_TABLE_NAME,
+            AttributeDefinitions=ATTRIBUTE_DEFINITIONS,
+            GlobalSecondaryIndexUpdates=[{'Create': recency_index}]
+        )
+        print(f"Adding index {RECENCY_INDEX}; conversations saved before it are added by backfill_legacy_conversations")
+    
+    def _enable_ttl(self):
+        """Turns on automatic expiry of conversations on the TTL attribute."""
+        client = self.dynamodb.meta.client
+        ttl = client.describe_time_to_live(TableName=settings.DYNAMODB_TABLE_NAME)['TimeToLiveDescription']
+        if ttl.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+            return
+        client.update_time_to_live(
+            TableName=settings.DYNAMODB_TABLE_NAME,
+            TimeToLiveSpecification={
+                'Enabled': True,
+                'AttributeName': TTL_ATTRIBUTE
+            }
+        )
+        print(f"Enabled TTL on {TTL_ATTRIBUTE}")
+    
+    def backfill_legacy_conversations(self, owner: str = settings.CHAT_OWNER) -> List[str]:
+        """Adds conversations saved before the recency index to it.
+        
+        Conversations without an owner get `owner`, an `updated_at` of now and,
+        when CONVERSATION_TTL_DAYS is set, an expiry. Running it again only
+        touches conversations that still have no owner.
+        
+        Returns:
+            The ids of the updated conversations
+        """
+        now = time.time()
+        update = 'SET #owner = :owner, updated_at = :updated_at'
+        values = {':owner': owner, ':updated_at': int(now * 1000)}
+        if settings.CONVERSATION_TTL_DAYS:
+            update += f', {TTL_ATTRIBUTE} = :expires_at'
+            values[':expires_at'] = int(now) + settings.CONVERSATION_TTL_DAYS * 86400
+        
+        scan_kwargs = {
+            'ProjectionExpression': 'id',
+            'FilterExpression': 'attribute_not_exists(#owner) AND NOT begins_with(id, :reasoning)',
+            'ExpressionAttributeNames': {'#owner': 'owner'},
+            'ExpressionAttributeValues': {':reasoning': REASONING_ID_PREFIX}
+        }
+        updated = []
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                try:
+                    self.table.update_item(
+                        Key={'id': item['id']},
+                        UpdateExpression=update,
+                        # A conversation saved meanwhile already has its owner and time
+                        ConditionExpression='attribute_not_exists(#owner)',
+                        ExpressionAttributeNames={'#owner': 'owner'},
+                        ExpressionAttributeValues=values
+                    )
+                    updated.append(item['id'])
+                except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+                    continue
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        logger.info(f"Backfilled {len(updated)} conversations into {RECENCY_INDEX}")
+        return updated
     
     def save_conversation(self, conversation: Conversation):
         """Saves a conversation to DynamoDB."""
         # Convert the conversation to a dictionary
+        now = time.time()
         item = {
             'id': conversation.id,
-            'messages': [
-                {
-                    'content': msg.content,
-                    'type': msg.type
-                }
-                for msg in conversation.messages
-            ],
+            'owner': conversation.owner,
+            'updated_at': int(now * 1000),
+            # Messages are stored as one encoded binary attribute rather than a
+            # nested list of maps, which is smaller and cheaper to write and read
+            'payload': self.codec.encode(conversation.messages),
             'title': conversation.title
         }
+        if settings.CONVERSATION_TTL_DAYS:
+            item[TTL_ATTRIBUTE] = int(now) + settings.CONVERSATION_TTL_DAYS * 86400
         
         try:
             self.table.put_item(Item=item)
@@ -75,19 +230,97 @@ class DynamoDBStorage:
         if 'Item' not in response:
             return None
             
-        item = response['Item']
+        return conversation_from_item(response['Item'])
+    
+    def list_conversations(
+        self,
+        owner: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """Lists an owner's conversations by id and title, most recently updated first.
         
-        # Convert messages back to Message objects
-        messages = [
-            Message(
-                content=msg['content'],
-                type=msg['type']
+        Reads one page from the recency index, so the cost depends on the page
+        size rather than on the number of conversations.
+        
+        Returns:
+            The page of conversations (without messages) and the cursor for the
+            next page, or None on the last page
+        """
+        query_kwargs = {
+            'IndexName': RECENCY_INDEX,
+            'KeyConditionExpression': '#owner = :owner',
+            'ExpressionAttributeNames': {'#owner': 'owner'},
+            'ExpressionAttributeValues': {':owner': owner},
+            'ScanIndexForward': False,
+            'Limit': limit
+        }
+        if cursor:
+            query_kwargs['ExclusiveStartKey'] = _decode_cursor(cursor)
+        response = self.table.query(**query_kwargs)
+        conversations = [
+            Conversation(
+                id=item['id'],
+                title=item.get('title'),
+                owner=item['owner'],
+                updated_at=_to_datetime(item['updated_at'])
             )
-            for msg in item['messages']
+            for item in response.get('Items', [])
         ]
-        
-        return Conversation(
-            id=item['id'],
-            messages=messages,
-            title=item.get('title')
-        ) 
\ No newline at end of file
+        last_key = response.get('LastEvaluatedKey')
+        return conversations, _encode_cursor(last_key) if last_key else None
+    
+    def delete_conversation(self, conversation_id: str):
+        """Deletes a conversation from DynamoDB."""
+        self.table.delete_item(Key={'id': conversation_id})
+    
+    def save_reasoning(self, reasoning_id: str, reasoning: str):
+        """Saves a reasoning trace, expiring after REASONING_TTL_DAYS."""
+        item = {
+            'id': REASONING_ID_PREFIX + reasoning_id,
+            'reasoning': reasoning
+        }
+        if settings.REASONING_TTL_DAYS:
+            item[TTL_ATTRIBUTE] = int(time.time()) + settings.REASONING_TTL_DAYS * 86400
+        self.table.put_item(Item=item)
+    
+    def get_reasoning(self, reasoning_id: str) -> Optional[str]:
+        """Retrieves a reasoning trace, or None if it has expired."""
+        response = self.table.get_item(
+            Key={'id': REASONING_ID_PREFIX + reasoning_id},
+            ProjectionExpression='reasoning, #expires_at',
+            ExpressionAttributeNames={'#expires_at': TTL_ATTRIBUTE}
+        )
+        item = response.get('Item')
+        # DynamoDB deletes expired items in the background, up to days later;
+        # traces written with REASONING_TTL_DAYS=0 have no expiry
+        if item is None or (TTL_ATTRIBUTE in item and int(item[TTL_ATTRIBUTE]) < time.time()):
+            return None
+        return item['reasoning']
+    
+    def delete_reasoning(self, reasoning_ids: List[str]):
+        """Deletes reasoning traces."""
+        with self.table.batch_writer() as batch:
+            for reasoning_id in reasoning_ids:
+                batch.delete_item(Key={'id': REASONING_ID_PREFIX + reasoning_id})
+
+def conversation_from_item(item: dict) -> Conversation:
+    """Builds a conversation from its DynamoDB item."""
+    # Conversations saved before the codec layer keep messages as a list of maps
+    if 'payload' in item:
+        messages = decode(item['payload'].value)
+    else:
+        messages = [Message.from_record(msg) for msg in item['messages']]
+    
+    return Conversation(
+        id=item['id'],
+        messages=messages,
+        title=item.get('title'),
+        owner=item.get('owner', 'default'),
+        updated_at=_to_datetime(item.get('updated_at'))
+    )
+
+def _to_datetime(epoch_ms) -> Optional[datetime]:
+    if epoch_ms is None:
+        return None
+    return datetime.fromtimestamp(int(epoch_ms) / 1000, tz=timezone.utc)
@@ -0,0 +1,305 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.logger import get_logger
+from src.storage.dynamodb import REASONING_ID_PREFIX, DynamoDBStorage, conversation_from_item
+
+logger = get_logger(__name__)
+
+# Columns of the exported files, one row per message
+EXPORT_FIELDS = (
+    "conversation_id", "owner", "title", "updated_at", "position", "type", "content", "truncated", "reasoning_id"
+)
+CHECKPOINT_FILE = "_checkpoint.json"
+
+@dataclass
+class ExportStats:
+    """What an export run read and wrote."""
+    conversations: int = 0
+    messages: int = 0
+    pages: int = 0
+    files: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+@dataclass
+class _Part:
+    """A segment's part file being written."""
+    writer: Any
+    tmp_path: str
+    final_path: str
+    rows: int = 0
+    # Scan position after the last page written to the part
+    last_key: Optional[dict] = None
+
+def conversation_rows(item: dict) -> List[Dict[str, Any]]:
+    """A conversation item flattened into one row per message."""
+    conversation = conversation_from_item(item)
+    updated_at = conversation.updated_at.isoformat() if conversation.updated_at else None
+    return [
+        {
+            "conversation_id": conversation.id,
+            "owner": conversation.owner,
+            "title": conversation.title,
+            "updated_at": updated_at,
+            "position": position,
+            "type": message.type,
+            "content": message.content,
+            "truncated": message.truncated,
+            "reasoning_id": message.reasoning_id,
+        }
+        for position, message in enumerate(conversation.messages)
+    ]
+
+class JsonlPartWriter:
+    """gzip-compressed JSON Lines.
+
+    Each page is compressed on its own by the worker that scanned it, and the
+    part file is the concatenation of those gzip members, which reads as one
+    gzip stream.
+    """
+    extension = "jsonl.gz"
+
+    @staticmethod
+    def encode(rows: List[Dict[str, Any]]) -> bytes:
+        text = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        return gzip.compress(text.encode("utf-8"), compresslevel=6)
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+class ParquetPartWriter:
+    """Parquet with zstd compression; needs pyarrow.
+
+    Each page becomes an Arrow table in the worker that scanned it and a row
+    group of the part file.
+    """
+    extension = "parquet"
+
+    @staticmethod
+    def schema():
+        pa = _arrow()
+        return pa.schema([
+            ("conversation_id", pa.string()),
+            ("owner", pa.string()),
+            ("title", pa.string()),
+            ("updated_at", pa.string()),
+            ("position", pa.int32()),
+            ("type", pa.string()),
+            ("content", pa.large_string()),
+            ("truncated", pa.bool_()),
+            ("reasoning_id", pa.string()),
+        ])
+
+    @classmethod
+    def encode(cls, rows: List[Dict[str, Any]]):
+        return _arrow().Table.from_pylist(rows, schema=cls.schema())
+
+    def __init__(self, path: str):
+        self._writer = _arrow().parquet.ParquetWriter(path, self.schema(), compression="zstd")
+
+    def write(self, chunk):
+        self._writer.write_table(chunk)
+
+    def close(self):
+        self._writer.close()
+
+PART_WRITERS = {"jsonl": JsonlPartWriter, "parquet": ParquetPartWriter}
+
+class ConversationExporter:
+    """Exports every conversation in the table to per-message files.
+
+    The table is read with a parallel Scan: `segments` segments shared by
+    `workers` threads. Workers decode, flatten and encode (compress) pages
+    and hand them to the writer through a bounded queue, so a slow disk holds
+    back the scan instead of filling memory. Each segment is written to its
+    own part files of up to `rows_per_file` rows. When a part is complete, the
+    segment's scan position is checkpointed, so a rerun into the same
+    directory resumes after the last complete part of every segment.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        file_format: str = "jsonl",
+        segments: int = settings.EXPORT_SEGMENTS,
+        workers: Optional[int] = None,
+        rows_per_file: int = settings.EXPORT_ROWS_PER_FILE,
+        queue_pages: int = settings.EXPORT_QUEUE_PAGES,
+        page_size: Optional[int] = None,
+        table_factory: Optional[Callable[[], Any]] = None
+    ):
+        if file_format not in PART_WRITERS:
+            raise ValueError(f"Unknown export format: {file_format}")
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.segments = segments
+        self.workers = workers or segments
+        self.rows_per_file = rows_per_file
+        self.queue_pages = queue_pages
+        self.page_size = page_size
+        # boto3 resources aren't thread-safe, so each worker makes its own table
+        self.table_factory = table_factory or (lambda: DynamoDBStorage().table)
+
+    def run(self) -> ExportStats:
+        os.makedirs(self.output_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(self.output_dir, "*.tmp")):
+            os.remove(stale)
+        checkpoint = self._load_checkpoint()
+        pending = [segment for segment in range(self.segments) if not checkpoint["segments"][str(segment)]["done"]]
+        if len(pending) < self.segments:
+            logger.info(f"Resuming export: {self.segments - len(pending)} of {self.segments} segments already exported")
+
+        stats = ExportStats()
+        start = time.perf_counter()
+        pages = queue.Queue(maxsize=self.queue_pages)
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export-scan") as pool:
+            for segment in pending:
+                pool.submit(self._scan_segment, segment, checkpoint["segments"][str(segment)]["last_key"], pages, stop)
+            try:
+                self._write(pending, pages, checkpoint, stats)
+            finally:
+                stop.set()
+                # Unblock workers waiting on a full queue so the pool can shut down
+                while not pages.empty():
+                    pages.get_nowait()
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def _scan_segment(self, segment: int, start_key: Optional[dict], pages: queue.Queue, stop: threading.Event):
+        """Scan one segment, putting each page's encoded rows and scan position on the queue."""
+        try:
+            table = self.table_factory()
+            scan_kwargs = {"Segment": segment, "TotalSegments": self.segments}
+            if self.page_size:
+                scan_kwargs["Limit"] = self.page_size
+            last_key = start_key
+            while not stop.is_set():
+                if last_key:
+                    scan_kwargs["ExclusiveStartKey"] = last_key
+                response = table.scan(**scan_kwargs)
+                rows, conversations, skipped = [], 0, 0
+                for item in response.get("Items", []):
+                    # Reasoning traces share the table but aren't conversations
+                    if item["id"].startswith(REASONING_ID_PREFIX):
+                        continue
+                    try:
+                        rows.extend(conversation_rows(item))
+                        conversations += 1
+                    except Exception as e:
+                        logger.warning(f"Skipping conversation {item['id']}: {e}")
+                        skipped += 1
+                last_key = response.get("LastEvaluatedKey")
+                chunk = PART_WRITERS[self.file_format].encode(rows) if rows else None
+                self._put(pages, ("page", segment, conversations, skipped, len(rows), chunk, last_key), stop)
+                if not last_key:
+                    self._put(pages, ("done", segment), stop)
+                    return
+        except Exception as e:
+            self._put(pages, ("error", segment, e), stop)
+
+    @staticmethod
+    def _put(pages: queue.Queue, message: tuple, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                pages.put(message, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _write(self, pending: List[int], pages: queue.Queue, checkpoint: dict, stats: ExportStats):
+        """Write pages as they arrive until every pending segment is done."""
+        parts: Dict[int, _Part] = {}
+        remaining = set(pending)
+        while remaining:
+            message = pages.get()
+            kind, segment = message[0], message[1]
+            if kind == "error":
+                raise RuntimeError(f"Export of segment {segment} failed") from message[2]
+            state = checkpoint["segments"][str(segment)]
+            if kind == "done":
+                if segment in parts:
+                    self._close_part(parts.pop(segment), state, stats)
+                state["done"] = True
+                self._save_checkpoint(checkpoint)
+                remaining.discard(segment)
+                continue
+
+            _, _, conversations, skipped, row_count, chunk, last_key = message
+            stats.pages += 1
+            stats.conversations += conversations
+            stats.skipped += skipped
+            stats.messages += row_count
+            if row_count:
+                if segment not in parts:
+                    parts[segment] = self._open_part(segment, state["parts"])
+                parts[segment].writer.write(chunk)
+                parts[segment].rows += row_count
+            if segment not in parts:
+                # Nothing unwritten precedes this position
+                state["last_key"] = last_key
+                continue
+            # The scan position is saved only once the rows before it are in a complete part
+            parts[segment].last_key = last_key
+            if parts[segment].rows >= self.rows_per_file:
+                self._close_part(parts.pop(segment), state, stats)
+                self._save_checkpoint(checkpoint)
+
+    def _open_part(self, segment: int, part: int) -> _Part:
+        writer_class = PART_WRITERS[self.file_format]
+        final_path = os.path.join(self.output_dir, f"segment-{segment:04d}-part-{part:05d}.{writer_class.extension}")
+        return _Part(writer_class(final_path + ".tmp"), final_path + ".tmp", final_path)
+
+    def _close_part(self, part: _Part, state: dict, stats: ExportStats):
+        part.writer.close()
+        os.replace(part.tmp_path, part.final_path)
+        state["parts"] += 1
+        state["last_key"] = part.last_key
+        stats.files += 1
+
+    def _load_checkpoint(self) -> dict:
+        path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                checkpoint = json.load(f)
+            if checkpoint["segments_total"] != self.segments or checkpoint["format"] != self.file_format:
+                raise ValueError(
+                    f"{self.output_dir} holds an export with {checkpoint['segments_total']} segments in "
+                    f"{checkpoint['format']}; resume with the same settings or use a new directory"
+                )
+            return checkpoint
+        return {
+            "segments_total": self.segments,
+            "format": self.file_format,
+            "segments": {str(segment): {"last_key": None, "parts": 0, "done": False} for segment in range(self.segments)}
+        }
+
+    def _save_checkpoint(self, checkpoint: dict):
+        path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(checkpoint, f, default=str)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,54 @@
+import uuid
+from typing import Dict, Iterable, Optional
+
+from src.core.logger import get_logger
+from src.storage.dynamodb import DynamoDBStorage
+from src.storage.redis_storage import RedisStorage
+
+logger = get_logger(__name__)
+
+def new_reasoning_id() -> str:
+    return str(uuid.uuid4())
+
+class ReasoningStore:
+    """Assistant reasoning traces, kept apart from the conversation history.
+    
+    Reasoning is often longer than the answer and is only read when the user
+    expands it, so conversations keep just a reference (`Message.reasoning_id`)
+    and traces are loaded one at a time on demand. Traces are written to Redis
+    and DynamoDB like conversations, but expire on their own schedule
+    (REASONING_TTL_DAYS).
+    """
+
+    def __init__(self, hot: Optional[RedisStorage] = None, durable: Optional[DynamoDBStorage] = None):
+        self.hot = hot or RedisStorage()
+        self.durable = durable or DynamoDBStorage()
+
+    def save(self, reasoning_id: str, reasoning: str):
+        """Save a reasoning trace to both tiers."""
+        self.durable.save_reasoning(reasoning_id, reasoning)
+        self.hot.save_reasoning(reasoning_id, reasoning)
+
+    def save_all(self, traces: Dict[str, str]):
+        for reasoning_id, reasoning in traces.items():
+            self.save(reasoning_id, reasoning)
+
+    def get(self, reasoning_id: str) -> Optional[str]:
+        """Get a reasoning trace, or None once it has expired."""
+        reasoning = self.hot.get_reasoning(reasoning_id)
+        if reasoning is not None:
+            return reasoning
+        
+        reasoning = self.durable.get_reasoning(reasoning_id)
+        if reasoning is not None:
+            logger.info(f"Promoting reasoning {reasoning_id} to Redis")
+            self.hot.save_reasoning(reasoning_id, reasoning)
+        return reasoning
+
+    def delete(self, reasoning_ids: Iterable[str]):
+        """Delete reasoning traces from both tiers."""
+        reasoning_ids = list(reasoning_ids)
+        if not reasoning_ids:
+            return
+        self.durable.delete_reasoning(reasoning_ids)
+        self.hot.delete_reasoning(*reasoning_ids)
@@ -1,9 +1,9 @@
-import json
 import redis
 from datetime import timedelta
 from typing import List, Dict, Optional
 from src.core.models import Message
 from src.core.config import settings
+from src.storage.codec import decode, get_codec
 
 class RedisStorage:
     def __init__(self):
@@ -13,39 +13,64 @@ class RedisStorage:
             db=0,
             decode_responses=True
         )
+        # Session payloads are binary (see src/storage/codec.py)
+        self.binary_client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=0
+        )
+        self.codec = get_codec()
         self.expiry_time = timedelta(days=1)
 
     def save_chat_session(self, session_id: str, messages: List[Message]):
         """Save chat session to Redis with 1-day expiry."""
-        messages_data = [
-            {"content": msg.content, "type": msg.type}
-            for msg in messages
-        ]
-        self.redis_client.setex(
+        self.binary_client.setex(
             f"chat:{session_id}",
             self.expiry_time,
-            json.dumps(messages_data)
+            self.codec.encode(messages)
         )
         # Add to sessions list
         self.redis_client.sadd("chat_sessions", session_id)
 
     def get_chat_session(self, session_id: str) -> List[Message]:
         """Retrieve chat session from Redis."""
-        data = self.redis_client.get(f"chat:{session_id}")
+        data = self.binary_client.get(f"chat:{session_id}")
         if not data:
             return []
-        
-        messages_data = json.loads(data)
-        return [
-            Message(content=msg["content"], type=msg["type"])
-            for msg in messages_data
-        ]
+        return decode(data)
+
+    def touch_chat_session(self, session_id: str):
+        """Restart a session's expiry, keeping recently used sessions in Redis."""
+        self.redis_client.expire(f"chat:{session_id}", self.expiry_time)
 
     def get_all_sessions(self) -> List[str]:
-        """Get all active chat session IDs."""
-        return list(self.redis_client.smembers("chat_sessions"))
+        """Get all active chat session IDs, dropping sessions that have expired."""
+        session_ids = list(self.redis_client.smembers("chat_sessions"))
+        if not session_ids:
+            return []
+        pipeline = self.redis_client.pipeline()
+        for session_id in session_ids:
+            pipeline.exists(f"chat:{session_id}")
+        active = [session_id for session_id, exists in zip(session_ids, pipeline.execute()) if exists]
+        expired = [session_id for session_id in session_ids if session_id not in active]
+        if expired:
+            self.redis_client.srem("chat_sessions", *expired)
+        return active
 
     def delete_chat_session(self, session_id: str):
         """Delete a chat session."""
         self.redis_client.delete(f"chat:{session_id}")
-        self.redis_client.srem("chat_sessions", session_id) 
\ No newline at end of file
+        self.redis_client.srem("chat_sessions", session_id)
+
+    def save_reasoning(self, reasoning_id: str, reasoning: str):
+        """Cache a reasoning trace with 1-day expiry."""
+        self.redis_client.setex(f"reasoning:{reasoning_id}", self.expiry_time, reasoning)
+
+    def get_reasoning(self, reasoning_id: str) -> Optional[str]:
+        """Retrieve a cached reasoning trace."""
+        return self.redis_client.get(f"reasoning:{reasoning_id}")
+
+    def delete_reasoning(self, *reasoning_ids: str):
+        """Delete cached reasoning traces."""
+        if reasoning_ids:
+            self.redis_client.delete(*(f"reasoning:{reasoning_id}" for reasoning_id in reasoning_ids)) 
\ No newline at end of file
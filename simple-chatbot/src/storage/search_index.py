@@ -0,0 +1,191 @@
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.logger import get_logger
+from src.core.models import Message
+
+logger = get_logger(__name__)
+
+# Message types whose content is searchable; reasoning is left out
+INDEXED_TYPES = ("user", "assistant")
+# Title rows are stored at this position, ahead of the conversation's messages
+TITLE_POSITION = -1
+# bm25 column weights for (title, content): title matches rank higher
+RANKING = "bm25(2.0, 1.0)"
+# Matching rows read per result wanted; more are read when conversations repeat
+ROWS_PER_RESULT = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    title TEXT,
+    indexed_count INTEGER NOT NULL DEFAULT 0
+);
+-- The conversation and position of each row of the full-text index, by rowid
+CREATE TABLE IF NOT EXISTS indexed_rows (
+    id INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS indexed_rows_conversation ON indexed_rows (conversation_id, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS message_index USING fts5(
+    title,
+    content,
+    tokenize = 'porter unicode61'
+);
+"""
+
+@dataclass
+class SearchResult:
+    """A conversation matching a search, with the best matching excerpt."""
+    conversation_id: str
+    title: Optional[str]
+    snippet: str
+
+def match_query(text: str) -> Optional[str]:
+    """An FTS5 query matching all words of the user's text, the last one as a prefix."""
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+class SearchIndex:
+    """Local full-text index over conversation titles and messages (SQLite FTS5).
+
+    Each message is a row of an inverted index, so saving a conversation only
+    indexes the messages added since it was last indexed, and searches never
+    touch Redis or DynamoDB.
+    """
+
+    def __init__(self, path: str = settings.SEARCH_INDEX_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Conversations are saved from the turn thread and searched from Streamlit's
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # The index can be rebuilt, so commits needn't wait for the disk
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def index(self, conversation_id: str, messages: List[Message], title: Optional[str], owner: str):
+        """Add a conversation's new messages to the index, and its title if it changed."""
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT title, indexed_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            indexed_title, indexed_count = row if row else (None, 0)
+            if indexed_count > len(messages):
+                # Messages are only ever appended; anything else means the index is stale
+                self._delete(conversation_id)
+                row, indexed_title, indexed_count = None, None, 0
+
+            if title != indexed_title:
+                if row is not None:
+                    self._delete_rows(conversation_id, TITLE_POSITION)
+                if title:
+                    self._insert_row(conversation_id, TITLE_POSITION, title=title)
+            for position, message in enumerate(messages[indexed_count:], start=indexed_count):
+                if message.type in INDEXED_TYPES:
+                    self._insert_row(conversation_id, position, content=message.content)
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations (id, owner, title, indexed_count) VALUES (?, ?, ?, ?)",
+                (conversation_id, owner, title, len(messages))
+            )
+
+    def delete(self, conversation_id: str):
+        """Remove a conversation from the index."""
+        with self._lock, self._db:
+            self._delete(conversation_id)
+
+    def _insert_row(self, conversation_id: str, position: int, title: Optional[str] = None, content: Optional[str] = None):
+        rowid = self._db.execute(
+            "INSERT INTO indexed_rows (conversation_id, position) VALUES (?, ?)", (conversation_id, position)
+        ).lastrowid
+        self._db.execute(
+            "INSERT INTO message_index (rowid, title, content) VALUES (?, ?, ?)", (rowid, title, content)
+        )
+
+    def _delete_rows(self, conversation_id: str, position: Optional[int] = None):
+        """Delete a conversation's rows, or only the row at `position`."""
+        condition, params = "conversation_id = ?", (conversation_id,)
+        if position is not None:
+            condition, params = condition + " AND position = ?", params + (position,)
+        self._db.execute(
+            f"DELETE FROM message_index WHERE rowid IN (SELECT id FROM indexed_rows WHERE {condition})", params
+        )
+        self._db.execute(f"DELETE FROM indexed_rows WHERE {condition}", params)
+
+    def _delete(self, conversation_id: str):
+        self._delete_rows(conversation_id)
+        self._db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+
+    def search(
+        self,
+        text: str,
+        owner: str = settings.CHAT_OWNER,
+        limit: int = settings.SEARCH_PAGE_SIZE,
+        offset: int = 0
+    ) -> Tuple[List[SearchResult], bool]:
+        """Search an owner's conversations, best matches first.
+
+        Returns:
+            A page of matching conversations and whether there are more
+        """
+        query = match_query(text)
+        if query is None:
+            return [], False
+
+        # FTS5 finds the best matching rows without sorting all matches, but
+        # several rows can belong to one conversation, so read more rows until
+        # there are enough conversations
+        wanted = offset + limit + 1
+        batch = wanted * ROWS_PER_RESULT
+        with self._lock:
+            while True:
+                rows = self._db.execute(
+                    """
+                    SELECT hits.rowid, indexed_rows.conversation_id, conversations.owner, conversations.title
+                    FROM (
+                        SELECT rowid, rank
+                        FROM message_index
+                        WHERE message_index MATCH ? AND rank MATCH ?
+                        ORDER BY rank
+                        LIMIT ?
+                    ) AS hits
+                    JOIN indexed_rows ON indexed_rows.id = hits.rowid
+                    JOIN conversations ON conversations.id = indexed_rows.conversation_id
+                    ORDER BY hits.rank
+                    """,
+                    (query, RANKING, batch)
+                ).fetchall()
+                # Each conversation's best matching row, in rank order
+                best = {}
+                for rowid, conversation_id, conversation_owner, title in rows:
+                    if conversation_owner == owner:
+                        best.setdefault(conversation_id, (rowid, title))
+                if len(best) >= wanted or len(rows) < batch:
+                    break
+                batch *= ROWS_PER_RESULT
+
+            page = list(best.items())[offset:offset + limit]
+            # Snippets are slow to build, so only the page's rows get one
+            snippets = dict(self._db.execute(
+                f"""
+                SELECT rowid, snippet(message_index, -1, '**', '**', '…', 12)
+                FROM message_index
+                WHERE message_index MATCH ? AND rowid IN ({", ".join("?" * len(page))})
+                """,
+                (query, *(rowid for _, (rowid, _) in page))
+            ).fetchall()) if page else {}
+        results = [
+            SearchResult(conversation_id, title, snippets.get(rowid, ""))
+            for conversation_id, (rowid, title) in page
+        ]
+        return results, len(best) > offset + limit
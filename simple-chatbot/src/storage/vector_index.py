@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rows scored at a time, so float16 and memory-mapped vectors are converted a block at a time
+SCORE_BLOCK_ROWS = 16384
+
+@dataclass
+class VectorEntry:
+    """What an indexed vector was embedded from."""
+    conversation_id: str
+    owner: str
+    position: int
+    text: str
+
+class VectorIndex:
+    """Normalized embedding vectors in a memory-mapped file, searched exactly.
+
+    `vectors.npy` holds one row per entry, with spare capacity for new rows,
+    and `entries.jsonl` describes the rows in order. Entries are only appended,
+    except when conversations are deleted or the index grows past
+    `max_entries`, which drops the oldest entries.
+    """
+
+    def __init__(self, path: str, dimensions: int, dtype: str = "float32", max_entries: int = 0):
+        self.path = path
+        self.dimensions = dimensions
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # How many of each conversation's messages have been looked at; kept when
+        # old entries are dropped, so they aren't embedded again
+        self._indexed: Dict[str, int] = {}
+        os.makedirs(path, exist_ok=True)
+
+        self._entries: List[VectorEntry] = []
+        entries_path = os.path.join(path, "entries.jsonl")
+        if os.path.exists(entries_path):
+            with open(entries_path) as f:
+                self._entries = [VectorEntry(**json.loads(line)) for line in f if line.strip()]
+
+        vectors_path = os.path.join(path, "vectors.npy")
+        self._vectors = None
+        if os.path.exists(vectors_path):
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            if vectors.shape[1] == dimensions and vectors.dtype == self.dtype and len(vectors) >= len(self._entries):
+                self._vectors = vectors
+            else:
+                logger.warning(f"Vector index at {path} doesn't match the settings, rebuilding it")
+                self._entries = []
+        if self._vectors is None:
+            self._write([], np.empty((0, dimensions), dtype=self.dtype))
+        self._reset_lookups()
+        self._index_entries(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def indexed_count(self, conversation_id: str) -> int:
+        """How many of a conversation's messages precede the ones not indexed yet."""
+        return self._indexed.get(conversation_id, 0)
+
+    def add(self, entries: Sequence[VectorEntry], vectors: np.ndarray):
+        """Append entries with their normalized vectors."""
+        with self._lock:
+            count = len(self._entries)
+            if count + len(entries) > len(self._vectors):
+                self._grow(count + len(entries))
+            self._vectors[count:count + len(entries)] = vectors
+            self._vectors.flush()
+            with open(os.path.join(self.path, "entries.jsonl"), "a") as f:
+                f.writelines(json.dumps(asdict(entry)) + "\n" for entry in entries)
+            self._entries.extend(entries)
+            self._index_entries(entries)
+            if self.max_entries and len(self._entries) > self.max_entries:
+                keep = np.arange(len(self._entries) - self.max_entries, len(self._entries))
+                self._compact(keep)
+
+    def delete(self, conversation_id: str):
+        """Forget a conversation's entries."""
+        with self._lock:
+            keep = np.flatnonzero(self._conversation_codes != self._conversation_code(conversation_id))
+            if len(keep) < len(self._entries):
+                self._compact(keep)
+            self._indexed.pop(conversation_id, None)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        owner: str,
+        exclude_conversation: Optional[str] = None,
+        min_similarity: float = -1.0
+    ) -> List[List[Tuple[float, VectorEntry]]]:
+        """The `k` entries of an owner most similar to each normalized query vector.
+
+        Queries are scored together in one pass over the vectors.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            count = len(self._entries)
+            if count == 0 or k <= 0:
+                return [[] for _ in queries]
+            scores = np.empty((len(queries), count), dtype=np.float32)
+            for start in range(0, count, SCORE_BLOCK_ROWS):
+                block = np.asarray(self._vectors[start:min(start + SCORE_BLOCK_ROWS, count)], dtype=np.float32)
+                scores[:, start:start + len(block)] = queries @ block.T
+            mask = self._owner_codes[:count] != self._owner_code(owner)
+            if exclude_conversation is not None:
+                mask |= self._conversation_codes[:count] == self._conversation_code(exclude_conversation)
+            scores[:, mask] = -np.inf
+            entries = self._entries
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-query_scores[candidates])]
+            results.append([
+                (float(query_scores[row]), entries[row])
+                for row in ranked
+                if query_scores[row] >= min_similarity
+            ])
+        return results
+
+    def _reset_lookups(self):
+        self._codes: Dict[str, int] = {}
+        self._owner_codes = np.empty(0, dtype=np.int64)
+        self._conversation_codes = np.empty(0, dtype=np.int64)
+
+    def _index_entries(self, entries: Sequence[VectorEntry]):
+        """Extend the lookup arrays used to filter search results with new entries."""
+        self._owner_codes = np.concatenate([
+            self._owner_codes, np.array([self._code(entry.owner) for entry in entries], dtype=np.int64)
+        ])
+        self._conversation_codes = np.concatenate([
+            self._conversation_codes, np.array([self._code(entry.conversation_id) for entry in entries], dtype=np.int64)
+        ])
+        for entry in entries:
+            self._indexed[entry.conversation_id] = max(self._indexed.get(entry.conversation_id, 0), entry.position + 1)
+
+    def _code(self, value: str) -> int:
+        return self._codes.setdefault(value, len(self._codes))
+
+    def _owner_code(self, owner: str) -> int:
+        return self._codes.get(owner, -1)
+
+    def _conversation_code(self, conversation_id: str) -> int:
+        return self._codes.get(conversation_id, -1)
+
+    def _grow(self, needed: int):
+        capacity = max(needed, 2 * len(self._vectors))
+        count = len(self._entries)
+        vectors = np.empty((capacity, self.dimensions), dtype=self.dtype)
+        vectors[:count] = self._vectors[:count]
+        self._write(self._entries, vectors, capacity)
+
+    def _compact(self, keep: np.ndarray):
+        entries = [self._entries[row] for row in keep]
+        self._write(entries, np.asarray(self._vectors[keep]))
+        self._reset_lookups()
+        self._index_entries(self._entries)
+
+    def _write(self, entries: List[VectorEntry], vectors: np.ndarray, capacity: int = 0):
+        """Replace both files, writing to temporary files first."""
+        capacity = max(capacity, len(vectors), 1024)
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        entries_path = os.path.join(self.path, "entries.jsonl")
+        mapped = np.lib.format.open_memmap(
+            vectors_path + ".tmp", mode="w+", dtype=self.dtype, shape=(capacity, self.dimensions)
+        )
+        mapped[:len(vectors)] = vectors
+        mapped.flush()
+        del mapped
+        with open(entries_path + ".tmp", "w") as f:
+            f.writelines(json.dumps(asdict(entry)) + "\n" for entry in entries)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(entries_path + ".tmp", entries_path)
+        self._entries = list(entries)
+        self._vectors = np.load(vectors_path, mmap_mode="r+")
@@ -1,18 +1,21 @@
 import uuid
-import asyncio
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Optional
 import streamlit as st
 from langchain_core.messages import HumanMessage
 
 from src.graph.graph import graph, create_initial_state
 from src.core.models import Message
-from src.storage.dynamodb import DynamoDBStorage
-from src.storage.redis_storage import RedisStorage
+from src.storage.conversation_store import ConversationStore
 from src.core.logger import get_logger
 from src.core.config import settings
+from src.core.turns import Turn, turn_manager
+from src.core.hedging import get_hedge_stats
+from src.core.memory import long_term_memory
 
 # Initialize storage and logger
-storage = DynamoDBStorage()
-redis_storage = RedisStorage()
+store = ConversationStore()
 logger = get_logger(__name__)
 
 def init_session_state():
@@ -22,96 +25,217 @@ def init_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
     if "chat_sessions" not in st.session_state:
-        st.session_state.chat_sessions = redis_storage.get_all_sessions()
+        refresh_chat_sessions()
     if "selected_model" not in st.session_state:
         st.session_state.selected_model = None
     if "chat_started" not in st.session_state:
         st.session_state.chat_started = False
+    if "reasoning_cache" not in st.session_state:
+        # Rendered reasoning traces loaded so far, by id
+        st.session_state.reasoning_cache = {}
+    if "history_windows" not in st.session_state:
+        # How many of each conversation's latest messages are shown
+        st.session_state.history_windows = {}
+    if "turn_key" not in st.session_state:
+        # Identifies this browser session's turns in the turn manager
+        st.session_state.turn_key = str(uuid.uuid4())
 
-def load_chat_session(session_id: str):
-    """Load a chat session from Redis."""
+def refresh_chat_sessions():
+    """Load the first page of recent chat sessions."""
+    st.session_state.chat_sessions, st.session_state.sessions_cursor = store.list_sessions()
+    # Search results are refreshed along with the list
+    st.session_state.searched_query = None
+
+def load_more_chat_sessions():
+    """Append the next page of chat sessions."""
+    sessions, st.session_state.sessions_cursor = store.list_sessions(cursor=st.session_state.sessions_cursor)
+    st.session_state.chat_sessions += sessions
+
+def search_chat_sessions(query: str):
+    """Search conversations, keeping the first page of results."""
+    st.session_state.search_results, st.session_state.search_has_more = store.search(query)
+    st.session_state.searched_query = query
+
+def load_more_search_results():
+    """Append the next page of search results."""
+    results, st.session_state.search_has_more = store.search(
+        st.session_state.searched_query,
+        offset=len(st.session_state.search_results)
+    )
+    st.session_state.search_results += results
+
+def display_search_results(query: str):
+    """List the conversations matching a search, with the best matching excerpt of each."""
+    if st.session_state.get("searched_query") != query:
+        search_chat_sessions(query)
+    
+    if not st.session_state.search_results:
+        st.caption("No matching conversations")
+    for result in st.session_state.search_results:
+        if st.button(result.title or f"Chat {result.conversation_id[:8]}", key=f"result_{result.conversation_id}"):
+            if load_chat_session(result.conversation_id):
+                st.rerun()
+        st.caption(result.snippet)
+    
+    if st.session_state.search_has_more and st.button("More results"):
+        load_more_search_results()
+        st.rerun()
+
+def load_chat_session(session_id: str) -> bool:
+    """Load a chat session from the conversation store.
+    
+    Returns False, leaving the current chat open, while its turn is still stopping.
+    """
+    if not collect_turn():
+        return False
     st.session_state.conversation_id = session_id
-    st.session_state.messages = redis_storage.get_chat_session(session_id)
+    st.session_state.messages = store.get(session_id)
     st.session_state.chat_started = True
+    return True
 
-def save_current_session():
-    """Save current session to Redis."""
-    redis_storage.save_chat_session(
-        st.session_state.conversation_id,
-        st.session_state.messages
-    )
+def reasoning_html(content: str) -> str:
+    """Reasoning in a different style from regular messages."""
+    return """
+    <div style='padding: 10px; border-radius: 10px; border-left: 5px solid #9e9e9e;'>
+        <p style='color: #666; font-style: italic; margin: 0; font-size: 0.8em;'>
+            Thinking process:
+        </p>
+        <p style='margin: 5px 0 0 0; font-size: 0.9em;'>
+            {content}
+        </p>
+    </div>
+    """.format(content=content)
+
+def get_reasoning_html(reasoning_id: str) -> Optional[str]:
+    """Load and render a reasoning trace, at most once per session."""
+    cache = st.session_state.reasoning_cache
+    if reasoning_id not in cache:
+        reasoning = store.reasoning.get(reasoning_id)
+        cache[reasoning_id] = reasoning_html(reasoning) if reasoning is not None else None
+    return cache[reasoning_id]
+
+def display_message(message: Message):
+    """Display one chat message."""
+    if message.type == "assistant_reasoning":
+        # Conversations from before the reasoning store keep reasoning inline
+        with st.chat_message("assistant", avatar="🤔"):
+            st.markdown(message.cached("html", lambda m: reasoning_html(m.content)), unsafe_allow_html=True)
+        return
+    
+    with st.chat_message("user" if message.type == "user" else "assistant"):
+        # Reasoning is only loaded when the user asks to see it
+        if message.reasoning_id and st.toggle("🤔 Show thinking", key=f"reasoning_{message.reasoning_id}"):
+            html = get_reasoning_html(message.reasoning_id)
+            if html is None:
+                st.caption("This reasoning has expired")
+            else:
+                st.markdown(html, unsafe_allow_html=True)
+        st.markdown(message.content)
+        if message.truncated:
+            st.caption("⏹ Stopped before the response was complete")
 
 def display_messages():
-    """Display chat messages."""
-    for message in st.session_state.messages:
-        if message.type == "assistant_reasoning":
-            # Display reasoning in a different style
-            with st.chat_message("assistant", avatar="🤔"):
-                st.markdown("""
-                <div style='padding: 10px; border-radius: 10px; border-left: 5px solid #9e9e9e;'>
-                    <p style='color: #666; font-style: italic; margin: 0; font-size: 0.8em;'>
-                        Thinking process:
-                    </p>
-                    <p style='margin: 5px 0 0 0; font-size: 0.9em;'>
-                        {content}
-                    </p>
-                </div>
-                """.format(content=message.content), unsafe_allow_html=True)
-        else:
-            # Display regular messages
-            with st.chat_message("user" if message.type == "user" else "assistant"):
-                st.write(message.content)
-
-def cleanup_old_messages():
-    """Remove old messages if we've exceeded the maximum history length."""
-    if len(st.session_state.messages) > settings.MAX_HISTORY_LENGTH:
-        # Keep the most recent messages
-        st.session_state.messages = st.session_state.messages[-settings.MAX_HISTORY_LENGTH:]
-        logger.info(f"Cleaned up messages to maximum length of {settings.MAX_HISTORY_LENGTH}")
-
-async def process_message(user_message: str):
-    """Process user message through the graph."""
+    """Display the latest chat messages, with a control to show earlier ones.
+    
+    Every rerun redraws the chat, so only a window of recent messages is drawn
+    to keep reruns fast in long conversations.
+    """
+    messages = st.session_state.messages
+    windows = st.session_state.history_windows
+    conversation_id = st.session_state.conversation_id
+    window = windows.get(conversation_id, settings.HISTORY_PAGE_SIZE)
+    
+    if len(messages) > window:
+        if st.button(f"Show earlier messages ({len(messages) - window} more)", key="show_earlier"):
+            windows[conversation_id] = window + settings.HISTORY_PAGE_SIZE
+            st.rerun()
+    
+    for message in messages[-window:]:
+        display_message(message)
+
+def start_turn(user_message: str):
+    """Start generating a response to the user's message in the background."""
     logger.info("Processing new message")
     
+    # A turn still running in this session is stopped and its partial output kept.
+    # One that hasn't stopped yet would save its own copy of the conversation after
+    # this turn's, so no new turn starts until it has.
+    if not collect_turn():
+        return
+    
     # Create and add message
     message = Message(content=user_message, type="user")
     st.session_state.messages.append(message)
     
-    # Cleanup old messages if needed
-    cleanup_old_messages()
-    
-    # Get all current messages for context and create state
+    # Get all current messages and create state; the graph limits what the model sees
+    # and saves the whole conversation
     state_dict = create_initial_state(st.session_state.conversation_id, st.session_state.selected_model)
-    state_dict["messages"] = [
-        {
-            "content": msg.content,
-            "type": msg.type,
-        }
-        for msg in st.session_state.messages
-    ]
+    state_dict["messages"] = list(st.session_state.messages)
+    
+    async def run(turn: Turn):
+        # The conversation node watches the cancel event and reports partial output
+        config = {"configurable": {"cancel_event": turn.cancel_event, "on_partial": turn.update}}
+        response = await graph.ainvoke(state_dict, config=config)
+        # The graph returns the whole conversation; only the new messages are added to the chat
+        return {**response, "messages": response["messages"][len(state_dict["messages"]):]}
+    
+    turn_manager.start(st.session_state.turn_key, run)
+
+def collect_turn() -> bool:
+    """Stop this session's turn if it is still running and add its messages to the chat.
+    
+    Returns False if the turn didn't stop in time; it is still shown as running
+    and collected once it ends.
+    """
+    key = st.session_state.turn_key
+    if turn_manager.get(key) is None:
+        return True
+    turn_manager.cancel(key)
     
     try:
-        response = await graph.ainvoke(state_dict)
+        response = turn_manager.finish(key)
         logger.info("Received response from graph")
         
         # Add AI response to session state
-        if "messages" in response and response["messages"]:
-            for msg_dict in response["messages"]:
-                new_message = Message(
-                    content=msg_dict["content"],
-                    type=msg_dict["type"]
-                )
+        if response and response.get("messages"):
+            for new_message in response["messages"]:
                 st.session_state.messages.append(new_message)
                 logger.info(f"Added response message to session state: {new_message}")
+            # The turn's reasoning is already at hand, so showing it needs no lookup
+            st.session_state.reasoning_cache.update(
+                (reasoning_id, reasoning_html(reasoning)) for reasoning_id, reasoning in response.get("reasoning", {}).items()
+            )
         
-        # Save to Redis after processing
-        save_current_session()
-        # Update chat sessions list
-        st.session_state.chat_sessions = redis_storage.get_all_sessions()
+        # The graph has saved the conversation; update chat sessions list
+        refresh_chat_sessions()
         
+    except FutureTimeoutError:
+        # The turn is still tracked and shown as running until it stops
+        logger.warning("Turn is still stopping")
+        st.warning("The previous response is still stopping. Please try again in a moment.")
+        return False
     except Exception as e:
         logger.error(f"Error from graph: {str(e)}")
         st.error("Sorry, I encountered an error. Please try again.")
+    return True
+
+def display_running_turn(turn: Turn):
+    """Show a running turn's output as it streams, with a control to stop it."""
+    with st.chat_message("assistant"):
+        # Clicking Stop reruns the script, which lands here again with the button pressed
+        if st.button("⏹ Stop", key="stop_turn"):
+            turn_manager.cancel(turn.key)
+        reasoning_placeholder = st.empty()
+        text_placeholder = st.empty()
+        while not turn.done:
+            turn_manager.get(turn.key)  # Marks the turn as watched
+            if turn.partial_reasoning and not turn.partial_text:
+                reasoning_placeholder.caption(f"🤔 {turn.partial_reasoning[-500:]}")
+            text_placeholder.markdown(turn.partial_text or "_Thinking..._")
+            time.sleep(0.1)
+    
+    collect_turn()
+    st.rerun()
 
 def main():
     st.set_page_config(layout="wide")
@@ -124,7 +248,7 @@ def main():
         st.title("Chat History")
         
         # New Chat button
-        if st.button("New Chat"):
+        if st.button("New Chat") and collect_turn():
             st.session_state.conversation_id = str(uuid.uuid4())
             st.session_state.messages = []
             st.session_state.selected_model = None
@@ -133,27 +257,47 @@ def main():
         
         st.divider()
         
-        # Display chat sessions
-        for session_id in st.session_state.chat_sessions:
-            # Get first message or use session ID as fallback
-            messages = redis_storage.get_chat_session(session_id)
-            session_name = messages[0].content[:30] + "..." if messages and len(messages[0].content) > 30 else (messages[0].content if messages else f"Chat {session_id[:8]}")
+        search_query = st.text_input("Search", placeholder="Search conversations", label_visibility="collapsed")
+        
+        if search_query:
+            display_search_results(search_query)
+        else:
+            # Display chat sessions
+            for session in st.session_state.chat_sessions:
+                # Use the stored title or session ID as fallback
+                session_id = session.id
+                session_name = session.title or f"Chat {session_id[:8]}"
+                
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    if st.button(session_name, key=f"session_{session_id}") and load_chat_session(session_id):
+                        st.rerun()
+                with col2:
+                    # A running turn of the open chat would save it again after the delete
+                    if st.button("🗑️", key=f"delete_{session_id}") and (
+                        session_id != st.session_state.conversation_id or collect_turn()
+                    ):
+                        store.delete(session_id)
+                        if settings.MEMORY_ENABLED:
+                            long_term_memory.forget(session_id)
+                        refresh_chat_sessions()
+                        if session_id == st.session_state.conversation_id:
+                            st.session_state.conversation_id = str(uuid.uuid4())
+                            st.session_state.messages = []
+                            st.session_state.selected_model = None
+                            st.session_state.chat_started = False
+                        st.rerun()
             
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                if st.button(session_name, key=f"session_{session_id}"):
-                    load_chat_session(session_id)
-                    st.rerun()
-            with col2:
-                if st.button("🗑️", key=f"delete_{session_id}"):
-                    redis_storage.delete_chat_session(session_id)
-                    st.session_state.chat_sessions = redis_storage.get_all_sessions()
-                    if session_id == st.session_state.conversation_id:
-                        st.session_state.conversation_id = str(uuid.uuid4())
-                        st.session_state.messages = []
-                        st.session_state.selected_model = None
-                        st.session_state.chat_started = False
-                    st.rerun()
+            if st.session_state.sessions_cursor and st.button("Load more"):
+                load_more_chat_sessions()
+                st.rerun()
+        
+        # How often slow first tokens triggered a backup request, and how often it won
+        hedge_stats = get_hedge_stats()
+        if hedge_stats:
+            st.divider()
+            with st.expander("Latency hedging"):
+                st.json(hedge_stats)
     
     # Main chat area
     st.title("💬 Sumo Logic Chatbot")
@@ -180,23 +324,17 @@ def main():
         # Display current model
         st.caption(f"Using: {st.session_state.selected_model}")
 
+        # Chat input; sending while a response is generating stops that response
+        if user_input := st.chat_input("Type your message here..."):
+            start_turn(user_input)
+
         # Display existing messages
         display_messages()
 
-        # Chat input
-        if user_input := st.chat_input("Type your message here..."):
-            # Immediately display user message
-            with st.chat_message("user"):
-                st.write(user_input)
-            
-            # Show spinner while processing
-            with st.chat_message("assistant"):
-                with st.spinner("Processing message..."):
-                    # Process message
-                    asyncio.run(process_message(user_input))
-            
-            # Rerun to update the display with the new messages
-            st.rerun()
+        # Stream the response being generated, if any
+        turn = turn_manager.get(st.session_state.turn_key)
+        if turn is not None:
+            display_running_turn(turn)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file